@@ -0,0 +1,118 @@
+"""Benchmark real `GitHandler.pull()` cycles per GitBackend: wall time and git forks.
+
+Against a local bare remote, per backend:
+  idle : the remote did not move (probe only, the common case between edits)
+  full : the remote gained a commit editing a few notes (probe, fetch, mirror update)
+
+The backend serves the read-side queries (rev resolution, blob sizes for the
+mirror counters); probe, fetch and `reset --hard` fork either way.
+
+Backends:
+  cli       : CliGitBackend, one git process per query
+  catfile   : CatFileGitBackend, persistent `git cat-file --batch[-check]` coprocesses
+
+Usage (from client/):
+    uv run python -m benchmarks.bench_git_backend --files 20000 --cycles 10
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+from benchmarks.bench_smart_clean import FILES_PER_DIR, git, make_remote
+from src.config import config
+from src.git_backend import BACKENDS
+from src.git_handler import GitHandler
+
+EDITED_PER_CYCLE = 10
+
+
+class _ForkCounter:
+    """Counts every subprocess started while installed (GitPython's included)."""
+
+    def __init__(self):
+        self.count = 0
+        self._orig_init = subprocess.Popen.__init__
+
+    def __enter__(self):
+        counter = self
+        orig_init = self._orig_init
+
+        def counting_init(popen, *args, **kwargs):
+            counter.count += 1
+            orig_init(popen, *args, **kwargs)
+
+        subprocess.Popen.__init__ = counting_init
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.Popen.__init__ = self._orig_init
+
+
+def note_path(i):
+    return f"folder-{i // FILES_PER_DIR:05d}/note-{i:06d}.md"
+
+
+def timed_pull(handler):
+    with _ForkCounter() as counter:
+        start = time.perf_counter()
+        assert handler.pull()
+        return time.perf_counter() - start, counter.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--cycles", type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sbsync-bench-")
+    try:
+        print(f"Creating synthetic remote with {args.files} files...")
+        remote, writer = make_remote(workdir, args.files)
+        config.GIT_REMOTE_URL = remote
+        handlers = {}
+        for name in BACKENDS:
+            vault = os.path.join(workdir, name)
+            git(workdir, "clone", "-q", remote, vault)
+            config.GIT_BACKEND = name
+            handlers[name] = GitHandler(repo_path=vault)
+            # Warm-up: first pull starts the catfile coprocesses.
+            handlers[name].pull()
+
+        samples = {(name, kind): [] for name in handlers for kind in ("idle", "full")}
+        step = max(1, args.files // (EDITED_PER_CYCLE * args.cycles))
+        for cycle in range(args.cycles):
+            for name, handler in handlers.items():
+                samples[(name, "idle")].append(timed_pull(handler))
+
+            for n in range(EDITED_PER_CYCLE):
+                rel = note_path((cycle * EDITED_PER_CYCLE + n) * step % args.files)
+                with open(os.path.join(writer, rel), "a") as f:
+                    f.write(f"edit {cycle}\n")
+            git(writer, "commit", "-q", "-am", f"cycle {cycle}")
+            git(writer, "push", "-q", "origin", "main")
+            for name, handler in handlers.items():
+                samples[(name, "full")].append(timed_pull(handler))
+
+        heads = {h.repo.git.rev_parse("HEAD") for h in handlers.values()}
+        assert len(heads) == 1, heads
+
+        print(f"\nGitHandler.pull() per cycle ({args.files} files, {EDITED_PER_CYCLE} edited)")
+        print(f"{'backend':<12}{'cycle':<8}{'wall (s)':>12}{'forks':>10}")
+        for (name, kind), rows in samples.items():
+            wall = statistics.median(t for t, _ in rows)
+            forks = statistics.mean(f for _, f in rows)
+            print(f"{name:<12}{kind:<8}{wall:>12.4f}{forks:>10.1f}")
+        for handler in handlers.values():
+            handler.backend.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
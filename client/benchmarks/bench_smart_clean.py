@@ -0,0 +1,118 @@
+"""Benchmark the client's conflict detection before a pull on a large synthetic vault.
+
+One cycle = the remote added a few notes, one of which also exists locally as an
+untracked file; find (and remove) the conflicting untracked files.
+  tree-intersect : every remote path (`ls-tree -r`) ∩ every untracked path (`ls-files --others`)
+  diff-added     : `git diff --name-only --diff-filter=A HEAD <remote>` checked against the filesystem
+
+Usage (from client/):
+    uv run python -m benchmarks.bench_smart_clean --files 100000 --cycles 5
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+from src.git_handler import GitHandler
+
+FILES_PER_DIR = 100
+ADDED_PER_CYCLE = 3
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def make_remote(workdir, n_files):
+    """A bare remote seeded with `n_files` notes, plus the writer clone used to add more."""
+    remote = os.path.join(workdir, "remote.git")
+    writer = os.path.join(workdir, "writer")
+    git(workdir, "init", "-q", "--bare", "-b", "main", remote)
+    os.makedirs(writer)
+    for i in range(n_files):
+        d = os.path.join(writer, f"folder-{i // FILES_PER_DIR:05d}")
+        if i % FILES_PER_DIR == 0:
+            os.makedirs(d)
+        with open(os.path.join(d, f"note-{i:06d}.md"), "w") as f:
+            f.write(f"# Note {i}\n\nSome text.\n")
+    for args in (
+        ["init", "-q", "-b", "main"],
+        ["config", "user.name", "bench"],
+        ["config", "user.email", "bench@example.com"],
+        ["add", "-A"],
+        ["commit", "-q", "-m", "init"],
+        ["remote", "add", "origin", remote],
+        ["push", "-q", "origin", "main"],
+    ):
+        git(writer, *args)
+    return remote, writer
+
+
+def legacy_conflicts(handler, remote_ref):
+    remote_files = set(handler.repo.git.ls_tree("-r", "-z", "--name-only", remote_ref).split("\0"))
+    untracked = handler.repo.git.ls_files("--others", "--exclude-standard", "-z")
+    return remote_files.intersection(p for p in untracked.split("\0") if p)
+
+
+def diff_conflicts(handler, remote_ref):
+    added = handler._incoming_added_paths(remote_ref)
+    return {p for p in added if os.path.lexists(os.path.join(handler.repo_path, p))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--cycles", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sbsync-bench-")
+    try:
+        print(f"Creating synthetic remote with {args.files} files...")
+        remote, writer = make_remote(workdir, args.files)
+        vault = os.path.join(workdir, "vault")
+        git(workdir, "clone", "-q", remote, vault)
+        handler = GitHandler(repo_path=vault)
+
+        times = {"tree-intersect": [], "diff-added": []}
+        for cycle in range(args.cycles):
+            # Upstream adds a few notes; one of them was also created locally.
+            added = [f"inbox/cycle-{cycle}-{n}.md" for n in range(ADDED_PER_CYCLE)]
+            for rel in added:
+                os.makedirs(os.path.join(writer, "inbox"), exist_ok=True)
+                with open(os.path.join(writer, rel), "w") as f:
+                    f.write("new\n")
+            git(writer, "add", "-A")
+            git(writer, "commit", "-q", "-m", f"cycle {cycle}")
+            git(writer, "push", "-q", "origin", "main")
+            git(vault, "fetch", "-q", "origin")
+            os.makedirs(os.path.join(vault, "inbox"), exist_ok=True)
+            with open(os.path.join(vault, added[0]), "w") as f:
+                f.write("local copy\n")
+
+            results = []
+            for name, detect in (
+                ("tree-intersect", legacy_conflicts),
+                ("diff-added", diff_conflicts),
+            ):
+                start = time.perf_counter()
+                results.append(detect(handler, "origin/main"))
+                times[name].append(time.perf_counter() - start)
+            assert results[0] == results[1] == {added[0]}, results
+
+            os.remove(os.path.join(vault, added[0]))
+            git(vault, "merge", "-q", "origin/main")
+
+        print(f"\nConflict detection per pull ({args.files} files, {args.cycles} cycles)")
+        print(f"{'method':<16}{'median (s)':>12}{'max (s)':>10}")
+        for name, samples in times.items():
+            print(f"{name:<16}{statistics.median(samples):>12.4f}{max(samples):>10.4f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
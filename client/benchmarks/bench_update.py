@@ -0,0 +1,73 @@
+"""Benchmark moving the client's working tree to a new remote commit on a large vault.
+
+Each cycle the remote edits a few notes; the client has already fetched them.
+  merge  : smart clean + `git checkout .` + merge (UPDATE_MODE=merge)
+  mirror : one `git reset --hard <remote>` (UPDATE_MODE=mirror)
+
+Usage (from client/):
+    uv run python -m benchmarks.bench_update --files 100000 --cycles 5
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_smart_clean import FILES_PER_DIR, git, make_remote
+from src.git_handler import GitHandler
+
+EDITED_PER_CYCLE = 10
+
+
+def note_path(i):
+    return f"folder-{i // FILES_PER_DIR:05d}/note-{i:06d}.md"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--cycles", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sbsync-bench-")
+    try:
+        print(f"Creating synthetic remote with {args.files} files...")
+        remote, writer = make_remote(workdir, args.files)
+        handlers = {}
+        for mode in ("merge", "mirror"):
+            vault = os.path.join(workdir, mode)
+            git(workdir, "clone", "-q", remote, vault)
+            handlers[mode] = GitHandler(repo_path=vault)
+
+        times = {mode: [] for mode in handlers}
+        step = max(1, args.files // (EDITED_PER_CYCLE * args.cycles))
+        for cycle in range(args.cycles):
+            for n in range(EDITED_PER_CYCLE):
+                rel = note_path((cycle * EDITED_PER_CYCLE + n) * step % args.files)
+                with open(os.path.join(writer, rel), "a") as f:
+                    f.write(f"edit {cycle}\n")
+            git(writer, "commit", "-q", "-am", f"cycle {cycle}")
+            git(writer, "push", "-q", "origin", "main")
+
+            for mode, handler in handlers.items():
+                git(handler.repo_path, "fetch", "-q", "origin")
+                update = handler._merge_update if mode == "merge" else handler._mirror_update
+                start = time.perf_counter()
+                update("origin/main")
+                times[mode].append(time.perf_counter() - start)
+
+        trees = {h.repo.git.rev_parse("HEAD^{tree}") for h in handlers.values()}
+        assert len(trees) == 1, trees
+
+        print(f"\nWorking tree update per pull ({args.files} files, {EDITED_PER_CYCLE} edited)")
+        print(f"{'mode':<10}{'median (s)':>12}{'max (s)':>10}")
+        for mode, samples in times.items():
+            print(f"{mode:<10}{statistics.median(samples):>12.4f}{max(samples):>10.4f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,8 +17,55 @@ class Config:
         # Pull interval in minutes
         self.PULL_INTERVAL_MINUTES = int(os.getenv("PULL_INTERVAL_MINUTES", "5"))
 
+        # Bootstrap clone: "full", "blobless" (partial clone, blobs fetched on demand) or
+        # "shallow" (CLONE_DEPTH commits, re-shallowed every CLONE_RESHALLOW_EVERY full
+        # pulls, 0 = never). CLONE_BLOB_LIMIT (e.g. "1m") leaves larger blobs on the remote.
+        self.CLONE_STRATEGY = os.getenv("CLONE_STRATEGY", "full").lower()
+        self.CLONE_DEPTH = int(os.getenv("CLONE_DEPTH", "50"))
+        self.CLONE_RESHALLOW_EVERY = int(os.getenv("CLONE_RESHALLOW_EVERY", "100"))
+        self.CLONE_DEEPEN_ATTEMPTS = int(os.getenv("CLONE_DEEPEN_ATTEMPTS", "5"))
+        self.CLONE_BLOB_LIMIT = os.getenv("CLONE_BLOB_LIMIT", "")
+
+        # Cone-mode sparse checkout: only these folders (plus top-level files) are
+        # materialized (comma separated, e.g. "notes,projects"; empty = whole vault).
+        # Applied at clone time and updated in place when the setting changes.
+        self.SPARSE_PATHS = [
+            p.strip() for p in os.getenv("SPARSE_PATHS", "").split(",") if p.strip()
+        ]
+
+        # How a pull moves the working tree to the remote commit:
+        # "mirror" (one `git reset --hard`, rewrites only differing files) or
+        # "merge" (smart clean + `git checkout .` + merge)
+        self.UPDATE_MODE = os.getenv("UPDATE_MODE", "mirror").lower()
+
+        # Snapshot mode (opt-in): publish every pulled commit as a snapshot directory in
+        # SNAPSHOT_DIR and atomically flip the SNAPSHOT_LINK symlink (the folder Obsidian
+        # opens) to it. SNAPSHOT_KEEP snapshots (>= 2) are kept for rollback.
+        self.SNAPSHOT_LINK = os.getenv("SNAPSHOT_LINK", "")
+        self.SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "") or (
+            self.TARGET_DIR.rstrip("/") + ".snapshots"
+        )
+        self.SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "2"))
+
+        # Push notifications: when set, the metrics server also accepts
+        # `POST /notify` from the sbSync server with this bearer token and pulls right
+        # away; PULL_INTERVAL_MINUTES polling stays on as the fallback
+        self.NOTIFY_TOKEN = os.getenv("NOTIFY_TOKEN", "")
+
         # Prometheus metrics port
         self.METRICS_PORT = int(os.getenv("METRICS_PORT", "8001"))
+        # Pull cycles kept in memory for GET /debug/syncs on the metrics port (0 = off)
+        self.FLIGHT_RECORDER_SIZE = int(os.getenv("FLIGHT_RECORDER_SIZE", "50"))
+        # Opt-in /debug/profile (sampling CPU profile) and /debug/tracemalloc routes on
+        # the metrics port; nothing is sampled or traced until they are called
+        self.PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+        # Repository statistics (objects, packs, index, untracked files) are recomputed
+        # on a background thread this often; scrapes serve the last values (0 = not exported)
+        self.REPO_STATS_TTL_SECONDS = float(os.getenv("REPO_STATS_TTL_SECONDS", "300"))
+
+        # Read-side git queries: "catfile" (persistent `git cat-file --batch` coprocesses)
+        # or "cli" (one git process per query)
+        self.GIT_BACKEND = os.getenv("GIT_BACKEND", "catfile").lower()
 
     def validate(self):
         if not self.GIT_REMOTE_URL:
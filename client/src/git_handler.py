@@ -3,14 +3,47 @@ import git
 import time
 from pathlib import Path
 from src.config import config
+from src.git_backend import make_backend
+from src.phases import timed_phase
+from src.recorder import recorder
+from src.snapshot import SnapshotManager
+from src.sparse import in_cone, sparse_dirs
 from src.utils import logger
-from src.metrics import PULLS_TOTAL, ERRORS_TOTAL, LAST_PULL_TIMESTAMP
+from src.metrics import (
+    CLONE_SECONDS,
+    ERRORS_TOTAL,
+    LAST_PULL_TIMESTAMP,
+    LAZY_BLOB_FETCHES_TOTAL,
+    OBJECT_STORE_BYTES,
+    PULL_CYCLES_TOTAL,
+    PROPAGATION_SECONDS,
+    PULLS_TOTAL,
+    UPDATE_BYTES_WRITTEN,
+    UPDATE_FILES_WRITTEN,
+)
+
+# Trailer the sbSync server adds to each commit: the batch's first-change time.
+FIRST_CHANGE_TRAILER = "Sbsync-First-Change"
+# Commits older than this many per pull are not observed (e.g. after a long outage).
+PROPAGATION_MAX_COMMITS = 1000
 
 
 class GitHandler:
     def __init__(self, repo_path=None):
         self.repo_path = repo_path or config.TARGET_DIR
+        self.sparse_dirs = sparse_dirs()
         self.repo = self._init_repo()
+        self.backend = make_backend(self.repo) if self.repo else None
+        if self.repo:
+            # Pull cycles keep their git commands for /debug/syncs.
+            recorder.attach(self.repo)
+        self.full_pulls = 0
+        # Snapshot mode: readers see SNAPSHOT_LINK, flipped atomically after each update.
+        self.snapshots = None
+        if self.repo and config.SNAPSHOT_LINK:
+            self.snapshots = SnapshotManager(
+                self.repo, self.backend, sparse_dirs=self.sparse_dirs
+            )
 
     def _git_env(self):
         """
@@ -46,7 +79,7 @@ class GitHandler:
                     old_env = {k: os.environ.get(k) for k in git_env.keys()}
                     os.environ.update(git_env)
                     try:
-                        repo = git.Repo.clone_from(config.GIT_REMOTE_URL, self.repo_path)
+                        repo = self._clone()
                     finally:
                         for k, v in old_env.items():
                             if v is None:
@@ -64,6 +97,8 @@ class GitHandler:
                 git_config.set_value("user", "name", config.GIT_USER_NAME)
                 git_config.set_value("user", "email", config.GIT_USER_EMAIL)
 
+            self._configure_sparse(repo)
+
             # Configure Remote if not exists
             if config.GIT_REMOTE_URL:
                 if "origin" not in repo.remotes:
@@ -81,34 +116,137 @@ class GitHandler:
             ERRORS_TOTAL.inc()
             return None
 
-    def _smart_clean(self, remote_branch_name):
-        """
-        Removes untracked files that conflict with the remote branch.
-        """
+    def _clone_options(self):
+        """`git clone` options for CLONE_STRATEGY and CLONE_BLOB_LIMIT."""
+        strategy = config.CLONE_STRATEGY
+        options = {}
+        if strategy == "blobless":
+            # Commits and trees only; blobs are fetched on demand at checkout.
+            options["filter"] = "blob:none"
+        elif config.CLONE_BLOB_LIMIT:
+            # Attachments above the limit are fetched on demand.
+            options["filter"] = f"blob:limit={config.CLONE_BLOB_LIMIT}"
+        if strategy == "shallow":
+            options["depth"] = config.CLONE_DEPTH
+        elif strategy not in ("full", "blobless"):
+            logger.warning("Unknown CLONE_STRATEGY %r; using a full clone.", strategy)
+        if self.sparse_dirs:
+            # Check out only top-level files; _configure_sparse adds the folders.
+            options["sparse"] = True
+        return options
+
+    def _clone(self):
+        options = self._clone_options()
+        logger.info("Clone strategy: %s %s", config.CLONE_STRATEGY, options or "")
+        started = time.monotonic()
+        repo = git.Repo.clone_from(config.GIT_REMOTE_URL, self.repo_path, **options)
+        CLONE_SECONDS.labels(strategy=config.CLONE_STRATEGY).set(time.monotonic() - started)
+        OBJECT_STORE_BYTES.set(self._object_store_bytes(repo))
+        return repo
+
+    def _configure_sparse(self, repo):
+        """Apply SPARSE_PATHS as a cone-mode sparse checkout, or turn sparse checkout off."""
+        status, output, _ = repo.git.sparse_checkout(
+            "list", with_extended_output=True, with_exceptions=False
+        )
+        # "list" fails when the worktree is not sparse.
+        current = sorted(output.splitlines()) if status == 0 else None
+
+        if not self.sparse_dirs:
+            if current is not None:
+                logger.info("SPARSE_PATHS is empty; disabling sparse checkout.")
+                repo.git.sparse_checkout("disable")
+            return
+        if current == self.sparse_dirs:
+            return
+        logger.info("Applying sparse checkout: %s", ", ".join(self.sparse_dirs))
+        repo.git.sparse_checkout("set", "--cone", *self.sparse_dirs)
+
+    def _object_store_bytes(self, repo=None):
+        """Loose + packed object bytes (`git count-objects -v`)."""
+        output = (repo or self.repo).git.count_objects("-v")
+        stats = dict(line.split(": ", 1) for line in output.splitlines() if ": " in line)
+        return (int(stats.get("size", 0)) + int(stats.get("size-pack", 0))) * 1024
+
+    def _promisor_packs(self):
+        """Packs received from the promisor remote (each lazy blob fetch adds one)."""
+        pack_dir = os.path.join(self.repo.git_dir, "objects", "pack")
         try:
-            # Get list of files in remote branch
-            remote_files_output = self.repo.git.ls_tree("-r", "--name-only", remote_branch_name)
-            remote_files = set(remote_files_output.splitlines()) if remote_files_output else set()
+            return sum(1 for name in os.listdir(pack_dir) if name.endswith(".promisor"))
+        except FileNotFoundError:
+            return 0
 
-            # Get list of untracked files
-            untracked_files_output = self.repo.git.ls_files("--others", "--exclude-standard")
-            untracked_files = set(untracked_files_output.splitlines()) if untracked_files_output else set()
+    def _is_shallow(self):
+        return os.path.exists(os.path.join(self.repo.git_dir, "shallow"))
 
-            # Find intersection
-            conflicting_files = remote_files.intersection(untracked_files)
+    def _reshallow(self, branch_name):
+        """Cut history back to CLONE_DEPTH commits and drop the objects only it used."""
+        logger.info("Re-shallowing history to %d commits...", config.CLONE_DEPTH)
+        self.repo.git.fetch(
+            "--no-tags",
+            f"--depth={config.CLONE_DEPTH}",
+            "origin",
+            f"+refs/heads/{branch_name}:refs/remotes/origin/{branch_name}",
+        )
+        self.repo.git.reflog("expire", "--expire=now", "--all")
+        self.repo.git.gc("-q", "--prune=now")
 
-            if conflicting_files:
-                logger.info("Found %d conflicting untracked files. Removing...", len(conflicting_files))
-                for file_path in conflicting_files:
-                    full_path = os.path.join(self.repo_path, file_path)
-                    try:
-                        if os.path.exists(full_path):
-                            os.remove(full_path)
-                            logger.info("Removed conflicting file: %s", file_path)
-                    except OSError as e:
-                        logger.error("Failed to remove %s: %s", file_path, e)
-            else:
+    def _deepen_until_merge_base(self, remote_ref):
+        """A shallow history may not reach the merge base; deepen step by step."""
+        for _ in range(config.CLONE_DEEPEN_ATTEMPTS):
+            status, _, _ = self.repo.git.merge_base(
+                "HEAD", remote_ref, with_extended_output=True, with_exceptions=False
+            )
+            if status == 0:
+                return
+            logger.info(
+                "Merge base outside shallow history; deepening by %d...", config.CLONE_DEPTH
+            )
+            self.repo.git.fetch("--no-tags", f"--deepen={config.CLONE_DEPTH}", "origin")
+
+    def _incoming_added_paths(self, remote_ref):
+        """Paths in `remote_ref` but not in HEAD: the only ones untracked files can block."""
+        if self.backend.rev_parse("HEAD") is None:
+            # Nothing checked out yet: every remote path is incoming.
+            paths = sorted(self.backend.tree_files(remote_ref))
+        else:
+            output = self.repo.git.diff(
+                "--name-only", "--diff-filter=A", "--no-renames", "-z", "HEAD", remote_ref
+            )
+            paths = [p for p in output.split("\0") if p]
+        # Paths outside the sparse cone are never written, so they cannot conflict.
+        return [p for p in paths if in_cone(p, self.sparse_dirs)]
+
+    def _smart_clean(self, remote_ref):
+        """
+        Removes untracked files that conflict with the remote branch.
+        Only paths added upstream since HEAD are checked against the filesystem, so the
+        cost follows the incoming change, not the vault size.
+        """
+        try:
+            added = self._incoming_added_paths(remote_ref)
+            # An added path that already exists locally can only be untracked.
+            conflicting = [p for p in added if os.path.lexists(os.path.join(self.repo_path, p))]
+            if not conflicting:
                 logger.info("No conflicting untracked files found.")
+                return True
+
+            failed = []
+            for file_path in conflicting:
+                try:
+                    os.remove(os.path.join(self.repo_path, file_path))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    failed.append((file_path, e))
+            logger.info(
+                "Removed %d conflicting untracked files (%d checked).",
+                len(conflicting) - len(failed),
+                len(added),
+            )
+            logger.debug("Conflicting files: %s", conflicting)
+            for file_path, e in failed:
+                logger.error("Failed to remove %s: %s", file_path, e)
 
             return True
         except Exception as e:
@@ -145,85 +283,260 @@ class GitHandler:
             ERRORS_TOTAL.inc()
             return False
 
-    def pull(self):
+    def _setup_tracking(self):
+        """Point the current branch at origin/main (or origin/master); returns the remote ref."""
+        try:
+            # Try to set up tracking with origin/main or origin/master
+            logger.info("No upstream configured, attempting to set tracking branch...")
+
+            # Try main first, then master
+            for candidate in ["main", "master"]:
+                try:
+                    # Already fetched, so origin/candidate exists if the remote has it
+                    self.repo.git.checkout(candidate)
+                    self.repo.git.branch(f"--set-upstream-to=origin/{candidate}", candidate)
+                    logger.info("Set tracking branch to origin/%s", candidate)
+                    return f"origin/{candidate}"
+                except git.exc.GitCommandError:
+                    continue
+        except Exception as e:
+            logger.warning("Could not configure tracking branch: %s", e)
+        # Fallback if detection fails (shouldn't happen if repo exists)
+        return "origin/main"
+
+    def _probe_remote(self, branch_name):
         """
-        Pull the latest changes from the remote repository.
-        Performs smart clean (conflicting files only) and checkout.
+        SHA of `branch_name` on origin via `git ls-remote` (ref advertisement only, no
+        object transfer), or None if the branch does not exist there.
         """
-        if not self.repo:
-            logger.error("Repository not initialized")
-            return False
+        output = self.repo.git.ls_remote("origin", f"refs/heads/{branch_name}")
+        for line in output.splitlines():
+            sha, _, ref = line.partition("\t")
+            if ref == f"refs/heads/{branch_name}":
+                return sha
+        return None
+
+    def _fetch_branch(self, branch_name):
+        """Fetch only `branch_name` into its remote-tracking ref, without tags."""
+        self.repo.git.fetch(
+            "--no-tags",
+            "origin",
+            f"+refs/heads/{branch_name}:refs/remotes/origin/{branch_name}",
+        )
+
+    def _merge_update(self, remote_ref):
+        """Smart clean, discard local edits, then merge `remote_ref` (UPDATE_MODE=merge)."""
+        if self._is_shallow():
+            self._deepen_until_merge_base(remote_ref)
+
+        # Smart Clean: Remove only conflicting untracked files
+        with timed_phase("smart_clean"):
+            self._smart_clean(remote_ref)
+
+        # Discard all local changes to tracked files (Remote wins)
+        logger.info("Running git checkout .")
+        with timed_phase("checkout"):
+            self.repo.git.checkout(".")
+
+        # Merge the fetched remote branch (no second fetch)
+        logger.info("Merging %s...", remote_ref)
+        with timed_phase("merge"):
+            self.repo.git.merge(remote_ref)
+
+    def _incoming_files(self, old, new):
+        """(path, blob oid) of every file `new` writes that `old` does not already have."""
+        if old is None:
+            # "<mode> <type> <oid>\t<path>\0"
+            files = []
+            for entry in self.repo.git.ls_tree("-r", "-z", new).split("\0"):
+                info, _, path = entry.partition("\t")
+                if info:
+                    _, obj_type, oid = info.split(" ")
+                    if obj_type == "blob" and in_cone(path, self.sparse_dirs):
+                        files.append((path, oid))
+            return files
+
+        # Raw entries: ":<old mode> <new mode> <old oid> <new oid> <status>\0<path>\0"
+        output = self.repo.git.diff_tree("-r", "-z", "--no-renames", "--no-commit-id", old, new)
+        fields = output.split("\0")
+        files = []
+        for header, path in zip(fields[0::2], fields[1::2]):
+            if not header:
+                continue
+            _, new_mode, _, new_oid, status = header.split(" ")
+            # Submodule entries (gitlinks) are not written as files.
+            if status != "D" and new_mode != "160000" and in_cone(path, self.sparse_dirs):
+                files.append((path, new_oid))
+        return files
+
+    def _mirror_update(self, remote_ref):
+        """
+        Point the branch, index and working tree at `remote_ref` in one `git reset --hard`
+        (UPDATE_MODE=mirror). git only rewrites entries that differ from the index, so
+        an update costs the files that changed upstream (plus any locally edited ones),
+        and untracked files in the way are simply overwritten.
+        """
+        old = self.backend.rev_parse("HEAD")
+        new = self.backend.rev_parse(remote_ref)
+        if new is None:
+            raise git.exc.BadName(remote_ref)
+        incoming = self._incoming_files(old, new) if old != new else []
+
+        logger.info("Resetting to %s (%d incoming files)...", remote_ref, len(incoming))
+        with timed_phase("reset"):
+            self.repo.git.reset("-q", "--hard", new)
 
+        written_bytes = sum(self.backend.object_size(oid) or 0 for _, oid in incoming)
+        UPDATE_FILES_WRITTEN.observe(len(incoming))
+        UPDATE_BYTES_WRITTEN.observe(written_bytes)
+        recorder.note(files_written=len(incoming), bytes_written=written_bytes)
+        logger.info("Updated %d files (%d bytes).", len(incoming), written_bytes)
+
+    def _pull(self):
+        """One pull as described in `pull()`; git errors propagate."""
+        # 1. Probe the tracked branch; skip the whole pipeline if we already have it
+        tracking = None
         try:
-            # 1. Fetch first to know the state of remote
+            tracking = self.repo.active_branch.tracking_branch()
+        except TypeError:
+            # Detached HEAD
+            pass
+
+        if tracking is not None:
+            remote_ref = tracking.name
+            with timed_phase("probe"):
+                remote_sha = self._probe_remote(tracking.remote_head)
+            recorder.note(remote_sha=remote_sha)
+            if remote_sha is not None and remote_sha == self.backend.rev_parse("HEAD"):
+                logger.info(
+                    "Remote %s unchanged (%s); skipping pull.", remote_ref, remote_sha[:8]
+                )
+                PULL_CYCLES_TOTAL.labels(mode="probe_only").inc()
+                recorder.note(mode="probe_only")
+                # Only (re)create a missing link or one cut for another sparse
+                # cone here, so a manual rollback holds until the remote moves.
+                if self.snapshots is not None and self.snapshots.is_stale():
+                    with timed_phase("publish"):
+                        self.snapshots.publish()
+                LAST_PULL_TIMESTAMP.set(time.time())
+                return True
+
+            logger.info("Fetching %s from remote...", remote_ref)
+            with timed_phase("fetch"):
+                self._fetch_branch(tracking.remote_head)
+            self.full_pulls += 1
+            if (
+                config.CLONE_RESHALLOW_EVERY > 0
+                and self.full_pulls % config.CLONE_RESHALLOW_EVERY == 0
+                and self._is_shallow()
+            ):
+                self._reshallow(tracking.remote_head)
+        else:
+            # 2. First run: fetch everything and configure the tracking branch
             logger.info("Fetching from remote...")
             origin = self.repo.remote(name="origin")
-            origin.fetch()
+            with timed_phase("fetch"):
+                origin.fetch()
+            remote_ref = self._setup_tracking()
+        PULL_CYCLES_TOTAL.labels(mode="full").inc()
+        recorder.note(mode="full")
 
-            # 2. Configure/Get Tracking Branch
-            branch_name = "main" # Default fallback
-            try:
-                branch = self.repo.active_branch
-                tracking = branch.tracking_branch()
-                if tracking:
-                    # tracking is a RemoteReference, e.g. origin/main
-                    # We need the name 'origin/main'
-                    remote_ref = tracking.name
-                else:
-                    # Try to set up tracking with origin/main or origin/master
-                    logger.info("No upstream configured, attempting to set tracking branch...")
-                    
-                    # Try main first, then master
-                    for candidate in ["main", "master"]:
-                        try:
-                            # We already fetched, so we can check if origin/candidate exists
-                            # But checkout/branch logic from before is fine
-                            self.repo.git.checkout(candidate)
-                            self.repo.git.branch(f"--set-upstream-to=origin/{candidate}", candidate)
-                            logger.info("Set tracking branch to origin/%s", candidate)
-                            remote_ref = f"origin/{candidate}"
-                            branch_name = candidate
-                            break
-                        except git.exc.GitCommandError:
-                            continue
-                    else:
-                         # Fallback if detection fails (shouldn't happen if repo exists)
-                         remote_ref = "origin/main"
-            except Exception as e:
-                logger.warning("Could not configure tracking branch: %s", e)
-                remote_ref = "origin/main"
-
-            # 3. Smart Clean: Remove only conflicting untracked files
-            self._smart_clean(remote_ref)
+        # 3. Move the working tree to the remote commit (Remote wins)
+        # Blobs missing from a partial clone are fetched lazily from here on.
+        promisor_packs = self._promisor_packs()
+        old_head = self.backend.rev_parse("HEAD")
+        if config.UPDATE_MODE == "merge":
+            self._merge_update(remote_ref)
+        else:
+            self._mirror_update(remote_ref)
+        if self.snapshots is not None:
+            with timed_phase("publish"):
+                self.snapshots.publish()
+        if old_head is not None:
+            self._observe_propagation(old_head)
+        LAZY_BLOB_FETCHES_TOTAL.inc(max(0, self._promisor_packs() - promisor_packs))
+        OBJECT_STORE_BYTES.set(self._object_store_bytes())
+        logger.info("Pull successful")
 
-            # 4. Discard all local changes to tracked files (Remote wins)
-            logger.info("Running git checkout .")
-            self.repo.git.checkout(".")
-            
-            # 5. Pull (Merge)
-            logger.info("Pulling latest changes from remote...")
-            origin.pull()
-            logger.info("Pull successful")
-
-            PULLS_TOTAL.inc()
-            LAST_PULL_TIMESTAMP.set(time.time())
-            return True
+        PULLS_TOTAL.inc()
+        LAST_PULL_TIMESTAMP.set(time.time())
+        return True
+
+    def pull(self):
+        """
+        Pull the latest changes from the remote repository.
+        Probes the tracked ref first, then fetches it and moves the working tree to it
+        (mirror reset, or smart clean + checkout + merge with UPDATE_MODE=merge).
+        """
+        if not self.repo:
+            logger.error("Repository not initialized")
+            return False
 
+        try:
+            with timed_phase("pull"):
+                return self._pull()
         except git.exc.GitCommandError as e:
             logger.error("Git pull failed: %s", e)
             ERRORS_TOTAL.inc()
+            recorder.fail(e)
             return False
         except Exception as e:
             logger.error("Unexpected error during pull: %s", e)
             ERRORS_TOTAL.inc()
+            recorder.fail(e)
             return False
 
-    def sync(self):
+    def _observe_propagation(self, old_head):
+        """Observe edit/commit-to-visible latency for every commit since `old_head`."""
+        # Author time: the server's pull/push rebase rewrites the committer time of
+        # replayed commits, the author time is when the commit was made.
+        output = self.repo.git.log(
+            "-z",
+            f"-n{PROPAGATION_MAX_COMMITS}",
+            f"--format=%at%x09%(trailers:key={FIRST_CHANGE_TRAILER},valueonly)",
+            f"{old_head}..HEAD",
+        )
+        now = time.time()
+        for record in output.split("\0"):
+            commit_time, _, first_change = record.partition("\t")
+            if not commit_time:
+                continue
+            commit_time = int(commit_time)
+            PROPAGATION_SECONDS.labels(stage="commit_to_visible").observe(
+                max(0.0, now - commit_time)
+            )
+            try:
+                first_change = float(first_change.split()[0])
+            except (IndexError, ValueError):
+                # Not made by sbSync (or by an older version).
+                continue
+            PROPAGATION_SECONDS.labels(stage="edit_to_commit").observe(
+                max(0.0, commit_time - first_change)
+            )
+            PROPAGATION_SECONDS.labels(stage="edit_to_visible").observe(
+                max(0.0, now - first_change)
+            )
+
+    def head(self):
+        """Checked-out commit, or None before the first pull."""
+        return self.backend.rev_parse("HEAD")
+
+    def has_commit(self, sha):
+        """True if `sha` is HEAD or one of its ancestors."""
+        status, _, _ = self.repo.git.merge_base(
+            "--is-ancestor", sha, "HEAD", with_extended_output=True, with_exceptions=False
+        )
+        return status == 0
+
+    def sync(self, trigger=None):
         """
         Main synchronization method: clean, checkout, and pull.
         """
         logger.info("Starting sync operation...")
-        result = self.pull()
+        with recorder.cycle(trigger or "manual"):
+            recorder.note(head_before=self.head())
+            result = self.pull()
+            recorder.note(head_after=self.head())
         if result:
             logger.info("Sync completed successfully")
         else:
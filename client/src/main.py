@@ -1,7 +1,10 @@
 import sys
 import signal
 from src.config import config
-from src.metrics import start_metrics_server
+from src.metrics import register_repo_stats, start_metrics_server
+from src.notify import NOTIFY_PATH, NotifyListener, notify_route
+from src.profiling import debug_routes
+from src.recorder import DEBUG_SYNCS_PATH, debug_syncs_route
 from src.utils import logger
 from src.git_handler import GitHandler
 from src.scheduler import Scheduler
@@ -18,22 +21,40 @@ def main():
         sys.exit(1)
 
     # 2. Start Metrics Server
+    # Also serves the flight recorder of recent pulls (GET /debug/syncs) and, with
+    # NOTIFY_TOKEN set, takes push notifications (POST /notify); with PROFILING_ENABLED
+    # it also serves the profiling routes.
     logger.info("Starting metrics server on port %s", config.METRICS_PORT)
-    start_metrics_server(config.METRICS_PORT)
+    routes = {("GET", DEBUG_SYNCS_PATH): debug_syncs_route, **debug_routes()}
+    listener = None
+    if config.NOTIFY_TOKEN:
+        listener = NotifyListener()
+        routes[("POST", NOTIFY_PATH)] = notify_route(listener)
+    start_metrics_server(config.METRICS_PORT, routes)
 
     # 3. Initialize Git Handler
     git_handler = GitHandler()
     if not git_handler.repo:
         logger.error("Could not initialize Git repository. Exiting.")
         sys.exit(1)
+    # Object, pack and index sizes, refreshed on a background thread.
+    register_repo_stats(git_handler.repo.working_tree_dir)
 
     # 4. Perform Initial Sync
     logger.info("Performing initial sync...")
-    git_handler.sync()
+    git_handler.sync("initial")
 
     # 5. Setup Scheduler
     scheduler = Scheduler(git_handler)
     scheduler.setup()
+    if listener is not None:
+        # A notification starts a pull right away; the interval poll is the fallback.
+        scheduler.on_pulled = lambda: listener.pulled(
+            git_handler.head(), git_handler.has_commit
+        )
+        listener.on_notify = scheduler.request_pull
+        listener.pulled(git_handler.head(), git_handler.has_commit)
+        logger.info("Accepting push notifications on port %s", config.METRICS_PORT)
 
     # 6. Graceful Shutdown
     def signal_handler(_sig, _frame):
@@ -1,4 +1,21 @@
-from prometheus_client import Counter, Gauge, start_http_server
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import git
+from prometheus_client import (
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsHandler,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+from src.config import config
 from src.utils import logger
 
 # Metrics
@@ -8,10 +25,330 @@ LAST_PULL_TIMESTAMP = Gauge(
     "sbsync_client_last_pull_timestamp", "Unix timestamp of last successful pull"
 )
 
+PULL_CYCLES_TOTAL = Counter(
+    "sbsync_client_pull_cycles_total",
+    "Pull cycles by mode: probe_only (remote unchanged, nothing fetched) or full",
+    ["mode"],
+)
+
+UPDATE_FILES_WRITTEN = Histogram(
+    "sbsync_client_update_files_written",
+    "Files written to the working tree by one mirror update",
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000),
+)
+UPDATE_BYTES_WRITTEN = Histogram(
+    "sbsync_client_update_bytes_written",
+    "Bytes of file content written to the working tree by one mirror update",
+    buckets=(0, 1 << 10, 16 << 10, 256 << 10, 1 << 20, 16 << 20, 256 << 20, 1 << 30),
+)
+
+SNAPSHOT_SWAP_SECONDS = Histogram(
+    "sbsync_client_snapshot_swap_seconds",
+    "Time to materialize a snapshot and flip the vault link to it",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+SNAPSHOT_FILES_TOTAL = Counter(
+    "sbsync_client_snapshot_files_total",
+    "Files placed into snapshots, by method (linked from the previous snapshot or written)",
+    ["method"],
+)
+SNAPSHOT_DISK_BYTES = Gauge(
+    "sbsync_client_snapshot_disk_bytes",
+    "Bytes used by all retained snapshots (hardlinked files counted once)",
+)
+SNAPSHOT_OVERHEAD_BYTES = Gauge(
+    "sbsync_client_snapshot_overhead_bytes",
+    "Bytes the retained older snapshots use on top of the current one",
+)
+
+CLONE_SECONDS = Gauge(
+    "sbsync_client_clone_seconds",
+    "Wall time of the bootstrap clone",
+    ["strategy"],
+)
+OBJECT_STORE_BYTES = Gauge(
+    "sbsync_client_object_store_bytes",
+    "Size of the local git object store (loose + packed)",
+)
+LAZY_BLOB_FETCHES_TOTAL = Counter(
+    "sbsync_client_lazy_blob_fetches_total",
+    "On-demand blob fetches from the promisor remote during updates (partial clones)",
+)
+
+GIT_PHASE_SECONDS = Histogram(
+    "sbsync_client_git_phase_seconds",
+    "Wall time of each phase of a pull"
+    " (pull, probe, fetch, smart_clean, checkout, merge, reset, publish)",
+    ["phase", "outcome"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+GIT_PHASE_ERRORS_TOTAL = Counter(
+    "sbsync_client_git_phase_errors_total",
+    "Failed pull phases by error class (auth, network, non_fast_forward, lock, conflict, other)",
+    ["phase", "error_class"],
+)
+
+PROPAGATION_SECONDS = Histogram(
+    "sbsync_client_propagation_seconds",
+    "Per pulled commit: edit_to_commit (first change to server commit), commit_to_visible"
+    " and edit_to_visible (until checked out or published here); push_to_visible for"
+    " notified pushes. Spans two hosts, so clock skew adds to the cross-host stages",
+    ["stage"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 21600),
+)
+
+NOTIFY_RECEIVED_TOTAL = Counter(
+    "sbsync_client_notify_received_total",
+    "Push notifications received, by result (accepted, duplicate, unauthorized, invalid)",
+    ["result"],
+)
+NOTIFY_TO_PULLED_SECONDS = Histogram(
+    "sbsync_client_notify_to_pulled_seconds",
+    "Time from a push notification until the notified commit was checked out",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+
+REPO_STATS_PREFIX = "sbsync_client_repo"
+# (name, help) of the gauges RepoStatsCollector exports, in collection order.
+REPO_STATS = (
+    ("loose_objects", "Loose objects in .git/objects (git count-objects)"),
+    ("packs", "Pack files in .git/objects/pack"),
+    ("pack_bytes", "On-disk size of all pack files"),
+    ("index_bytes", "Size of .git/index, plus the shared index when split"),
+    ("index_entries", "Entries in the index"),
+    (
+        "commits_since_maintenance",
+        "Commits on HEAD newer than the last commit-graph write (gc / maintenance)",
+    ),
+    (
+        "untracked_entries",
+        "Untracked, non-ignored entries as `git status` lists them: an untracked "
+        "directory is one entry and its files are not walked",
+    ),
+    (
+        "worktree_entries",
+        "Index entries inside the sparse cone plus untracked entries "
+        "(a lower bound on working-tree files)",
+    ),
+    ("stats_collect_seconds", "Wall time of the last repository statistics refresh"),
+)
+
+
+class RepoStatsCollector:
+    """
+    Repository size and health gauges, recomputed every `ttl` seconds on a
+    background thread (`start()`). A scrape only serves the last values, so a slow
+    vault (a large Drive mount) never blocks or times out /metrics.
+
+    Only cheap git plumbing is used: `count-objects -v` (one readdir per loose
+    object fan-out directory), `ls-files -t` (reads the index, no stat; skip-worktree
+    entries outside the sparse cone are not counted as working-tree files), a `stat`
+    of the index and commit-graph files, and one `status`, which only walks the
+    checked-out cone. Commands run with --no-optional-locks so a scrape never takes
+    index.lock from a pull.
+    """
+
+    def __init__(self, repo_path, ttl=None, prefix=REPO_STATS_PREFIX):
+        self.repo_path = repo_path
+        self.ttl = config.REPO_STATS_TTL_SECONDS if ttl is None else ttl
+        self.prefix = prefix
+        # Own Git instance: scrapes run on the metrics thread, never on the
+        # handler's repo (shared cat-file coprocesses, flight recorder).
+        self._git = git.Git(repo_path)
+        self._lock = threading.Lock()
+        self._values = None
+        self._stopped = threading.Event()
+
+    def _run(self, *args):
+        return self._git.execute(["git", "--no-optional-locks", *args])
+
+    def _git_dir(self):
+        return os.path.join(self.repo_path, self._run("rev-parse", "--git-dir"))
+
+    def _index_bytes(self, git_dir):
+        size = os.path.getsize(os.path.join(git_dir, "index"))
+        shared = [
+            os.path.join(git_dir, name)
+            for name in os.listdir(git_dir)
+            if name.startswith("sharedindex.")
+        ]
+        if shared:
+            size += os.path.getsize(max(shared, key=os.path.getmtime))
+        return size
+
+    def _last_maintenance(self, git_dir):
+        """mtime of the commit-graph, which gc and `git maintenance` rewrite."""
+        info = os.path.join(git_dir, "objects", "info")
+        times = []
+        for path in (
+            os.path.join(info, "commit-graph"),
+            os.path.join(info, "commit-graphs", "commit-graph-chain"),
+        ):
+            try:
+                times.append(os.path.getmtime(path))
+            except OSError:
+                pass
+        return max(times, default=None)
+
+    def _commits_since(self, since):
+        args = ["rev-list", "--count"]
+        if since is not None:
+            # rev-list stops walking once it is past `since`, so this is O(new commits).
+            # Commits stamped in the second of the graph write are taken as covered.
+            args.append(f"--since={int(since) + 1}")
+        status, out, _ = self._git.execute(
+            ["git", "--no-optional-locks", *args, "HEAD"],
+            with_extended_output=True,
+            with_exceptions=False,
+        )
+        return int(out) if status == 0 and out else 0
+
+    def _collect_values(self):
+        git_dir = self._git_dir()
+        objects = {}
+        for line in self._run("count-objects", "-v").splitlines():
+            key, _, value = line.partition(":")
+            objects[key.strip()] = int(value)
+
+        entries = [e for e in self._run("ls-files", "-t", "-z").split("\0") if e]
+        checked_out = sum(1 for e in entries if not e.startswith("S "))
+        status = self._run("status", "--porcelain", "-z", "--untracked-files=normal")
+        untracked = sum(1 for e in status.split("\0") if e.startswith("?? "))
+
+        return {
+            "loose_objects": objects.get("count", 0),
+            "packs": objects.get("packs", 0),
+            "pack_bytes": objects.get("size-pack", 0) * 1024,
+            "index_bytes": self._index_bytes(git_dir),
+            "index_entries": len(entries),
+            "commits_since_maintenance": self._commits_since(
+                self._last_maintenance(git_dir)
+            ),
+            "untracked_entries": untracked,
+            "worktree_entries": checked_out + untracked,
+        }
+
+    def refresh(self):
+        """Recompute the statistics; on failure the last good values are kept."""
+        started = time.monotonic()
+        try:
+            values = self._collect_values()
+        except (git.exc.GitCommandError, OSError, ValueError) as e:
+            # Keep serving the last good values; retry after the next ttl.
+            logger.warning("Repository statistics unavailable: %s", e)
+            return
+        values["stats_collect_seconds"] = time.monotonic() - started
+        with self._lock:
+            self._values = values
+
+    def values(self):
+        """Statistics of the last refresh, or None before the first one."""
+        with self._lock:
+            return self._values
+
+    def start(self):
+        """Refresh now and then every `ttl` seconds on a daemon thread."""
+        threading.Thread(target=self._refresh_loop, name="repo-stats", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _refresh_loop(self):
+        while True:
+            self.refresh()
+            if self._stopped.wait(self.ttl):
+                return
+
+    def describe(self):
+        # Lets the registry learn the metric names without running git at register time.
+        return [GaugeMetricFamily(f"{self.prefix}_{name}", doc) for name, doc in REPO_STATS]
+
+    def collect(self):
+        values = self.values()
+        if values is None:
+            return
+        for name, doc in REPO_STATS:
+            yield GaugeMetricFamily(f"{self.prefix}_{name}", doc, value=values[name])
+
+
+def register_repo_stats(repo_path, registry=REGISTRY):
+    """Export RepoStatsCollector gauges for `repo_path` (REPO_STATS_TTL_SECONDS=0: off)."""
+    collector = RepoStatsCollector(repo_path)
+    if collector.ttl <= 0:
+        return None
+    registry.register(collector)
+    return collector.start()
+
+
+class RoutedMetricsHandler(MetricsHandler):
+    """
+    Serves the metrics on every GET path, plus `routes`:
+    {(method, path): fn(request) -> (status, content_type, body)}. `request` is the
+    handler itself, with the parsed query string in `request.query`.
+    """
+
+    routes = {}
+
+    def _route(self, method):
+        path, _, query = self.path.partition("?")
+        fn = self.routes.get((method, path))
+        if fn is None:
+            return False
+        self.query = parse_qs(query)
+        try:
+            status, content_type, body = fn(self)
+        except Exception as e:
+            logger.error("%s %s failed: %s", method, path, e)
+            status, content_type, body = 500, "text/plain; charset=utf-8", f"{e}\n"
+        self.send_reply(status, content_type, body)
+        return True
+
+    def send_reply(self, status, content_type, body):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self._route("GET"):
+            super().do_GET()
+
+    def do_POST(self):
+        if not self._route("POST"):
+            self.send_reply(404, "text/plain; charset=utf-8", "not found\n")
+
+
+def json_reply(data, status=200):
+    """A route result carrying `data` as JSON."""
+    return status, "application/json", json.dumps(data, indent=1, default=str)
+
+
+def text_reply(text, status=200):
+    return status, "text/plain; charset=utf-8", text
+
 
-def start_metrics_server(port):
+def start_metrics_server(port, routes=None):
+    """
+    Serve /metrics on `port`. `routes` (see RoutedMetricsHandler) adds endpoints next
+    to the metrics, e.g. the push notify endpoint and the debug routes.
+    """
     try:
-        start_http_server(port)
+        if not routes:
+            start_http_server(port)
+        else:
+            handler_class = type(
+                "RoutedMetricsHandler", (RoutedMetricsHandler,), {"routes": dict(routes)}
+            )
+            httpd = ThreadingHTTPServer(("", port), handler_class)
+            httpd.daemon_threads = True
+            threading.Thread(
+                target=httpd.serve_forever, name="metrics-http", daemon=True
+            ).start()
         logger.info("Metrics server started on port %s", port)
     except Exception as e:
         logger.error("Failed to start metrics server: %s", e)
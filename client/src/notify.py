@@ -0,0 +1,104 @@
+import hmac
+import json
+import threading
+import time
+
+from src.config import config
+from src.metrics import (
+    NOTIFY_RECEIVED_TOTAL,
+    NOTIFY_TO_PULLED_SECONDS,
+    PROPAGATION_SECONDS,
+    text_reply,
+)
+from src.utils import logger
+
+NOTIFY_PATH = "/notify"
+# Notifications whose commit never shows up locally are forgotten after this long.
+PENDING_TTL_SECONDS = 3600
+
+
+class NotifyListener:
+    """
+    Turns push notifications from the sbSync server into immediate pulls.
+
+    `receive(sha)` is called from the HTTP thread: a commit that is already checked
+    out, or already waiting for a pull, is a duplicate and ignored; anything else
+    calls `on_notify` (the scheduler's pull trigger). After each pull the scheduler
+    reports the new HEAD through `pulled()`, which observes notify-to-pulled latency
+    for every notified commit the pull brought in.
+    """
+
+    def __init__(self, on_notify=None):
+        self.on_notify = on_notify
+        self._lock = threading.Lock()
+        self._current = None
+        # sha -> (monotonic time the notification arrived, server push time or None)
+        self._pending = {}
+
+    def receive(self, sha, pushed_at=None):
+        """
+        Record a notification (`pushed_at`: the server's push time, Unix seconds).
+        Returns False if it was a duplicate.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if sha == self._current or sha in self._pending:
+                NOTIFY_RECEIVED_TOTAL.labels(result="duplicate").inc()
+                return False
+            self._pending[sha] = (now, pushed_at)
+        NOTIFY_RECEIVED_TOTAL.labels(result="accepted").inc()
+        logger.info("Push notification for %s; pulling now.", sha[:8])
+        if self.on_notify is not None:
+            self.on_notify()
+        return True
+
+    def pulled(self, head, contains):
+        """
+        Note that `head` is checked out. `contains(sha)` tells whether a notified
+        commit is part of it (the remote may have moved past the notified commit).
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._current = head
+            pending = list(self._pending.items())
+        for sha, (received, pushed_at) in pending:
+            if head is not None and (sha == head or contains(sha)):
+                NOTIFY_TO_PULLED_SECONDS.observe(now - received)
+                if pushed_at is not None:
+                    PROPAGATION_SECONDS.labels(stage="push_to_visible").observe(
+                        max(0.0, time.time() - pushed_at)
+                    )
+            elif now - received < PENDING_TTL_SECONDS:
+                continue
+            with self._lock:
+                self._pending.pop(sha, None)
+
+
+def notify_route(listener, token=None):
+    """
+    Metrics server route for `POST /notify` with a JSON body `{"sha": ...}` and
+    `Authorization: Bearer <token>`.
+    """
+    token = config.NOTIFY_TOKEN if token is None else token
+
+    def handle(request):
+        auth = request.headers.get("Authorization", "")
+        if not token or not hmac.compare_digest(auth.encode(), f"Bearer {token}".encode()):
+            NOTIFY_RECEIVED_TOTAL.labels(result="unauthorized").inc()
+            return text_reply("unauthorized\n", 401)
+        try:
+            length = int(request.headers.get("Content-Length") or 0)
+            body = json.loads(request.rfile.read(length))
+            sha = body["sha"]
+            if not isinstance(sha, str) or not sha:
+                raise ValueError(sha)
+            pushed_at = body.get("pushed_at")
+            pushed_at = float(pushed_at) if pushed_at is not None else None
+        except (ValueError, KeyError, TypeError, AttributeError):
+            NOTIFY_RECEIVED_TOTAL.labels(result="invalid").inc()
+            return text_reply('expected {"sha": ...}\n', 400)
+        if listener.receive(sha, pushed_at):
+            return text_reply("accepted\n", 202)
+        return text_reply("duplicate\n", 200)
+
+    return handle
@@ -0,0 +1,76 @@
+import time
+from contextlib import contextmanager
+
+import git
+
+from src.metrics import GIT_PHASE_ERRORS_TOTAL, GIT_PHASE_SECONDS
+from src.recorder import recorder
+
+# (error class, lowercase markers in git's output), first match wins.
+_ERROR_CLASSES = (
+    ("non_fast_forward", ("non-fast-forward", "fetch first", "[rejected]")),
+    (
+        "auth",
+        (
+            "authentication failed",
+            "permission denied",
+            "could not read username",
+            "invalid username or password",
+            "host key verification failed",
+            "the requested url returned error: 401",
+            "the requested url returned error: 403",
+        ),
+    ),
+    ("lock", ("index.lock", ".lock': file exists", "another git process")),
+    (
+        "network",
+        (
+            "could not resolve host",
+            "connection refused",
+            "connection timed out",
+            "operation timed out",
+            "network is unreachable",
+            "connection reset",
+            "early eof",
+            "the remote end hung up",
+            "could not read from remote repository",
+            "does not appear to be a git repository",
+        ),
+    ),
+    ("conflict", ("conflict",)),
+)
+
+
+def classify_error(error):
+    """Error class of a failed git call: auth, network, non_fast_forward, lock, conflict or other."""
+    if isinstance(error, git.exc.GitCommandError):
+        text = f"{error.stderr or ''}{error.stdout or ''}".lower()
+    else:
+        text = str(error).lower()
+    for error_class, markers in _ERROR_CLASSES:
+        if any(marker in text for marker in markers):
+            return error_class
+    return "other"
+
+
+@contextmanager
+def timed_phase(phase):
+    """
+    Time one phase of a pull into `sbsync_client_git_phase_seconds{phase, outcome}`.
+    A phase that raises is observed with outcome="error", counted by error class in
+    `sbsync_client_git_phase_errors_total`, and the exception propagates unchanged.
+    The phase is also appended to the flight recorder's current cycle.
+    """
+    started = time.monotonic()
+    try:
+        yield
+    except Exception as e:
+        seconds = time.monotonic() - started
+        error_class = classify_error(e)
+        GIT_PHASE_SECONDS.labels(phase=phase, outcome="error").observe(seconds)
+        GIT_PHASE_ERRORS_TOTAL.labels(phase=phase, error_class=error_class).inc()
+        recorder.phase(phase, seconds, error_class)
+        raise
+    seconds = time.monotonic() - started
+    GIT_PHASE_SECONDS.labels(phase=phase, outcome="ok").observe(seconds)
+    recorder.phase(phase, seconds, "ok")
@@ -1,35 +1,56 @@
-import schedule
-import time
+import threading
 from src.utils import logger
 from src.config import config
+from src.timers import default_scheduler
 
 
 class Scheduler:
-    def __init__(self, git_handler):
+    def __init__(self, git_handler, timers=None):
         self.git_handler = git_handler
+        self.timers = timers or default_scheduler()
         self.running = False
+        self._pull_due = threading.Event()
+        # What asked for the pending pull ("interval" or "notify").
+        self._reason = None
+        self._timer = None
+        # Called after every pull (e.g. to observe notify-to-pulled latency).
+        self.on_pulled = None
 
     def setup(self):
         """Setup the periodic pull schedule."""
         interval = config.PULL_INTERVAL_MINUTES
-        schedule.every(interval).minutes.do(self._pull_job)
+        # The timer thread only flags that a pull is due; the pull runs in run().
+        self._timer = self.timers.call_every(interval * 60, lambda: self.request_pull("interval"))
         logger.info("Scheduled git pull every %d minutes", interval)
 
-    def _pull_job(self):
+    def request_pull(self, reason="notify"):
+        """Pull as soon as possible (thread-safe); requests during a pull queue one more."""
+        self._reason = self._reason or reason
+        self._pull_due.set()
+
+    def _pull_job(self, reason):
         """Job to be executed on schedule."""
-        logger.info("Scheduled pull triggered")
-        self.git_handler.sync()
+        logger.info("Scheduled pull triggered (%s)", reason)
+        self.git_handler.sync(reason)
+        if self.on_pulled is not None:
+            self.on_pulled()
 
     def run(self):
-        """Run the scheduler loop."""
+        """Run the scheduler loop, sleeping until a pull is due."""
         self.running = True
         logger.info("Starting scheduler loop...")
 
         while self.running:
-            schedule.run_pending()
-            time.sleep(1)
+            self._pull_due.wait()
+            self._pull_due.clear()
+            reason, self._reason = self._reason or "interval", None
+            if self.running:
+                self._pull_job(reason)
 
     def stop(self):
         """Stop the scheduler."""
         self.running = False
+        if self._timer is not None:
+            self._timer.cancel()
+        self._pull_due.set()
         logger.info("Scheduler stopped")
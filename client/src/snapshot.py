@@ -0,0 +1,297 @@
+import hashlib
+import os
+import pickle
+import shutil
+import stat
+import time
+
+from src.config import config
+from src.metrics import (
+    SNAPSHOT_DISK_BYTES,
+    SNAPSHOT_FILES_TOTAL,
+    SNAPSHOT_OVERHEAD_BYTES,
+    SNAPSHOT_SWAP_SECONDS,
+)
+from src.sparse import in_cone
+from src.utils import logger
+
+STAGING_PREFIX = ".staging-"
+# Next to each snapshot directory: {path: (size, mtime_ns, inode)} of its files.
+MANIFEST_SUFFIX = ".manifest"
+
+
+class SnapshotManager:
+    """
+    Publishes each checked-out commit as an immutable snapshot directory and flips a
+    symlink (`link_path`, the folder Obsidian opens) to it with one atomic rename.
+
+    Files that did not change since the previous snapshot are hardlinked from it, so a
+    snapshot only costs the changed files plus directory entries. Snapshots are named
+    after their commit; the previous ones (`keep` in total) remain for `rollback()`.
+    Snapshot files share inodes and must be treated as read-only. A file written in
+    place anyway (Obsidian's workspace.json, a manual edit) no longer matches the
+    size/mtime recorded in the snapshot's manifest, so it is rewritten from its blob
+    instead of being linked into the next snapshot.
+    """
+
+    def __init__(
+        self, repo, backend, snapshot_dir=None, link_path=None, keep=None, sparse_dirs=None
+    ):
+        self.repo = repo
+        self.backend = backend
+        self.snapshot_dir = snapshot_dir or config.SNAPSHOT_DIR
+        self.link_path = link_path or config.SNAPSHOT_LINK
+        self.keep = max(2, keep if keep is not None else config.SNAPSHOT_KEEP)
+        # Only the sparse cone is published, like the working tree.
+        self.sparse_dirs = sparse_dirs or []
+        # Manifests read so far, by snapshot name.
+        self._manifests = {}
+
+    def _cone(self):
+        """Short digest of the sparse cone ("" when not sparse)."""
+        if not self.sparse_dirs:
+            return ""
+        return hashlib.sha1("\0".join(self.sparse_dirs).encode()).hexdigest()[:8]
+
+    def _key(self, commit):
+        """Snapshot directory name: the commit, plus the sparse cone it was cut with."""
+        cone = self._cone()
+        return f"{commit}-{cone}" if cone else commit
+
+    def is_stale(self):
+        """True if nothing is published yet or the link shows a different sparse cone."""
+        current = self.current()
+        return current is None or current.partition("-")[2] != self._cone()
+
+    def current(self):
+        """Snapshot (directory name) the link currently points to, or None."""
+        try:
+            return os.path.basename(os.readlink(self.link_path))
+        except OSError:
+            return None
+
+    def _path(self, key):
+        return os.path.join(self.snapshot_dir, key)
+
+    def _manifest_path(self, key):
+        return os.path.join(self.snapshot_dir, key + MANIFEST_SUFFIX)
+
+    def _manifest(self, key):
+        """{path: (size, mtime_ns, inode)} recorded when `key` was materialized, or None."""
+        manifest = self._manifests.get(key)
+        if manifest is None:
+            try:
+                with open(self._manifest_path(key), "rb") as f:
+                    manifest = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError) as e:
+                logger.debug("No manifest for snapshot %s: %s", key[:8], e)
+                return None
+            self._manifests[key] = manifest
+        return manifest
+
+    def _save_manifest(self, key, manifest):
+        path = self._manifest_path(key)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "wb") as f:
+            pickle.dump(manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._manifests[key] = manifest
+
+    def _snapshots(self):
+        """Published snapshot names, newest first."""
+        try:
+            entries = [
+                e for e in os.scandir(self.snapshot_dir)
+                if e.is_dir(follow_symlinks=False) and not e.name.startswith(STAGING_PREFIX)
+            ]
+        except FileNotFoundError:
+            return []
+        entries.sort(key=lambda e: e.stat(follow_symlinks=False).st_mtime, reverse=True)
+        return [e.name for e in entries]
+
+    def publish(self, commit=None):
+        """
+        Materialize `commit` (default HEAD) and point the link at it.
+        Returns True if the link moved.
+        """
+        commit = commit or self.backend.rev_parse("HEAD")
+        if commit is None:
+            return False
+        key = self._key(commit)
+        if key == self.current():
+            return False
+
+        started = time.monotonic()
+        if not os.path.isdir(self._path(key)):
+            self._materialize(commit, key)
+        self._flip(key)
+        SNAPSHOT_SWAP_SECONDS.observe(time.monotonic() - started)
+        logger.info("Published snapshot %s at %s", key[:8], self.link_path)
+
+        self._prune()
+        total, overhead = self.disk_usage()
+        SNAPSHOT_DISK_BYTES.set(total)
+        SNAPSHOT_OVERHEAD_BYTES.set(overhead)
+        return True
+
+    def rollback(self):
+        """Point the link back at the previous snapshot. Returns its name or None."""
+        current = self.current()
+        previous = next((c for c in self._snapshots() if c != current), None)
+        if previous is None:
+            logger.warning("No previous snapshot to roll back to.")
+            return None
+        self._flip(previous)
+        logger.info("Rolled back %s to snapshot %s", self.link_path, previous[:8])
+        return previous
+
+    def _tree_entries(self, commit):
+        """(mode, oid, path) for every blob of `commit` in the sparse cone."""
+        output = self.repo.git.ls_tree("-r", "-z", "--full-tree", commit)
+        entries = []
+        for entry in output.split("\0"):
+            info, _, path = entry.partition("\t")
+            if info:
+                mode, obj_type, oid = info.split(" ")
+                if obj_type == "blob" and in_cone(path, self.sparse_dirs):
+                    entries.append((mode, oid, path))
+        return entries
+
+    def _changed_paths(self, base, commit):
+        output = self.repo.git.diff_tree(
+            "-r", "-z", "--name-only", "--no-renames", "--no-commit-id", base, commit
+        )
+        return {p for p in output.split("\0") if p}
+
+    def _materialize(self, commit, key):
+        base = self.current()
+        if base is not None and not os.path.isdir(self._path(base)):
+            base = None
+        # Without a manifest (published by an older version) the base cannot be checked.
+        base_files = self._manifest(base) if base is not None else None
+        if base_files is None:
+            base = None
+        # The base snapshot's commit is the first part of its name.
+        changed = self._changed_paths(base.split("-")[0], commit) if base is not None else None
+
+        staging = os.path.join(self.snapshot_dir, STAGING_PREFIX + key)
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        manifest = {}
+        linked = written = edited = 0
+        made_dirs = {staging}
+        for mode, _oid, path in self._tree_entries(commit):
+            dst = os.path.join(staging, path)
+            parent = os.path.dirname(dst)
+            if parent not in made_dirs:
+                os.makedirs(parent, exist_ok=True)
+                made_dirs.add(parent)
+
+            if changed is not None and path not in changed:
+                src = os.path.join(self._path(base), path)
+                recorded = base_files.get(path)
+                try:
+                    st = os.lstat(src)
+                    current = (st.st_size, st.st_mtime_ns, st.st_ino)
+                except OSError:
+                    # Missing in the base (other cone, deleted by hand): write it.
+                    current = None
+                if current is not None and current == recorded:
+                    try:
+                        os.link(src, dst, follow_symlinks=False)
+                        manifest[path] = recorded
+                        linked += 1
+                        continue
+                    except OSError:
+                        # Another filesystem: write it.
+                        pass
+                elif current is not None and recorded is not None:
+                    # Written in place since it was published: rewrite it from the blob.
+                    edited += 1
+
+            data = self.backend.read_blob(commit, path) or b""
+            if mode == "120000":
+                os.symlink(os.fsdecode(data), dst)
+            else:
+                with open(dst, "wb") as f:
+                    f.write(data)
+                if mode == "100755":
+                    executable = stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+                    os.chmod(dst, os.stat(dst).st_mode | executable)
+            st = os.lstat(dst)
+            manifest[path] = (st.st_size, st.st_mtime_ns, st.st_ino)
+            written += 1
+
+        os.rename(staging, self._path(key))
+        self._save_manifest(key, manifest)
+        if edited:
+            logger.warning(
+                "%d files of snapshot %s were changed in place; rewrote them from git.",
+                edited,
+                base[:8],
+            )
+        SNAPSHOT_FILES_TOTAL.labels(method="linked").inc(linked)
+        SNAPSHOT_FILES_TOTAL.labels(method="written").inc(written)
+        logger.info(
+            "Materialized snapshot %s: %d files written, %d hardlinked.",
+            commit[:8],
+            written,
+            linked,
+        )
+
+    def _flip(self, key):
+        """Atomically repoint the link: create a temporary symlink, rename it over."""
+        # Relative, so the link also resolves on the host side of a bind mount.
+        link_dir = os.path.dirname(os.path.abspath(self.link_path))
+        target = os.path.relpath(self._path(key), link_dir)
+        tmp = f"{self.link_path}.tmp-{os.getpid()}"
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        os.symlink(target, tmp)
+        os.replace(tmp, self.link_path)
+        # Newest-first ordering for pruning/rollback follows publish order.
+        os.utime(self._path(key))
+
+    def _prune(self):
+        current = self.current()
+        for key in self._snapshots()[self.keep:]:
+            if key != current:
+                shutil.rmtree(self._path(key), ignore_errors=True)
+                try:
+                    os.remove(self._manifest_path(key))
+                except FileNotFoundError:
+                    pass
+                self._manifests.pop(key, None)
+                logger.info("Removed old snapshot %s", key[:8])
+
+    def disk_usage(self):
+        """
+        (total, overhead) bytes used by the snapshots, counting hardlinked files once.
+        Overhead is what the retained older snapshots add on top of the current one.
+        Computed from the manifests (sizes and inodes recorded at materialize time),
+        so no snapshot is walked; snapshots without a manifest are not counted.
+        """
+        current = self.current()
+        seen = set()
+        usage = {True: 0, False: 0}
+        # The current snapshot first, so files it shares are not counted as overhead.
+        for key in sorted(self._snapshots(), key=lambda k: k != current):
+            for size, _mtime_ns, inode in (self._manifest(key) or {}).values():
+                if inode not in seen:
+                    seen.add(inode)
+                    usage[key == current] += size
+        return usage[True] + usage[False], usage[False]
+
+def main():
+    """`python -m src.snapshot rollback`: point SNAPSHOT_LINK back at the previous snapshot."""
+    import sys
+
+    if sys.argv[1:] != ["rollback"] or not config.SNAPSHOT_LINK:
+        print("usage: SNAPSHOT_LINK=... python -m src.snapshot rollback", file=sys.stderr)
+        sys.exit(2)
+    sys.exit(0 if SnapshotManager(None, None).rollback() else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+from src.config import config
+
+
+def sparse_dirs(paths=None):
+    """Cone-mode directories from SPARSE_PATHS (normalized, no leading/trailing slashes)."""
+    paths = config.SPARSE_PATHS if paths is None else paths
+    return sorted({p.strip().strip("/") for p in paths if p.strip().strip("/")})
+
+
+def in_cone(path, dirs):
+    """
+    True if `path` is materialized by a cone-mode sparse checkout of `dirs`.
+    Cone mode always includes files at the top level and directly inside every parent
+    of a cone directory; an empty `dirs` means no sparse checkout (everything).
+    """
+    if not dirs or "/" not in path:
+        return True
+    parent = path.rsplit("/", 1)[0] + "/"
+    return any(path.startswith(d + "/") or (d + "/").startswith(parent) for d in dirs)
@@ -0,0 +1,155 @@
+import heapq
+import itertools
+import threading
+import time
+
+from src.utils import logger
+
+
+class TimerHandle:
+    """A callback registered with a `TimerScheduler`.
+
+    `reschedule()` to a later deadline only updates the handle; the heap entry is
+    re-queued when it comes due, so postponing a debounce timer on every file
+    event is O(1).
+    """
+
+    __slots__ = ("_scheduler", "callback", "interval", "deadline", "_queued", "cancelled")
+
+    def __init__(self, scheduler, callback, deadline, interval=None):
+        self._scheduler = scheduler
+        self.callback = callback
+        self.interval = interval
+        self.deadline = deadline
+        # Deadline of this handle's live heap entry, or None when not queued.
+        self._queued = None
+        self.cancelled = False
+
+    @property
+    def active(self):
+        return not self.cancelled and self._queued is not None
+
+    def reschedule(self, delay):
+        self._scheduler._reschedule(self, time.monotonic() + delay)
+
+    def cancel(self):
+        self._scheduler._cancel(self)
+
+
+class TimerScheduler:
+    """Runs every timer of the process from one thread, sleeping until the next deadline.
+
+    Callbacks run on the timer thread and must be short; long work (a sync, a
+    pull, a mount check) should be handed off to another thread or an Event.
+    """
+
+    def __init__(self, name="timers"):
+        self.name = name
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._thread = None
+        self._stopped = False
+
+    def call_later(self, delay, callback):
+        return self._add(TimerHandle(self, callback, time.monotonic() + delay))
+
+    def call_every(self, interval, callback, first_delay=None):
+        """Run `callback` every `interval` seconds (measured from the end of each run)."""
+        delay = interval if first_delay is None else first_delay
+        return self._add(TimerHandle(self, callback, time.monotonic() + delay, interval))
+
+    def _add(self, handle):
+        with self._cond:
+            self._push(handle, handle.deadline)
+            self._ensure_thread()
+            self._cond.notify()
+        return handle
+
+    def _push(self, handle, deadline):
+        handle._queued = deadline
+        heapq.heappush(self._heap, (deadline, next(self._seq), handle))
+
+    def _reschedule(self, handle, deadline):
+        with self._cond:
+            if handle.cancelled:
+                return
+            handle.deadline = deadline
+            if handle._queued is None:
+                self._push(handle, deadline)
+            elif deadline < handle._queued:
+                # Earlier than the queued entry: that entry goes stale.
+                self._push(handle, deadline)
+            else:
+                return
+            self._ensure_thread()
+            self._cond.notify()
+
+    def _cancel(self, handle):
+        with self._cond:
+            handle.cancelled = True
+            handle._queued = None
+
+    def _ensure_thread(self):
+        self._stopped = False
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _next_due(self):
+        """Pop the next due handle, or wait. Called with the lock held."""
+        while not self._stopped:
+            if not self._heap:
+                self._cond.wait()
+                continue
+            deadline, _, handle = self._heap[0]
+            if handle.cancelled or handle._queued != deadline:
+                heapq.heappop(self._heap)
+                continue
+            now = time.monotonic()
+            if deadline > now:
+                self._cond.wait(deadline - now)
+                continue
+            heapq.heappop(self._heap)
+            if handle.deadline > deadline:
+                # Postponed since it was queued.
+                self._push(handle, handle.deadline)
+                continue
+            handle._queued = None
+            return handle
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                handle = self._next_due()
+            if handle is None:
+                return
+            try:
+                handle.callback()
+            except Exception:
+                logger.exception("Timer callback %r failed", handle.callback)
+            if handle.interval is not None:
+                with self._cond:
+                    if not handle.cancelled and handle._queued is None:
+                        handle.deadline = time.monotonic() + handle.interval
+                        self._push(handle, handle.deadline)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._cond.notify_all()
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler():
+    """The process-wide timer thread (pull schedule and future timers)."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = TimerScheduler()
+        return _default_scheduler
@@ -0,0 +1,80 @@
+"""공용 test helper와 fixture — bare remote + 이를 push하는 작성자 clone, sbSync client vault"""
+
+import os
+
+import git
+import pytest
+
+from src.config import config
+from src.git_handler import GitHandler
+
+# 초기 커밋: top-level 파일 + 두 폴더 (sparse cone 테스트용)
+INITIAL_FILES = {
+    "top.md": "top\n",
+    "notes/a.md": "alpha\n",
+    "notes/b.md": "beta\n",
+    "projects/p.md": "plan\n",
+}
+
+
+def write(root, rel, content="x"):
+    """Write `content` to `root/rel`, creating parent directories; returns the full path."""
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def push(repo, files, message="update"):
+    """Write `files` ({rel: content}), commit and push to origin/main; returns the commit."""
+    for rel, content in files.items():
+        write(repo.working_tree_dir, rel, content)
+    repo.git.add("-A")
+    repo.git.commit("-q", "-m", message)
+    repo.git.push("-q", "origin", "main")
+    return repo.head.commit.hexsha
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    """bare remote(file:// URL) + 초기 커밋을 push한 작성자 clone"""
+    bare = str(tmp_path / "remote.git")
+    bare_repo = git.Repo.init(bare, bare=True, initial_branch="main")
+    with bare_repo.config_writer() as cw:
+        # partial clone(--filter)과 이후의 lazy blob fetch 허용
+        cw.set_value("uploadpack", "allowFilter", "true")
+        cw.set_value("uploadpack", "allowAnySHA1InWant", "true")
+    # 로컬 경로는 --depth/--filter를 무시하므로 file:// 로 clone한다
+    url = f"file://{bare}"
+    monkeypatch.setattr(config, "GIT_REMOTE_URL", url)
+
+    writer = git.Repo.init(str(tmp_path / "writer"), initial_branch="main")
+    with writer.config_writer() as cw:
+        cw.set_value("user", "name", "writer")
+        cw.set_value("user", "email", "writer@example.com")
+    writer.create_remote("origin", url)
+    push(writer, INITIAL_FILES, "init")
+    return url, writer
+
+
+@pytest.fixture
+def make_client(remote, tmp_path):
+    """현재 config로 `remote`를 clone하는 client GitHandler를 만든다 (`make_client(name)`)"""
+    handlers = []
+
+    def make(name="vault"):
+        handler = GitHandler(repo_path=str(tmp_path / name))
+        assert handler.repo is not None
+        handlers.append(handler)
+        return handler
+
+    yield make
+    for handler in handlers:
+        handler.backend.close()
+
+
+@pytest.fixture
+def client(make_client):
+    """기본 설정(full clone, mirror update)의 client vault"""
+    return make_client()
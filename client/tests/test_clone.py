@@ -0,0 +1,104 @@
+"""Clone 전략 테스트 — blobless/shallow/blob-limit bootstrap clone과 주기적 re-shallow 검증"""
+
+import os
+
+from prometheus_client import REGISTRY
+
+from src.config import config
+from tests.conftest import push
+
+
+def _history(handler):
+    return int(handler.repo.git.rev_list("--count", "HEAD"))
+
+
+def _missing_objects(handler):
+    """partial clone에서 아직 받지 않은 object 수"""
+    output = handler.repo.git.rev_list("--objects", "--all", "--missing=print")
+    return sum(1 for line in output.splitlines() if line.startswith("?"))
+
+
+def _lazy_fetches():
+    return REGISTRY.get_sample_value("sbsync_client_lazy_blob_fetches_total") or 0
+
+
+class TestCloneOptions:
+    def test_options_per_strategy(self, client, monkeypatch):
+        monkeypatch.setattr(config, "CLONE_DEPTH", 7)
+        expected = {
+            ("full", ""): {},
+            ("blobless", ""): {"filter": "blob:none"},
+            ("shallow", ""): {"depth": 7},
+            ("full", "1m"): {"filter": "blob:limit=1m"},
+            ("shallow", "1m"): {"filter": "blob:limit=1m", "depth": 7},
+            # blobless가 blob-limit보다 강하다
+            ("blobless", "1m"): {"filter": "blob:none"},
+            ("bogus", ""): {},
+        }
+        for (strategy, limit), options in expected.items():
+            monkeypatch.setattr(config, "CLONE_STRATEGY", strategy)
+            monkeypatch.setattr(config, "CLONE_BLOB_LIMIT", limit)
+            assert client._clone_options() == options, (strategy, limit)
+
+        client.sparse_dirs = ["notes"]
+        monkeypatch.setattr(config, "CLONE_STRATEGY", "full")
+        monkeypatch.setattr(config, "CLONE_BLOB_LIMIT", "")
+        assert client._clone_options() == {"sparse": True}
+
+
+class TestClone:
+    def test_blobless_clone_fetches_blobs_on_demand(self, remote, make_client, monkeypatch):
+        _, writer = remote
+        push(writer, {"notes/a.md": "alpha 2\n"})
+        monkeypatch.setattr(config, "CLONE_STRATEGY", "blobless")
+        handler = make_client()
+
+        # checkout에 필요한 blob만 받았다 (이전 버전의 notes/a.md는 없음)
+        assert handler.repo.git.config("remote.origin.promisor") == "true"
+        assert _missing_objects(handler) == 1
+        with open(os.path.join(handler.repo_path, "notes/a.md")) as f:
+            assert f.read() == "alpha 2\n"
+
+        lazy = _lazy_fetches()
+        push(writer, {"notes/b.md": "beta 2\n"})
+        assert handler.pull()
+        assert _lazy_fetches() == lazy + 1
+        with open(os.path.join(handler.repo_path, "notes/b.md")) as f:
+            assert f.read() == "beta 2\n"
+
+    def test_blob_limit_leaves_large_history_on_the_remote(
+        self, remote, make_client, monkeypatch
+    ):
+        _, writer = remote
+        push(writer, {"attachments/big.bin": "1" * 4096})
+        push(writer, {"attachments/big.bin": "2" * 4096})
+        monkeypatch.setattr(config, "CLONE_BLOB_LIMIT", "1k")
+        handler = make_client()
+
+        # 작은 파일은 전부, 큰 파일은 checkout된 버전만
+        assert _missing_objects(handler) == 1
+        with open(os.path.join(handler.repo_path, "attachments/big.bin")) as f:
+            assert f.read() == "2" * 4096
+
+    def test_shallow_clone_and_reshallow(self, remote, make_client, monkeypatch):
+        _, writer = remote
+        push(writer, {"notes/a.md": "alpha 2\n"})
+        monkeypatch.setattr(config, "CLONE_STRATEGY", "shallow")
+        monkeypatch.setattr(config, "CLONE_DEPTH", 1)
+        monkeypatch.setattr(config, "CLONE_RESHALLOW_EVERY", 2)
+        handler = make_client()
+
+        assert handler._is_shallow()
+        assert _history(handler) == 1
+
+        # 첫 full pull: fetch가 shallow history에 commit을 더한다
+        push(writer, {"notes/a.md": "alpha 3\n"})
+        assert handler.pull()
+        assert _history(handler) == 2
+
+        # CLONE_RESHALLOW_EVERY 번째 full pull에서 CLONE_DEPTH로 다시 자른다
+        sha = push(writer, {"notes/a.md": "alpha 4\n"})
+        assert handler.pull()
+        assert handler.head() == sha
+        assert _history(handler) == 1
+        assert handler._is_shallow()
@@ -0,0 +1,29 @@
+"""GitBackend 테스트 — cat-file coprocess backend가 CLI backend와 같은 결과를 내고, 없는 경로에 None을 돌려주는지 검증"""
+
+import pytest
+
+from src.git_backend import CatFileGitBackend, CliGitBackend
+
+
+@pytest.fixture(params=[CliGitBackend, CatFileGitBackend])
+def backend(request, client):
+    backend = request.param(client.repo)
+    yield backend
+    backend.close()
+
+
+class TestGitBackend:
+    def test_queries(self, backend, client):
+        head = client.repo.git.rev_parse("HEAD")
+        assert backend.rev_parse("HEAD") == head
+        assert backend.rev_parse("no-such-branch") is None
+        assert backend.tree_files("HEAD") == {"top.md", "notes/a.md", "notes/b.md", "projects/p.md"}
+        assert backend.read_blob("HEAD", "notes/a.md") == b"alpha\n"
+        oid = client.repo.git.rev_parse("HEAD:top.md")
+        assert backend.object_size(oid) == len("top\n")
+
+    def test_missing_path_with_spaces(self, backend):
+        """공백이 든 없는 경로: "<spec> missing" 응답의 필드 수가 3개 이상"""
+        assert backend.read_blob("HEAD", "my note.md") is None
+        assert backend.read_blob("HEAD", "notes/a b c.md") is None
+        assert backend.read_blob("HEAD", "notes/a.md") == b"alpha\n"
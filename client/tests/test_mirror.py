@@ -0,0 +1,64 @@
+"""Mirror update 테스트 — reset --hard로 remote commit에 맞추고, 쓰인 파일 수/바이트를 upstream 변경분만큼 집계하는지 검증"""
+
+import os
+
+from prometheus_client import REGISTRY
+
+from tests.conftest import push, write
+
+
+def _sum(name):
+    return REGISTRY.get_sample_value(f"{name}_sum") or 0
+
+
+def _count(name):
+    return REGISTRY.get_sample_value(f"{name}_count") or 0
+
+
+class TestMirrorUpdate:
+    def test_counters_follow_the_upstream_change(self, remote, client):
+        _, writer = remote
+        writer.git.rm("-q", "notes/b.md")
+        push(writer, {"notes/a.md": "alpha 2\n", "notes/c.md": "gamma\n"})
+        files, written = _sum("sbsync_client_update_files_written"), _sum(
+            "sbsync_client_update_bytes_written"
+        )
+        updates = _count("sbsync_client_update_files_written")
+
+        assert client.pull()
+
+        # 수정 1 + 추가 1, 삭제는 쓰지 않는다
+        assert _sum("sbsync_client_update_files_written") == files + 2
+        assert _sum("sbsync_client_update_bytes_written") == written + len("alpha 2\ngamma\n")
+        assert _count("sbsync_client_update_files_written") == updates + 1
+        assert not os.path.exists(os.path.join(client.repo_path, "notes/b.md"))
+
+    def test_probe_only_cycle_writes_nothing(self, client):
+        updates = _count("sbsync_client_update_files_written")
+
+        assert client.pull()
+
+        assert _count("sbsync_client_update_files_written") == updates
+
+    def test_local_changes_lose_to_the_remote(self, remote, client):
+        _, writer = remote
+        root = client.repo_path
+        push(writer, {"notes/new.md": "from remote\n"})
+        write(root, "notes/new.md", "untracked in the way\n")
+        write(root, "notes/a.md", "local edit\n")
+
+        assert client.pull()
+
+        with open(os.path.join(root, "notes/new.md")) as f:
+            assert f.read() == "from remote\n"
+        with open(os.path.join(root, "notes/a.md")) as f:
+            assert f.read() == "alpha\n"
+        assert client.repo.git.status("--porcelain") == ""
+
+    def test_incoming_files_on_first_checkout_cover_the_tree(self, client):
+        head = client.head()
+
+        incoming = dict(client._incoming_files(None, head))
+
+        assert sorted(incoming) == ["notes/a.md", "notes/b.md", "projects/p.md", "top.md"]
+        assert client.backend.object_size(incoming["top.md"]) == len("top\n")
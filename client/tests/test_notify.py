@@ -0,0 +1,168 @@
+"""Push notify 테스트 — server의 PushNotifier가 client metrics server의 실제 /notify route로 보내는 경로 검증"""
+
+import json
+import socket
+import subprocess
+import sys
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.metrics import start_metrics_server
+from src.notify import NOTIFY_PATH, NotifyListener, notify_route
+from src.scheduler import Scheduler
+from tests.conftest import push
+
+SERVER_DIR = Path(__file__).resolve().parents[2] / "server"
+TOKEN = "s3cret"
+
+# server 쪽 PushNotifier로 한 번 보내고 server의 전송 결과(ok/error)를 출력한다.
+# server와 client는 둘 다 `src` 패키지라 한 프로세스에서 import할 수 없다.
+NOTIFY_SCRIPT = """
+import sys
+from prometheus_client import REGISTRY
+from src.notifier import PushNotifier
+url, token, sha = sys.argv[1:]
+PushNotifier([url], token, 5).notify(sha, "main", wait=True)
+ok = REGISTRY.get_sample_value("sbsync_notify_sent_total", {"result": "ok"})
+print("ok" if ok else "error")
+"""
+
+
+def _received(result):
+    return (
+        REGISTRY.get_sample_value("sbsync_client_notify_received_total", {"result": result})
+        or 0
+    )
+
+
+def _count(name, labels=None):
+    return REGISTRY.get_sample_value(f"{name}_count", labels or {}) or 0
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _server_notify(url, sha, token=TOKEN):
+    """server의 PushNotifier로 `sha`를 알린다 (subprocess); "ok" 또는 "error" """
+    result = subprocess.run(
+        [sys.executable, "-c", NOTIFY_SCRIPT, url, token, sha],
+        cwd=SERVER_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=30,
+    )
+    return result.stdout.strip()
+
+
+def _post(url, body, headers=None):
+    """`url`로 POST하고 (status, body)를 돌려준다"""
+    request = urllib.request.Request(url, data=body, method="POST", headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode()
+
+
+@pytest.fixture
+def endpoint():
+    """client metrics server의 /notify route (listener, url); listener는 on_notify 호출을 기록한다"""
+    calls = []
+    listener = NotifyListener(on_notify=lambda: calls.append(1))
+    listener.calls = calls
+    port = _free_port()
+    start_metrics_server(port, {("POST", NOTIFY_PATH): notify_route(listener, TOKEN)})
+    return listener, f"http://127.0.0.1:{port}{NOTIFY_PATH}"
+
+
+class TestNotifyRoute:
+    def test_bad_or_missing_token_is_rejected(self, endpoint):
+        listener, url = endpoint
+        before = _received("unauthorized")
+
+        # 잘못된 token: server는 실패(error)로 집계한다
+        assert _server_notify(url, "a" * 40, token="wrong") == "error"
+        # Authorization header 없음
+        status, _ = _post(url, json.dumps({"sha": "a" * 40}).encode())
+        assert status == 401
+
+        assert _received("unauthorized") == before + 2
+        assert listener.calls == []
+
+    def test_malformed_body_is_rejected(self, endpoint):
+        listener, url = endpoint
+        before = _received("invalid")
+        auth = {"Authorization": f"Bearer {TOKEN}"}
+
+        for body in (b"not json", b'{"sha": 1}', b'{"branch": "main"}', b"[]"):
+            status, _ = _post(url, body, auth)
+            assert status == 400, body
+
+        assert _received("invalid") == before + 4
+        assert listener.calls == []
+
+    def test_repeated_sha_is_deduplicated(self, endpoint):
+        listener, url = endpoint
+        accepted, duplicate = _received("accepted"), _received("duplicate")
+
+        # 200 duplicate도 server 쪽에서는 정상 전송
+        assert _server_notify(url, "b" * 40) == "ok"
+        assert _server_notify(url, "b" * 40) == "ok"
+
+        assert listener.calls == [1]
+        assert _received("accepted") == accepted + 1
+        assert _received("duplicate") == duplicate + 1
+
+
+class TestNotifyTriggersPull:
+    def test_notified_commit_is_pulled(self, remote, client):
+        _, writer = remote
+        listener = NotifyListener()
+        port = _free_port()
+        start_metrics_server(port, {("POST", NOTIFY_PATH): notify_route(listener, TOKEN)})
+        url = f"http://127.0.0.1:{port}{NOTIFY_PATH}"
+
+        # main.py와 같은 연결: notify → scheduler pull → listener.pulled
+        scheduler = Scheduler(client)
+        pulled = threading.Event()
+
+        def on_pulled():
+            listener.pulled(client.head(), client.has_commit)
+            pulled.set()
+
+        scheduler.on_pulled = on_pulled
+        listener.on_notify = scheduler.request_pull
+        listener.pulled(client.head(), client.has_commit)
+        loop = threading.Thread(target=scheduler.run, daemon=True)
+        loop.start()
+
+        visible = _count("sbsync_client_propagation_seconds", {"stage": "push_to_visible"})
+        to_pulled = _count("sbsync_client_notify_to_pulled_seconds")
+        try:
+            sha = push(writer, {"notes/new.md": "pushed\n"})
+            assert _server_notify(url, sha) == "ok"
+            assert pulled.wait(30)
+        finally:
+            scheduler.stop()
+            loop.join(5)
+
+        assert client.head() == sha
+        assert (Path(client.repo_path) / "notes" / "new.md").read_text() == "pushed\n"
+        assert _count("sbsync_client_notify_to_pulled_seconds") == to_pulled + 1
+        assert (
+            _count("sbsync_client_propagation_seconds", {"stage": "push_to_visible"})
+            == visible + 1
+        )
+        # 이미 checkout된 commit을 다시 알리면 duplicate (pull 없음)
+        duplicate = _received("duplicate")
+        assert _server_notify(url, sha) == "ok"
+        assert _received("duplicate") == duplicate + 1
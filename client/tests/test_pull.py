@@ -0,0 +1,70 @@
+"""Pull 테스트 — remote가 그대로면 ls-remote probe만 하고, 움직였을 때만 fetch + update하는지 검증"""
+
+import subprocess
+
+from prometheus_client import REGISTRY
+
+from tests.conftest import push
+
+
+def _cycles(mode):
+    return REGISTRY.get_sample_value("sbsync_client_pull_cycles_total", {"mode": mode}) or 0
+
+
+def _git_commands(handler):
+    """`handler.pull()` 한 번이 실행한 git subcommand 목록"""
+    commands = []
+    orig_init = subprocess.Popen.__init__
+
+    def recording_init(popen, args, *rest, **kwargs):
+        if isinstance(args, (list, tuple)) and args and "git" in str(args[0]):
+            commands.append(next(a for a in args[1:] if not a.startswith("-")))
+        orig_init(popen, args, *rest, **kwargs)
+
+    subprocess.Popen.__init__ = recording_init
+    try:
+        assert handler.pull()
+    finally:
+        subprocess.Popen.__init__ = orig_init
+    return commands
+
+
+class TestProbeOnly:
+    def test_unchanged_remote_is_probe_only(self, client):
+        head = client.head()
+        probe_only, full = _cycles("probe_only"), _cycles("full")
+
+        commands = _git_commands(client)
+
+        assert _cycles("probe_only") == probe_only + 1
+        assert _cycles("full") == full
+        assert "ls-remote" in commands
+        assert "fetch" not in commands
+        assert "reset" not in commands
+        assert client.head() == head
+
+    def test_moved_remote_is_full_cycle(self, remote, client):
+        _, writer = remote
+        sha = push(writer, {"notes/a.md": "alpha 2\n"})
+        probe_only, full = _cycles("probe_only"), _cycles("full")
+
+        commands = _git_commands(client)
+
+        assert _cycles("full") == full + 1
+        assert _cycles("probe_only") == probe_only
+        assert "fetch" in commands
+        assert client.head() == sha
+        # 다음 cycle은 다시 probe만
+        assert "fetch" not in _git_commands(client)
+        assert _cycles("probe_only") == probe_only + 1
+
+    def test_local_commit_ahead_of_remote_still_updates(self, client):
+        # HEAD가 remote와 다르면 (여기서는 local commit) probe만으로 끝내지 않는다
+        remote_head = client.head()
+        client.repo.git.commit("-q", "--allow-empty", "-m", "local")
+        full = _cycles("full")
+
+        assert client.pull()
+
+        assert _cycles("full") == full + 1
+        assert client.head() == remote_head
@@ -0,0 +1,61 @@
+"""Smart clean 테스트 — UPDATE_MODE=merge에서 upstream에 새로 추가된 경로와 겹치는 untracked 파일만 지우는지 검증"""
+
+import os
+
+import pytest
+
+from src.config import config
+from tests.conftest import push, write
+
+
+@pytest.fixture
+def merge_client(make_client, monkeypatch):
+    monkeypatch.setattr(config, "UPDATE_MODE", "merge")
+    return make_client()
+
+
+class TestSmartClean:
+    def test_only_conflicting_untracked_files_are_removed(self, remote, merge_client):
+        _, writer = remote
+        root = merge_client.repo_path
+        push(writer, {"notes/new.md": "from remote\n", "notes/a.md": "alpha 2\n"})
+        write(root, "notes/new.md", "local draft\n")
+        write(root, "notes/draft.md", "untracked, no conflict\n")
+
+        assert merge_client.pull()
+
+        with open(os.path.join(root, "notes/new.md")) as f:
+            assert f.read() == "from remote\n"
+        with open(os.path.join(root, "notes/a.md")) as f:
+            assert f.read() == "alpha 2\n"
+        with open(os.path.join(root, "notes/draft.md")) as f:
+            assert f.read() == "untracked, no conflict\n"
+
+    def test_incoming_paths_are_the_upstream_additions(self, remote, merge_client):
+        _, writer = remote
+        push(
+            writer,
+            {"notes/new.md": "n\n", "projects/q.md": "q\n", "notes/a.md": "modified\n"},
+        )
+        merge_client._fetch_branch("main")
+
+        # 수정된 파일은 이미 tracked라 untracked 파일과 충돌할 수 없다
+        assert merge_client._incoming_added_paths("origin/main") == [
+            "notes/new.md",
+            "projects/q.md",
+        ]
+        # sparse cone 밖의 경로는 쓰이지 않으므로 제외
+        merge_client.sparse_dirs = ["notes"]
+        assert merge_client._incoming_added_paths("origin/main") == ["notes/new.md"]
+
+    def test_unrelated_untracked_files_are_kept(self, remote, merge_client):
+        _, writer = remote
+        root = merge_client.repo_path
+        push(writer, {"notes/new.md": "n\n"})
+        for i in range(20):
+            write(root, f"inbox/{i}.md", "local\n")
+        merge_client._fetch_branch("main")
+
+        assert merge_client._smart_clean("origin/main")
+
+        assert len(os.listdir(os.path.join(root, "inbox"))) == 20
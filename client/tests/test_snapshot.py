@@ -0,0 +1,158 @@
+"""Snapshot 테스트 — 변경 없는 파일의 hardlink, link의 atomic flip, rollback(CLI 포함), 오래된 snapshot prune 검증"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.config import config
+from src.snapshot import MANIFEST_SUFFIX
+from tests.conftest import push
+
+CLIENT_DIR = Path(__file__).resolve().parents[1]
+
+
+def _files(method):
+    return (
+        REGISTRY.get_sample_value("sbsync_client_snapshot_files_total", {"method": method})
+        or 0
+    )
+
+
+@pytest.fixture
+def snap_client(make_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SNAPSHOT_LINK", str(tmp_path / "obsidian"))
+    monkeypatch.setattr(config, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(config, "SNAPSHOT_KEEP", 2)
+    handler = make_client()
+    # 첫 cycle(probe only)에서 link가 없으므로 publish된다
+    assert handler.pull()
+    return handler
+
+
+def _read(link, rel):
+    with open(os.path.join(link, rel)) as f:
+        return f.read()
+
+
+class TestSnapshot:
+    def test_first_publish_writes_the_tree(self, snap_client):
+        link = config.SNAPSHOT_LINK
+        assert snap_client.snapshots.current() == snap_client.head()
+        assert _read(link, "notes/a.md") == "alpha\n"
+        assert _read(link, "projects/p.md") == "plan\n"
+        # 상대 경로 symlink (bind mount 건너편에서도 resolve)
+        assert not os.path.isabs(os.readlink(link))
+
+    def test_unchanged_files_are_hardlinked(self, remote, snap_client):
+        _, writer = remote
+        link = config.SNAPSHOT_LINK
+        old = os.path.join(config.SNAPSHOT_DIR, snap_client.snapshots.current())
+        linked, written = _files("linked"), _files("written")
+
+        sha = push(writer, {"notes/a.md": "alpha 2\n"})
+        assert snap_client.pull()
+
+        assert snap_client.snapshots.current() == sha
+        assert _read(link, "notes/a.md") == "alpha 2\n"
+        new = os.path.join(config.SNAPSHOT_DIR, sha)
+        for rel in ("top.md", "notes/b.md", "projects/p.md"):
+            assert os.stat(os.path.join(old, rel)).st_ino == os.stat(os.path.join(new, rel)).st_ino
+        assert os.stat(os.path.join(old, "notes/a.md")).st_ino != os.stat(
+            os.path.join(new, "notes/a.md")
+        ).st_ino
+        assert _files("linked") == linked + 3
+        assert _files("written") == written + 1
+
+    def test_file_edited_in_place_is_not_linked(self, remote, snap_client):
+        """publish된 vault에서 in-place로 쓴 파일은 다음 snapshot에 link하지 않고 blob에서 다시 씀"""
+        _, writer = remote
+        link = config.SNAPSHOT_LINK
+        old = os.path.join(config.SNAPSHOT_DIR, snap_client.snapshots.current())
+        # Obsidian이 workspace.json을 쓰듯 같은 inode에 덮어쓰기
+        with open(os.path.join(link, "notes/b.md"), "w") as f:
+            f.write("edited in place\n")
+        linked, written = _files("linked"), _files("written")
+
+        sha = push(writer, {"notes/a.md": "alpha 2\n"})
+        assert snap_client.pull()
+
+        new = os.path.join(config.SNAPSHOT_DIR, sha)
+        assert _read(link, "notes/b.md") == "beta\n"
+        assert os.stat(os.path.join(old, "notes/b.md")).st_ino != os.stat(
+            os.path.join(new, "notes/b.md")
+        ).st_ino
+        assert _files("linked") == linked + 2
+        assert _files("written") == written + 2
+
+    def test_rollback_holds_until_the_remote_moves(self, remote, snap_client):
+        _, writer = remote
+        first = snap_client.snapshots.current()
+        second = push(writer, {"notes/a.md": "alpha 2\n"})
+        assert snap_client.pull()
+
+        assert snap_client.snapshots.rollback() == first
+        assert _read(config.SNAPSHOT_LINK, "notes/a.md") == "alpha\n"
+        # probe-only cycle은 rollback을 되돌리지 않는다
+        assert snap_client.pull()
+        assert snap_client.snapshots.current() == first
+
+        third = push(writer, {"notes/a.md": "alpha 3\n"})
+        assert snap_client.pull()
+        assert snap_client.snapshots.current() == third
+        assert second != third
+
+    def test_rollback_cli(self, remote, snap_client):
+        _, writer = remote
+        first = snap_client.snapshots.current()
+        push(writer, {"notes/a.md": "alpha 2\n"})
+        assert snap_client.pull()
+
+        env = dict(
+            os.environ, SNAPSHOT_LINK=config.SNAPSHOT_LINK, SNAPSHOT_DIR=config.SNAPSHOT_DIR
+        )
+        subprocess.run(
+            [sys.executable, "-m", "src.snapshot", "rollback"],
+            cwd=CLIENT_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+        )
+
+        assert snap_client.snapshots.current() == first
+
+    def test_old_snapshots_are_pruned(self, remote, snap_client):
+        _, writer = remote
+        for i in range(3):
+            push(writer, {"notes/a.md": f"alpha {i}\n"})
+            assert snap_client.pull()
+
+        names = sorted(os.listdir(config.SNAPSHOT_DIR))
+        snapshots = [n for n in names if not n.endswith(MANIFEST_SUFFIX)]
+        assert len(snapshots) == config.SNAPSHOT_KEEP
+        assert snap_client.snapshots.current() in snapshots
+        # manifest도 snapshot과 함께 지워진다
+        assert sorted(n + MANIFEST_SUFFIX for n in snapshots) == sorted(
+            n for n in names if n.endswith(MANIFEST_SUFFIX)
+        )
+        assert not any(n.startswith(".staging-") for n in names)
+        total, overhead = snap_client.snapshots.disk_usage()
+        # 이전 snapshot은 바뀐 notes/a.md 만큼만 더 쓴다
+        assert overhead == len("alpha 1\n")
+        assert total > overhead
+
+    def test_sparse_cone_change_republishes(self, snap_client):
+        snapshots = snap_client.snapshots
+        assert not snapshots.is_stale()
+
+        snapshots.sparse_dirs = ["notes"]
+        assert snapshots.is_stale()
+        assert snapshots.publish()
+
+        link = config.SNAPSHOT_LINK
+        assert snapshots.current().startswith(snap_client.head() + "-")
+        assert os.path.exists(os.path.join(link, "notes/a.md"))
+        assert not os.path.exists(os.path.join(link, "projects"))
@@ -0,0 +1,75 @@
+"""Sparse checkout 테스트 — cone 판정(in_cone), SPARSE_PATHS clone과 설정 변경 시 re-clone 없는 in-place 갱신 검증"""
+
+import os
+
+from prometheus_client import REGISTRY
+
+from src.config import config
+from src.sparse import in_cone, sparse_dirs
+from tests.conftest import push
+
+
+def _tree(handler):
+    """working tree의 파일 목록 (.git 제외)"""
+    files = []
+    for root, dirs, names in os.walk(handler.repo_path):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        files += [os.path.relpath(os.path.join(root, n), handler.repo_path) for n in names]
+    return sorted(files)
+
+
+class TestCone:
+    def test_sparse_dirs_are_normalized(self):
+        assert sparse_dirs([" /notes/ ", "projects", "notes", "", "/"]) == ["notes", "projects"]
+
+    def test_in_cone(self):
+        dirs = ["notes/daily"]
+        assert in_cone("top.md", dirs)
+        assert in_cone("notes/daily/2024.md", dirs)
+        assert in_cone("notes/daily/old/2023.md", dirs)
+        # cone의 부모 폴더 바로 아래 파일도 포함된다
+        assert in_cone("notes/index.md", dirs)
+        assert not in_cone("notes/archive/x.md", dirs)
+        assert not in_cone("projects/p.md", dirs)
+        assert not in_cone("notes-old/x.md", dirs)
+        assert in_cone("projects/p.md", [])
+
+
+class TestSparseCheckout:
+    def test_clone_materializes_only_the_cone(self, make_client, monkeypatch):
+        monkeypatch.setattr(config, "SPARSE_PATHS", ["notes"])
+        handler = make_client()
+
+        assert _tree(handler) == ["notes/a.md", "notes/b.md", "top.md"]
+        assert handler.repo.git.sparse_checkout("list") == "notes"
+
+    def test_pull_writes_only_the_cone(self, remote, make_client, monkeypatch):
+        _, writer = remote
+        monkeypatch.setattr(config, "SPARSE_PATHS", ["notes"])
+        handler = make_client()
+        files = REGISTRY.get_sample_value("sbsync_client_update_files_written_sum") or 0
+
+        push(writer, {"notes/c.md": "gamma\n", "projects/q.md": "q\n"})
+        assert handler.pull()
+
+        assert _tree(handler) == ["notes/a.md", "notes/b.md", "notes/c.md", "top.md"]
+        assert REGISTRY.get_sample_value("sbsync_client_update_files_written_sum") == files + 1
+
+    def test_cone_change_updates_in_place(self, make_client, monkeypatch):
+        monkeypatch.setattr(config, "SPARSE_PATHS", ["notes"])
+        handler = make_client()
+        git_dir = os.stat(handler.repo.git_dir).st_ino
+
+        # 설정을 바꾸고 재시작: 같은 repo에서 cone만 넓힌다
+        monkeypatch.setattr(config, "SPARSE_PATHS", ["notes", "projects"])
+        handler = make_client()
+        assert os.stat(handler.repo.git_dir).st_ino == git_dir
+        assert "projects/p.md" in _tree(handler)
+        assert handler.repo.git.sparse_checkout("list").splitlines() == ["notes", "projects"]
+
+        # 비우면 sparse checkout을 끈다
+        monkeypatch.setattr(config, "SPARSE_PATHS", [])
+        handler = make_client()
+        assert os.stat(handler.repo.git_dir).st_ino == git_dir
+        assert _tree(handler) == ["notes/a.md", "notes/b.md", "projects/p.md", "top.md"]
+        assert handler.repo.git.config("--bool", "core.sparseCheckout") == "false"
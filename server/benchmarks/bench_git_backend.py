@@ -0,0 +1,152 @@
+"""Benchmark real `GitHandler.sync()` cycles per GitBackend: wall time and git forks.
+
+Each cycle edits a few notes, records them in the ChangeSet and runs one full sync
+cycle against a local bare remote: status, scoped `git add`, commit, then the
+fetch + rebase check. Pushes are left to the push worker (as in production), so
+they are not part of the cycle. The backend only serves the read-side queries
+(rev resolution, status); staging, commit and network calls fork either way.
+
+Backends:
+  cli       : CliGitBackend, one git process per query
+  catfile   : CatFileGitBackend, persistent `git cat-file --batch[-check]` coprocesses
+
+The fsmonitor hook is disabled (no watcher journal is running here).
+
+Usage (from server/):
+    uv run python -m benchmarks.bench_git_backend --files 20000 --cycles 20
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+from src.changeset import ChangeSet
+from src.config import config
+from src.git_backend import BACKENDS
+from src.git_handler import GitHandler
+
+FILES_PER_DIR = 100
+EDITED_PER_CYCLE = 10
+
+
+class _ForkCounter:
+    """Counts every subprocess started while installed (GitPython's included)."""
+
+    def __init__(self):
+        self.count = 0
+        self._orig_init = subprocess.Popen.__init__
+
+    def __enter__(self):
+        counter = self
+        orig_init = self._orig_init
+
+        def counting_init(popen, *args, **kwargs):
+            counter.count += 1
+            orig_init(popen, *args, **kwargs)
+
+        subprocess.Popen.__init__ = counting_init
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.Popen.__init__ = self._orig_init
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def note_path(i):
+    return f"folder-{i // FILES_PER_DIR:05d}/note-{i:06d}.md"
+
+
+def make_vault(workdir, name, n_files):
+    """A vault of `n_files` notes pushed to its own bare remote, upstream configured."""
+    remote = os.path.join(workdir, f"{name}.git")
+    path = os.path.join(workdir, name)
+    git(workdir, "init", "-q", "--bare", "-b", "main", remote)
+    os.makedirs(path)
+    for i in range(n_files):
+        d = os.path.join(path, os.path.dirname(note_path(i)))
+        if i % FILES_PER_DIR == 0:
+            os.makedirs(d)
+        with open(os.path.join(path, note_path(i)), "w") as f:
+            f.write(f"# Note {i}\n\nSome text.\n")
+    for args in (
+        ["init", "-q", "-b", "main"],
+        ["config", "user.name", "bench"],
+        ["config", "user.email", "bench@example.com"],
+        # A detached auto-gc would race with the explicit gc below.
+        ["config", "gc.auto", "0"],
+        ["add", "-A"],
+        ["commit", "-q", "-m", "init"],
+        ["gc", "-q"],
+        ["remote", "add", "origin", remote],
+        ["push", "-q", "-u", "origin", "main"],
+    ):
+        git(path, *args)
+    return path, remote
+
+
+def measure(backend_name, workdir, n_files, cycles):
+    path, remote = make_vault(workdir, backend_name, n_files)
+    config.GIT_BACKEND = backend_name
+    config.GIT_REMOTE_URL = remote
+    change_set = ChangeSet(path)
+    handler = GitHandler(repo_path=path, change_set=change_set)
+    # Pushes run on the push worker in production.
+    handler.on_committed = lambda: None
+
+    times, forks = [], []
+    step = max(1, n_files // (EDITED_PER_CYCLE * (cycles + 1)))
+    try:
+        for cycle in range(cycles + 1):
+            for n in range(EDITED_PER_CYCLE):
+                rel = note_path((cycle * EDITED_PER_CYCLE + n) * step % n_files)
+                full = os.path.join(path, rel)
+                with open(full, "a") as f:
+                    f.write(f"edit {cycle}\n")
+                change_set.record("modified", full)
+            with _ForkCounter() as counter:
+                start = time.perf_counter()
+                handler.sync("bench")
+                elapsed = time.perf_counter() - start
+            if cycle:
+                # The first cycle starts the catfile coprocesses; report steady state.
+                times.append(elapsed)
+                forks.append(counter.count)
+        commits = int(handler.repo.git.rev_list("--count", "HEAD"))
+        assert commits == cycles + 2, commits
+    finally:
+        handler.backend.close()
+    return statistics.median(times), statistics.mean(forks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--cycles", type=int, default=20)
+    args = parser.parse_args()
+
+    config.FSMONITOR_ENABLED = False
+    workdir = tempfile.mkdtemp(prefix="sbsync-bench-")
+    try:
+        print(f"Creating synthetic vaults with {args.files} files...")
+        rows = {name: measure(name, workdir, args.files, args.cycles) for name in BACKENDS}
+
+        print(
+            f"\nGitHandler.sync() per cycle ({args.files} files, "
+            f"{EDITED_PER_CYCLE} edited, {args.cycles} cycles)"
+        )
+        print(f"{'backend':<12}{'wall (s)':>12}{'forks':>10}")
+        for name, (wall, forks) in rows.items():
+            print(f"{name:<12}{wall:>12.4f}{forks:>10.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
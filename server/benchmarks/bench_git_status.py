@@ -0,0 +1,120 @@
+"""Benchmark git status/add/diff on a large synthetic vault, before/after index tuning.
+
+Scenarios (each edits one note per iteration, as a typical sync cycle does):
+  baseline     : plain repo (full lstat of the index + untracked walk)
+  untracked    : core.untrackedCache + core.splitIndex
+  fsmonitor    : the above + core.fsmonitor answered by sbSync's EventJournal
+
+Usage (from server/):
+    uv run python -m benchmarks.bench_git_status --files 80000 --iterations 5
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+from src.fsmonitor import EventJournal, FsMonitorServer, install_hook
+
+FILES_PER_DIR = 100
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def make_vault(path, n_files):
+    os.makedirs(path)
+    for i in range(n_files):
+        d = os.path.join(path, f"folder-{i // FILES_PER_DIR:05d}")
+        if i % FILES_PER_DIR == 0:
+            os.makedirs(d)
+        with open(os.path.join(d, f"note-{i:06d}.md"), "w") as f:
+            f.write(f"# Note {i}\n\nSome text.\n")
+    git(path, "init", "-q")
+    git(path, "config", "user.name", "bench")
+    git(path, "config", "user.email", "bench@example.com")
+    # A detached auto-gc would race with copying the repo per scenario.
+    git(path, "config", "gc.auto", "0")
+    git(path, "add", "-A")
+    git(path, "commit", "-q", "-m", "init")
+    git(path, "gc", "-q")
+
+
+def timed(repo, *args):
+    start = time.perf_counter()
+    subprocess.run(["git", *args], cwd=repo, capture_output=True)
+    return time.perf_counter() - start
+
+
+def run_scenario(repo, iterations, journal=None):
+    results = {"status": [], "add": [], "diff --cached": []}
+    # Warm-up: lets git write the untracked cache / fsmonitor token into the index.
+    for _ in range(2):
+        timed(repo, "status", "--porcelain")
+
+    for i in range(iterations):
+        note = os.path.join(repo, "folder-00000", f"note-{i % FILES_PER_DIR:06d}.md")
+        with open(note, "a") as f:
+            f.write(f"edit {time.time()}\n")
+        if journal is not None:
+            journal.record(note)
+
+        results["status"].append(timed(repo, "status", "--porcelain"))
+        results["add"].append(timed(repo, "add", "-A"))
+        results["diff --cached"].append(timed(repo, "diff", "--cached", "--quiet"))
+        git(repo, "commit", "-q", "-m", f"edit {i}")
+    return {op: statistics.median(samples) for op, samples in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=80000)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sbsync-bench-")
+    try:
+        base = os.path.join(workdir, "vault")
+        print(f"Creating synthetic vault with {args.files} files...")
+        make_vault(base, args.files)
+
+        rows = {}
+        repo = os.path.join(workdir, "baseline")
+        shutil.copytree(base, repo, symlinks=True)
+        rows["baseline"] = run_scenario(repo, args.iterations)
+
+        repo = os.path.join(workdir, "untracked")
+        shutil.copytree(base, repo, symlinks=True)
+        git(repo, "config", "core.untrackedCache", "true")
+        git(repo, "config", "core.splitIndex", "true")
+        rows["untracked"] = run_scenario(repo, args.iterations)
+
+        repo = os.path.join(workdir, "fsmonitor")
+        shutil.copytree(base, repo, symlinks=True)
+        git(repo, "config", "core.untrackedCache", "true")
+        git(repo, "config", "core.splitIndex", "true")
+        socket_path = os.path.join(workdir, "fsm.sock")
+        git(repo, "config", "core.fsmonitor", install_hook(os.path.join(repo, ".git"), socket_path))
+        git(repo, "config", "core.fsmonitorHookVersion", "2")
+        journal = EventJournal(repo)
+        server = FsMonitorServer(journal, socket_path).start()
+        try:
+            rows["fsmonitor"] = run_scenario(repo, args.iterations, journal)
+        finally:
+            server.stop()
+
+        ops = list(rows["baseline"])
+        print(f"\nMedian seconds per operation ({args.files} files, 1 edit per cycle)")
+        print(f"{'scenario':<12}" + "".join(f"{op:>16}" for op in ops))
+        for name, row in rows.items():
+            print(f"{name:<12}" + "".join(f"{row[op]:>16.4f}" for op in ops))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
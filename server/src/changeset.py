@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+
+from src.config import config
+from src.metrics import FULL_RESCANS_TOTAL
+from src.utils import logger
+
+
+class ChangeBatch:
+    """Paths observed between two sync cycles.
+
+    `full_rescan` means the batch cannot be trusted to be complete (startup,
+    observer restart or overflow) and the caller must fall back to a full-tree add.
+    `first_change_at` is the wall-clock time of the oldest event in the batch.
+    """
+
+    __slots__ = ("paths", "moves", "full_rescan", "first_change_at")
+
+    def __init__(self, paths=None, moves=None, full_rescan=False, first_change_at=None):
+        self.paths = paths or {}
+        self.moves = moves or []
+        self.full_rescan = full_rescan
+        self.first_change_at = first_change_at
+
+    def __len__(self):
+        return len(self.paths) + len(self.moves)
+
+    def is_empty(self):
+        return not self.full_rescan and len(self) == 0
+
+    def staging_paths(self):
+        """Repo-relative paths to stage; moves contribute both source and destination."""
+        paths = set(self.paths)
+        for src, dest in self.moves:
+            paths.add(src)
+            paths.add(dest)
+        return sorted(paths)
+
+
+class ChangeSet:
+    """Thread-safe accumulator of created/modified/deleted/moved paths.
+
+    The watcher records into it from the observer thread; `GitHandler.sync()`
+    drains it once per cycle. Starts in full-rescan mode because nothing is
+    known about changes made before the observer was running.
+    """
+
+    def __init__(self, root, max_paths=None):
+        self.root = os.path.abspath(root)
+        self.max_paths = max_paths if max_paths is not None else config.CHANGESET_MAX_PATHS
+        self._lock = threading.Lock()
+        self._paths = {}
+        self._moves = []
+        self._full_rescan = True
+        self._first_change_at = None
+
+    def _relpath(self, path):
+        if not path:
+            return None
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == "." or rel.startswith(".." + os.sep) or rel == "..":
+            return None
+        return rel.replace(os.sep, "/")
+
+    def record(self, event_type, src_path, dest_path=None):
+        src = self._relpath(src_path)
+        dest = self._relpath(dest_path)
+        if src is None and dest is None:
+            return
+
+        with self._lock:
+            if self._first_change_at is None:
+                self._first_change_at = time.time()
+            if self._full_rescan:
+                return
+            if event_type == "moved" and src and dest:
+                self._moves.append((src, dest))
+            else:
+                self._paths[src or dest] = event_type
+
+            if len(self._paths) + len(self._moves) > self.max_paths:
+                self._overflow_locked()
+
+    def _overflow_locked(self):
+        logger.info(
+            "Change set exceeded %d paths; falling back to full-tree staging.",
+            self.max_paths,
+        )
+        self._paths = {}
+        self._moves = []
+        self._full_rescan = True
+        FULL_RESCANS_TOTAL.labels(reason="overflow").inc()
+
+    def mark_full_rescan(self, reason="observer_restart"):
+        """Forget recorded paths and make the next cycle stage the whole tree."""
+        with self._lock:
+            self._paths = {}
+            self._moves = []
+            self._full_rescan = True
+        FULL_RESCANS_TOTAL.labels(reason=reason).inc()
+
+    def drain(self):
+        """Return everything recorded so far and reset to an empty, trusted set."""
+        with self._lock:
+            batch = ChangeBatch(
+                self._paths, self._moves, self._full_rescan, self._first_change_at
+            )
+            self._paths = {}
+            self._moves = []
+            self._full_rescan = False
+            self._first_change_at = None
+        return batch
+
+    def restore(self, batch):
+        """Put a drained batch back, e.g. after a failed cycle, so no path is lost."""
+        with self._lock:
+            if batch.first_change_at is not None and (
+                self._first_change_at is None or batch.first_change_at < self._first_change_at
+            ):
+                self._first_change_at = batch.first_change_at
+            if batch.full_rescan or self._full_rescan:
+                self._paths = {}
+                self._moves = []
+                self._full_rescan = True
+                return
+            for path, event_type in batch.paths.items():
+                self._paths.setdefault(path, event_type)
+            self._moves[:0] = batch.moves
+            if len(self._paths) + len(self._moves) > self.max_paths:
+                self._overflow_locked()
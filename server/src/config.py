@@ -16,19 +16,127 @@ class Config:
 
         # Debounce time in seconds
         self.DEBOUNCE_SECONDS = int(os.getenv("DEBOUNCE_SECONDS", "300"))
+        # Force a sync this long after the first unsynced change, even if edits
+        # never pause for DEBOUNCE_SECONDS (0 = no ceiling)
+        self.DEBOUNCE_MAX_WAIT_SECONDS = int(os.getenv("DEBOUNCE_MAX_WAIT_SECONDS", "900"))
+        # Adapt the quiet window between DEBOUNCE_MIN_SECONDS and DEBOUNCE_SECONDS
+        # from the gaps between recent edits and the observed sync cost
+        self.DEBOUNCE_ADAPTIVE = os.getenv("DEBOUNCE_ADAPTIVE", "false").lower() == "true"
+        self.DEBOUNCE_MIN_SECONDS = int(os.getenv("DEBOUNCE_MIN_SECONDS", "30"))
 
         # Periodic sync interval in seconds
         self.PERIODIC_SYNC_SECONDS = int(os.getenv("PERIODIC_SYNC_SECONDS", "600"))
 
+        # Pushes run on their own worker: commits made within PUSH_BATCH_SECONDS go out
+        # in one push; failures retry with jittered exponential backoff between
+        # PUSH_BACKOFF_BASE_SECONDS and PUSH_BACKOFF_MAX_SECONDS
+        self.PUSH_BATCH_SECONDS = float(os.getenv("PUSH_BATCH_SECONDS", "5"))
+        self.PUSH_BACKOFF_BASE_SECONDS = float(os.getenv("PUSH_BACKOFF_BASE_SECONDS", "5"))
+        self.PUSH_BACKOFF_MAX_SECONDS = float(os.getenv("PUSH_BACKOFF_MAX_SECONDS", "600"))
+
+        # After each push, POST the new commit to these pull-client notify endpoints
+        # (comma separated, e.g. "http://workpc:8001/notify") with NOTIFY_TOKEN as a
+        # bearer token, so clients pull immediately instead of on their next poll
+        self.NOTIFY_URLS = [
+            u.strip() for u in os.getenv("NOTIFY_URLS", "").split(",") if u.strip()
+        ]
+        self.NOTIFY_TOKEN = os.getenv("NOTIFY_TOKEN", "")
+        self.NOTIFY_TIMEOUT_SECONDS = float(os.getenv("NOTIFY_TIMEOUT_SECONDS", "2"))
+
         # Health check interval in seconds
         self.HEALTH_CHECK_SECONDS = int(os.getenv("HEALTH_CHECK_SECONDS", "60"))
 
         # Prometheus metrics port
         self.METRICS_PORT = int(os.getenv("METRICS_PORT", "8000"))
+        # Sync cycles kept in memory for GET /debug/syncs on the metrics port (0 = off)
+        self.FLIGHT_RECORDER_SIZE = int(os.getenv("FLIGHT_RECORDER_SIZE", "50"))
+        # Opt-in /debug/profile (sampling CPU profile) and /debug/tracemalloc routes on
+        # the metrics port; nothing is sampled or traced until they are called
+        self.PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+        # Repository statistics (objects, packs, index, untracked files) are recomputed
+        # on a background thread this often; scrapes serve the last values (0 = not exported)
+        self.REPO_STATS_TTL_SECONDS = float(os.getenv("REPO_STATS_TTL_SECONDS", "300"))
+
+        # Max paths tracked between syncs before falling back to a full-tree `git add -A`
+        self.CHANGESET_MAX_PATHS = int(os.getenv("CHANGESET_MAX_PATHS", "5000"))
+
+        # Extra gitignore-style patterns dropped by the watcher on top of the vault's
+        # .gitignore and .git/info/exclude (comma separated). Defaults cover Obsidian
+        # UI state, trash, editor swap files and Google Drive partial downloads.
+        self.IGNORE_PATTERNS = [
+            p.strip()
+            for p in os.getenv(
+                "IGNORE_PATTERNS",
+                ".obsidian/workspace.json,.obsidian/workspace-mobile.json,.trash/,"
+                "*.swp,*.swx,*~,.#*,.DS_Store,*.tmp.drivedownload,.tmp.drivedownload/,"
+                ".tmp.driveupload/",
+            ).split(",")
+            if p.strip()
+        ]
+
+        # Read-side git queries: "catfile" (persistent `git cat-file --batch` coprocesses)
+        # or "cli" (one git process per query)
+        self.GIT_BACKEND = os.getenv("GIT_BACKEND", "catfile").lower()
+
+        # Make `git status`/`add`/`diff` cost O(changes): untracked cache, split index
+        # and an fsmonitor hook answered from the watcher's event journal.
+        self.GIT_UNTRACKED_CACHE = os.getenv("GIT_UNTRACKED_CACHE", "true").lower() == "true"
+        self.GIT_SPLIT_INDEX = os.getenv("GIT_SPLIT_INDEX", "true").lower() == "true"
+        self.FSMONITOR_ENABLED = os.getenv("FSMONITOR_ENABLED", "true").lower() == "true"
+        self.FSMONITOR_SOCKET = os.getenv("FSMONITOR_SOCKET", "")
+        self.FSMONITOR_JOURNAL_SIZE = int(os.getenv("FSMONITOR_JOURNAL_SIZE", "100000"))
+
+        # Drop watcher events for files whose content still hashes to the indexed blob
+        # (touch-only / byte-identical rewrites). Larger files are never hashed.
+        self.HASHCACHE_ENABLED = os.getenv("HASHCACHE_ENABLED", "true").lower() == "true"
+        self.HASHCACHE_MAX_FILE_BYTES = int(
+            os.getenv("HASHCACHE_MAX_FILE_BYTES", str(16 * 1024 * 1024))
+        )
+        self.HASHCACHE_PATH = os.getenv("HASHCACHE_PATH", "") or os.path.join(
+            self.TARGET_DIR, ".git", "sbsync", "hash-cache.pickle"
+        )
+
+        # Files still being written are deferred to a later cycle: stable once unchanged
+        # for STABILITY_SETTLE_SECONDS (STABILITY_LARGE_SETTLE_SECONDS for files of at
+        # least STABILITY_LARGE_BYTES). 0 disables the gate.
+        self.STABILITY_SETTLE_SECONDS = float(os.getenv("STABILITY_SETTLE_SECONDS", "10"))
+        self.STABILITY_LARGE_SETTLE_SECONDS = float(
+            os.getenv("STABILITY_LARGE_SETTLE_SECONDS", "60")
+        )
+        self.STABILITY_LARGE_BYTES = int(
+            os.getenv("STABILITY_LARGE_BYTES", str(8 * 1024 * 1024))
+        )
+        # A path deferred for this long is committed even if it is still changing (a
+        # note autosaved while being typed never settles); keep it under
+        # DEBOUNCE_MAX_WAIT_SECONDS so that guarantee holds
+        self.STABILITY_MAX_DEFER_SECONDS = float(
+            os.getenv("STABILITY_MAX_DEFER_SECONDS", "300")
+        )
+
+        # Event storm (e.g. Google Drive reconciling): above this many events per second
+        # the watcher stops per-event work and reconciles with one full sync once the
+        # rate stays under a tenth of it for STORM_QUIET_SECONDS
+        self.STORM_EVENTS_PER_SECOND = int(os.getenv("STORM_EVENTS_PER_SECOND", "200"))
+        self.STORM_QUIET_SECONDS = int(os.getenv("STORM_QUIET_SECONDS", "10"))
 
         # Watchdog Polling Mode (useful for WSL/Docker mounted volumes)
         self.USE_POLLING = os.getenv("USE_POLLING", "false").lower() == "true"
 
+        # Polling engine: "vault" (persistent incremental index) or "watchdog"
+        # (watchdog's PollingObserver, full snapshot every poll)
+        self.POLLING_ENGINE = os.getenv("POLLING_ENGINE", "vault").lower()
+        self.POLL_INTERVAL_SECONDS = float(os.getenv("POLL_INTERVAL_SECONDS", "5"))
+        # Files in quiet directories are re-stat'ed once every N polls (striped), so an
+        # in-place edit in a directory that saw no recent change can take up to
+        # POLL_DEEP_SCAN_EVERY x POLL_INTERVAL_SECONDS (60s by default) to be detected;
+        # new, deleted and renamed files change the directory mtime and are seen next poll
+        self.POLL_DEEP_SCAN_EVERY = int(os.getenv("POLL_DEEP_SCAN_EVERY", "12"))
+        # Where the poll index is persisted across restarts (empty = inside .git)
+        self.POLL_INDEX_PATH = os.getenv("POLL_INDEX_PATH", "") or os.path.join(
+            self.TARGET_DIR, ".git", "sbsync", "poll-index.pickle"
+        )
+        self.POLL_INDEX_SAVE_SECONDS = int(os.getenv("POLL_INDEX_SAVE_SECONDS", "60"))
+
     def validate(self):
         if not self.GIT_REMOTE_URL:
             print("WARNING: GIT_REMOTE_URL is not set. Git operations might fail.")
@@ -0,0 +1,109 @@
+import threading
+import time
+
+from src.metrics import (
+    SYNC_QUEUE_DEPTH,
+    SYNC_TRIGGERS_COALESCED_TOTAL,
+    SYNC_TRIGGER_LATENCY_SECONDS,
+)
+from src.utils import logger
+
+
+class _Trigger:
+    __slots__ = ("reason", "requested_at", "done")
+
+    def __init__(self, reason):
+        self.reason = reason
+        self.requested_at = time.monotonic()
+        self.done = threading.Event()
+
+
+class SyncCoordinator:
+    """Runs every sync cycle on one worker thread.
+
+    Debounce, periodic and initial syncs call `request(reason)` instead of
+    `GitHandler.sync()`. Requests that arrive while a cycle is in flight (or
+    while another request is already queued) are merged into exactly one
+    follow-up cycle, so two cycles never overlap on the same repository.
+    """
+
+    def __init__(self, sync_fn, on_cycle_done=None):
+        self.sync_fn = sync_fn
+        # Called with the duration of every finished cycle (e.g. Debouncer.observe_cost).
+        self.on_cycle_done = on_cycle_done
+        self._cond = threading.Condition()
+        self._pending = []
+        self._running = False
+        self._stopped = False
+        self._thread = None
+        self.cycles = 0
+
+    def start(self):
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="sync-worker", daemon=True)
+        self._thread.start()
+        return self
+
+    def request(self, reason, wait=False, timeout=None):
+        """
+        Ask for a sync cycle tagged with `reason`.
+        With `wait=True`, block until the cycle that serves this request finished.
+        """
+        trigger = _Trigger(reason)
+        with self._cond:
+            if self._pending:
+                # Another request already guarantees a (follow-up) cycle.
+                SYNC_TRIGGERS_COALESCED_TOTAL.labels(trigger=reason).inc()
+            self._pending.append(trigger)
+            SYNC_QUEUE_DEPTH.set(len(self._pending))
+            self._cond.notify()
+
+        if wait:
+            return trigger.done.wait(timeout)
+        return True
+
+    @property
+    def busy(self):
+        with self._cond:
+            return self._running or bool(self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                batch, self._pending = self._pending, []
+                self._running = True
+                SYNC_QUEUE_DEPTH.set(0)
+
+            # The first trigger names the cycle; the rest rode along.
+            reason = batch[0].reason
+            started = time.monotonic()
+            self.cycles += 1
+            logger.info(
+                "Sync cycle #%d (trigger: %s, %d request(s))", self.cycles, reason, len(batch)
+            )
+            try:
+                self.sync_fn(reason)
+            except Exception:
+                logger.exception("Sync cycle #%d failed", self.cycles)
+            finally:
+                finished = time.monotonic()
+                with self._cond:
+                    self._running = False
+                for trigger in batch:
+                    SYNC_TRIGGER_LATENCY_SECONDS.labels(trigger=trigger.reason).observe(
+                        finished - trigger.requested_at
+                    )
+                    trigger.done.set()
+            if self.on_cycle_done is not None:
+                self.on_cycle_done(finished - started)
+
+    def stop(self, timeout=None):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
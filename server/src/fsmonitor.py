@@ -0,0 +1,221 @@
+import hashlib
+import os
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+
+from src.config import config
+from src.metrics import FSMONITOR_QUERIES_TOTAL
+from src.utils import logger
+
+# Answer meaning "assume everything changed" in git's fsmonitor hook protocol.
+FULL_RESCAN = None
+
+HOOK_TEMPLATE = """#!{python} -S
+# Generated by sbSync: answers git's fsmonitor (hook protocol v2) queries from
+# the running sbSync watcher. Exits non-zero when sbSync is not reachable so git
+# falls back to a normal scan.
+import socket
+import sys
+
+SOCKET_PATH = {socket_path!r}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != "2":
+        return 1
+    token = sys.argv[2] if len(sys.argv) > 2 else ""
+    try:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(10)
+        conn.connect(SOCKET_PATH)
+        conn.sendall(("2 " + token + "\\n").encode("utf-8", "surrogateescape"))
+        conn.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        conn.close()
+    except OSError:
+        return 1
+    data = b"".join(chunks)
+    if not data:
+        return 1
+    sys.stdout.buffer.write(data)
+    return 0
+
+
+sys.exit(main())
+"""
+
+
+def default_socket_path(repo_path):
+    # AF_UNIX paths are limited to ~104 bytes, too short for many vault paths.
+    digest = hashlib.sha1(os.path.abspath(repo_path).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"sbsync-fsmonitor-{digest}.sock")
+
+
+class EventJournal:
+    """Bounded, sequence-numbered log of changed paths, queried by git via fsmonitor.
+
+    Tokens are `sbsync:<instance>:<seq>`. A token from another process instance,
+    or one older than the oldest retained entry, gets a full-rescan answer.
+    """
+
+    def __init__(self, root, max_entries=None):
+        self.root = os.path.abspath(root)
+        self.instance = uuid.uuid4().hex[:12]
+        maxlen = max_entries if max_entries is not None else config.FSMONITOR_JOURNAL_SIZE
+        self._entries = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._seq = 0
+        # Tokens with seq below this can no longer be answered incrementally.
+        self._floor = 0
+        # While suspended (event storm) nothing is recorded and every query is a full rescan.
+        self._suspended = False
+
+    def _token(self, seq):
+        return f"sbsync:{self.instance}:{seq}"
+
+    def record(self, path, is_dir=False):
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel in (".", "..") or rel.startswith(".." + os.sep):
+            return
+        rel = rel.replace(os.sep, "/")
+        if is_dir:
+            rel += "/"
+        with self._lock:
+            if self._suspended:
+                return
+            if len(self._entries) == self._entries.maxlen:
+                self._floor = self._entries[0][0]
+            self._seq += 1
+            self._entries.append((self._seq, rel))
+
+    def invalidate(self):
+        """Make every outstanding token answer with a full rescan (e.g. after a storm)."""
+        with self._lock:
+            self._invalidate_locked()
+
+    def _invalidate_locked(self):
+        self._entries.clear()
+        self._seq += 1
+        self._floor = self._seq
+
+    def suspend(self):
+        """Stop journaling; queries get a full rescan until `resume()`."""
+        with self._lock:
+            self._suspended = True
+            self._invalidate_locked()
+
+    def resume(self):
+        # Tokens handed out while suspended don't cover the unjournaled changes.
+        with self._lock:
+            self._suspended = False
+            self._invalidate_locked()
+
+    @property
+    def suspended(self):
+        return self._suspended
+
+    def since(self, token):
+        """Return (new_token, changed paths) or (new_token, FULL_RESCAN)."""
+        with self._lock:
+            new_token = self._token(self._seq)
+            if self._suspended:
+                return new_token, FULL_RESCAN
+            prefix, _, seq_text = token.rpartition(":")
+            if prefix != f"sbsync:{self.instance}" or not seq_text.isdigit():
+                return new_token, FULL_RESCAN
+            seq = int(seq_text)
+            if seq < self._floor or seq > self._seq:
+                return new_token, FULL_RESCAN
+            if not self._entries:
+                return new_token, []
+            start = max(0, seq - self._entries[0][0] + 1)
+            paths = {rel for _, rel in islice(self._entries, start, None)}
+        return new_token, sorted(paths)
+
+
+class _QueryHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline().decode("utf-8", "surrogateescape").rstrip("\n")
+        version, _, token = line.partition(" ")
+        if version != "2":
+            return
+        new_token, paths = self.server.journal.since(token)
+        if paths is FULL_RESCAN:
+            FSMONITOR_QUERIES_TOTAL.labels(result="full").inc()
+            paths = ["/"]
+        else:
+            FSMONITOR_QUERIES_TOTAL.labels(result="incremental").inc()
+        body = "\0".join([new_token, *paths]) + "\0"
+        self.wfile.write(body.encode("utf-8", "surrogateescape"))
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class FsMonitorServer:
+    """Serves `EventJournal.since()` on a UNIX socket for the generated hook script."""
+
+    def __init__(self, journal, socket_path):
+        self.journal = journal
+        self.socket_path = socket_path
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        try:
+            if stat.S_ISSOCK(os.lstat(self.socket_path).st_mode):
+                os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        self._server = _UnixServer(self.socket_path, _QueryHandler)
+        self._server.journal = self.journal
+        os.chmod(self.socket_path, 0o600)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fsmonitor", daemon=True
+        )
+        self._thread.start()
+        logger.info("fsmonitor journal listening on %s", self.socket_path)
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        self._server = None
+
+
+def install_hook(git_dir, socket_path):
+    """Write the fsmonitor hook for `socket_path` under .git/sbsync and return its path."""
+    hook_dir = os.path.join(git_dir, "sbsync")
+    os.makedirs(hook_dir, exist_ok=True)
+    hook_path = os.path.join(hook_dir, "fsmonitor-hook")
+    content = HOOK_TEMPLATE.format(python=sys.executable, socket_path=socket_path)
+    try:
+        with open(hook_path) as f:
+            if f.read() == content:
+                return hook_path
+    except FileNotFoundError:
+        pass
+    tmp = hook_path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(content)
+    os.chmod(tmp, 0o755)
+    os.replace(tmp, hook_path)
+    return hook_path
@@ -0,0 +1,234 @@
+import abc
+import os
+import subprocess
+import threading
+
+import git
+
+from src.config import config
+from src.utils import logger
+
+# Tree entry mode of a subdirectory in a raw tree object.
+_TREE_MODE = b"40000"
+
+
+class GitBackend(abc.ABC):
+    """Read-side git queries used by GitHandler.
+
+    Object reads (rev resolution, tree listings, blobs) are immutable and can be
+    served by a long-lived process; anything that looks at the index or the
+    working tree (status) and all network operations stay on the git CLI.
+    `forks` counts the git processes this backend started.
+    """
+
+    name = "base"
+
+    def __init__(self, repo):
+        self.repo = repo
+        self.forks = 0
+
+    @abc.abstractmethod
+    def rev_parse(self, rev):
+        """Full object id of the commit `rev` points to, or None if it does not resolve."""
+
+    @abc.abstractmethod
+    def tree_files(self, rev):
+        """Set of all file paths in the tree of `rev` (like `ls-tree -r --name-only`)."""
+
+    @abc.abstractmethod
+    def read_blob(self, rev, path):
+        """Contents of `path` at `rev` as bytes, or None if missing."""
+
+    @abc.abstractmethod
+    def object_size(self, oid):
+        """Size in bytes of object `oid` (like `cat-file -s`), or None if missing."""
+
+    def is_dirty(self):
+        """True if the index or working tree differ from HEAD, untracked files included."""
+        # One `git status` (fsmonitor + untracked cache aware) instead of GitPython's
+        # `is_dirty(untracked_files=True)`, which runs two diffs and a status.
+        self.forks += 1
+        return bool(self.repo.git.status("--porcelain", "-z", "--untracked-files=normal"))
+
+    def close(self):
+        pass
+
+
+class CliGitBackend(GitBackend):
+    """One `git` process per query, through GitPython."""
+
+    name = "cli"
+
+    def rev_parse(self, rev):
+        self.forks += 1
+        status, out, _ = self.repo.git.rev_parse(
+            "--verify",
+            "-q",
+            f"{rev}^{{commit}}",
+            with_extended_output=True,
+            with_exceptions=False,
+        )
+        return out.strip() if status == 0 and out else None
+
+    def tree_files(self, rev):
+        self.forks += 1
+        out = self.repo.git.ls_tree("-r", "-z", "--name-only", rev)
+        return {p for p in out.split("\0") if p}
+
+    def read_blob(self, rev, path):
+        self.forks += 1
+        status, out, _ = self.repo.git.cat_file(
+            "blob",
+            f"{rev}:{path}",
+            with_extended_output=True,
+            with_exceptions=False,
+            stdout_as_string=False,
+            strip_newline_in_stdout=False,
+        )
+        return out if status == 0 else None
+
+    def object_size(self, oid):
+        self.forks += 1
+        status, out, _ = self.repo.git.cat_file(
+            "-s", oid, with_extended_output=True, with_exceptions=False
+        )
+        return int(out) if status == 0 else None
+
+
+class _CatFile:
+    """A persistent `git cat-file --batch[-check]` coprocess."""
+
+    def __init__(self, backend, mode):
+        self.backend = backend
+        self.mode = mode
+        self.proc = None
+
+    def _start(self):
+        repo = self.backend.repo
+        env = dict(os.environ)
+        env.update(repo.git.environment())
+        self.proc = subprocess.Popen(
+            ["git", "cat-file", self.mode],
+            cwd=repo.working_tree_dir or repo.git_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+        self.backend.forks += 1
+
+    def query(self, spec):
+        """Return (oid, type, size, content or None) for `spec`, or None if it is missing."""
+        if "\n" in spec:
+            return None
+        for attempt in (0, 1):
+            if self.proc is None or self.proc.poll() is not None:
+                self._start()
+            try:
+                self.proc.stdin.write(spec.encode("utf-8", "surrogateescape") + b"\n")
+                self.proc.stdin.flush()
+                header = self.proc.stdout.readline()
+                if not header:
+                    raise BrokenPipeError("git cat-file exited")
+                parts = header.split()
+                if parts[-1] in (b"missing", b"ambiguous"):
+                    # "<spec> missing" / "<spec> ambiguous"; the spec may contain spaces.
+                    return None
+                oid, obj_type, size = parts[0].decode(), parts[1].decode(), int(parts[2])
+                content = None
+                if self.mode == "--batch":
+                    content = self.proc.stdout.read(size)
+                    self.proc.stdout.read(1)
+                return oid, obj_type, size, content
+            except (BrokenPipeError, OSError, ValueError):
+                self.close()
+                if attempt:
+                    raise
+                logger.debug("git cat-file %s died; restarting", self.mode)
+        return None
+
+    def close(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self.proc = None
+
+
+class CatFileGitBackend(GitBackend):
+    """Serves object reads from two persistent `git cat-file` coprocesses.
+
+    The pack index and delta base cache stay warm across queries, and a tree
+    listing is a series of pipe round trips instead of a fork. New packs (after a
+    fetch) are picked up by git itself when an object is not found.
+    """
+
+    name = "catfile"
+
+    def __init__(self, repo):
+        super().__init__(repo)
+        self._lock = threading.Lock()
+        self._batch = _CatFile(self, "--batch")
+        self._check = _CatFile(self, "--batch-check")
+
+    def rev_parse(self, rev):
+        with self._lock:
+            result = self._check.query(f"{rev}^{{commit}}")
+        return result[0] if result else None
+
+    def tree_files(self, rev):
+        files = set()
+        with self._lock:
+            result = self._batch.query(f"{rev}^{{tree}}")
+            if result is None:
+                raise git.exc.BadName(rev)
+            oid_len = len(result[0]) // 2
+            stack = [("", result[3])]
+            while stack:
+                prefix, data = stack.pop()
+                pos = 0
+                while pos < len(data):
+                    space = data.index(b" ", pos)
+                    nul = data.index(b"\0", space)
+                    mode = data[pos:space]
+                    name = data[space + 1 : nul].decode("utf-8", "surrogateescape")
+                    oid = data[nul + 1 : nul + 1 + oid_len].hex()
+                    pos = nul + 1 + oid_len
+                    if mode == _TREE_MODE:
+                        stack.append((f"{prefix}{name}/", self._batch.query(oid)[3]))
+                    else:
+                        files.add(prefix + name)
+        return files
+
+    def read_blob(self, rev, path):
+        with self._lock:
+            result = self._batch.query(f"{rev}:{path}")
+        if result is None or result[1] != "blob":
+            return None
+        return result[3]
+
+    def object_size(self, oid):
+        with self._lock:
+            result = self._check.query(oid)
+        return result[2] if result else None
+
+    def close(self):
+        with self._lock:
+            self._batch.close()
+            self._check.close()
+
+
+BACKENDS = {CliGitBackend.name: CliGitBackend, CatFileGitBackend.name: CatFileGitBackend}
+
+
+def make_backend(repo, name=None):
+    name = (name or config.GIT_BACKEND).lower()
+    if name not in BACKENDS:
+        logger.warning("Unknown GIT_BACKEND %r; using %s.", name, CatFileGitBackend.name)
+        name = CatFileGitBackend.name
+    return BACKENDS[name](repo)
@@ -1,16 +1,70 @@
 import os
 import git
+import subprocess
+import threading
 import time
 from pathlib import Path
+from src.changeset import ChangeBatch
 from src.config import config
+from src.fsmonitor import default_socket_path, install_hook
+from src.git_backend import make_backend
+from src.phases import timed_phase
+from src.recorder import recorder
 from src.utils import logger
-from src.metrics import COMMITS_TOTAL, PUSHES_TOTAL, ERRORS_TOTAL, LAST_SYNC_TIMESTAMP
+from src.metrics import (
+    CHANGE_TO_COMMIT_SECONDS,
+    COMMIT_TO_PUSH_SECONDS,
+    COMMITS_TOTAL,
+    ERRORS_TOTAL,
+    FILES_STAGED,
+    LAST_SYNC_TIMESTAMP,
+    PUSH_BYTES,
+    PULL_REBASE_SECONDS,
+    PULLS_SKIPPED_TOTAL,
+    PUSHES_TOTAL,
+)
+
+
+# Keep each `git add`/`ls-files` argv well below ARG_MAX on large change sets.
+PATHSPEC_CHUNK_SIZE = 500
+
+# Commit trailer carrying the batch's first-change time (Unix seconds), so pull
+# clients can measure edit-to-visible latency.
+FIRST_CHANGE_TRAILER = "Sbsync-First-Change"
+
+
+def _chunks(items, size=PATHSPEC_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _literal(paths):
+    """Pathspecs for exactly `paths`: git would expand `*`, `?` and `[...]` in file names."""
+    return [f":(literal){p}" for p in paths]
 
 
 class GitHandler:
-    def __init__(self, repo_path=None):
+    def __init__(self, repo_path=None, change_set=None, hash_cache=None, stability_gate=None):
         self.repo_path = repo_path or config.TARGET_DIR
+        self.change_set = change_set
+        self.hash_cache = hash_cache
+        self.stability_gate = stability_gate
+        # Called with a delay in seconds when paths were deferred as still being written.
+        self.on_deferred = None
+        # Called after every new local commit (e.g. PushWorker.request); when unset,
+        # sync() pushes inline.
+        self.on_committed = None
+        # Called with (sha, branch) after every successful push (e.g. PushNotifier.notify).
+        self.on_pushed = None
+        # Held for a whole sync cycle and by anything else that rewrites the index or
+        # working tree (the push worker's rebase).
+        self.lock = threading.RLock()
+        self.fsmonitor_socket = config.FSMONITOR_SOCKET or default_socket_path(self.repo_path)
         self.repo = self._init_repo()
+        self.backend = make_backend(self.repo) if self.repo else None
+        if self.repo:
+            # Sync cycles keep their git commands for /debug/syncs.
+            recorder.attach(self.repo)
 
     def _git_env(self):
         """
@@ -31,33 +85,32 @@ class GitHandler:
 
     def _try_pull_rebase(self):
         """
-        Try to update the local working tree from the remote.
-        - Only runs when a remote is configured.
-        - Only runs when the working tree is clean (to avoid rebase/pull failures).
-        - Only runs when an upstream tracking branch exists.
+        Integrate remote changes: fetch, then rebase local commits onto the upstream.
+        - Runs after the local snapshot is committed; edits made since then are carried
+          over with --autostash, so an always-dirty vault still receives remote updates.
+        - Only runs when a remote is configured and an upstream tracking branch exists.
+        - Leaves the working tree alone when the upstream has nothing new.
         """
         if not self.repo or not config.GIT_REMOTE_URL:
             return
 
         try:
-            # Pulling with local changes often fails; skip to keep the process resilient.
-            if self.repo.is_dirty(untracked_files=True):
-                logger.info("Local changes detected; skipping pull --rebase.")
-                return
-
             # active_branch can raise when HEAD is detached or the repo has no commits yet.
             branch = self.repo.active_branch
             tracking = branch.tracking_branch()
-            if tracking is None:
+            if tracking is None or self.backend.rev_parse("HEAD") is None:
                 logger.info(
                     "No upstream configured for branch %s; skipping pull --rebase.",
                     branch.name,
                 )
+                PULLS_SKIPPED_TOTAL.labels(reason="no_upstream").inc()
                 return
 
-            logger.info("Pulling latest changes (rebase) from %s...", tracking)
-            self.repo.git.pull("--rebase")
-            logger.info("Pull completed.")
+            with timed_phase("pull"):
+                with timed_phase("fetch"):
+                    self.repo.git.fetch("origin")
+                if self._rebase_onto(tracking.name):
+                    logger.info("Pulled latest changes (rebase) from %s.", tracking)
         except git.exc.GitCommandError as e:
             logger.warning("Pull --rebase failed: %s", e)
             ERRORS_TOTAL.inc()
@@ -65,6 +118,43 @@ class GitHandler:
             logger.warning("Pull failed: %s", e)
             ERRORS_TOTAL.inc()
 
+    def _rebase_onto(self, upstream):
+        """
+        Replay local commits onto `upstream` in one `git rebase --autostash`; git only
+        rewrites the paths that differ. On conflicts the rebase is aborted and the
+        error re-raised, leaving the branch as it was.
+        Returns False without touching the working tree when HEAD already contains `upstream`.
+        """
+        status, _, _ = self.repo.git.merge_base(
+            "--is-ancestor",
+            upstream,
+            "HEAD",
+            with_extended_output=True,
+            with_exceptions=False,
+        )
+        if status == 0:
+            PULLS_SKIPPED_TOTAL.labels(reason="up_to_date").inc()
+            return False
+
+        started = time.monotonic()
+        try:
+            _, _, stderr = self.repo.git.rebase(
+                "--autostash", upstream, with_extended_output=True
+            )
+        except git.exc.GitCommandError:
+            self.repo.git.rebase("--abort", with_exceptions=False)
+            PULL_REBASE_SECONDS.labels(result="conflict").observe(time.monotonic() - started)
+            raise
+        PULL_REBASE_SECONDS.labels(result="ok").observe(time.monotonic() - started)
+
+        if "autostash" in stderr.lower() and "conflict" in stderr.lower():
+            # git keeps the conflicting uncommitted edits in `git stash` instead of the tree.
+            logger.warning("Uncommitted edits conflicted with remote changes; kept in git stash.")
+            ERRORS_TOTAL.inc()
+        if self.hash_cache is not None:
+            self.hash_cache.check_head(self.repo)
+        return True
+
     def _init_repo(self):
         try:
             repo_path = Path(self.repo_path)
@@ -102,6 +192,8 @@ class GitHandler:
                 git_config.set_value("user", "name", config.GIT_USER_NAME)
                 git_config.set_value("user", "email", config.GIT_USER_EMAIL)
 
+            self._configure_index(repo)
+
             # Configure Remote if not exists
             if config.GIT_REMOTE_URL:
                 if "origin" not in repo.remotes:
@@ -120,54 +212,310 @@ class GitHandler:
             ERRORS_TOTAL.inc()
             return None
 
+    def _configure_index(self, repo):
+        """
+        Make status/add/diff cost proportional to the edits instead of the vault size:
+        - core.untrackedCache: cache per-directory untracked listings.
+        - core.splitIndex: index writes only rewrite the changed entries.
+        - core.fsmonitor: git asks our watcher's journal which paths changed
+          instead of lstat()ing every index entry.
+        NOTE: GitPython's in-process IndexFile can't read split indexes; index
+        updates must go through the git CLI.
+        """
+        with repo.config_writer() as git_config:
+            git_config.set_value(
+                "core", "untrackedCache", "true" if config.GIT_UNTRACKED_CACHE else "false"
+            )
+            git_config.set_value(
+                "core", "splitIndex", "true" if config.GIT_SPLIT_INDEX else "false"
+            )
+
+            if config.FSMONITOR_ENABLED:
+                hook_path = install_hook(repo.git_dir, self.fsmonitor_socket)
+                git_config.set_value("core", "fsmonitor", hook_path)
+                git_config.set_value("core", "fsmonitorHookVersion", 2)
+            elif git_config.has_option("core", "fsmonitor") and str(
+                git_config.get_value("core", "fsmonitor")
+            ).endswith(os.path.join("sbsync", "fsmonitor-hook")):
+                git_config.remove_option("core", "fsmonitor")
+
     def has_changes(self):
         if not self.repo:
             return False
         try:
             # Check for unstaged changes and untracked files
-            return self.repo.is_dirty(untracked_files=True)
+            with timed_phase("status"):
+                return self.backend.is_dirty()
         except Exception as e:
             logger.error("Error checking changes: %s", e)
             ERRORS_TOTAL.inc()
             return False
 
-    def sync(self):
-        if not self.repo:
-            return
+    def _tracked_paths(self, paths):
+        """Subset of `paths` (files or directories) that have index entries."""
+        tracked = []
+        for chunk in _chunks(paths):
+            output = self.repo.git.ls_files("-z", "--", *_literal(chunk))
+            tracked.extend(p for p in output.split("\0") if p)
+        return tracked
 
-        try:
-            # Best-effort update from remote first (when safe), then commit/push local changes.
-            self._try_pull_rebase()
+    def _git_stdin(self, args, stdin):
+        """Run `git <args>` feeding `stdin`; GitPython cannot pass input data."""
+        env = dict(os.environ)
+        env.update(self.repo.git.environment())
+        return subprocess.run(
+            ["git", *args],
+            cwd=self.repo_path,
+            input=stdin,
+            capture_output=True,
+            env=env,
+        )
 
+    def _ignored_paths(self, paths):
+        """Subset of untracked `paths` excluded by .gitignore; `git add` rejects these."""
+        result = self._git_stdin(
+            ["check-ignore", "-z", "--stdin"],
+            "\0".join(paths).encode("utf-8", "surrogateescape") + b"\0",
+        )
+        # 0: some paths ignored, 1: none ignored, anything else is a real failure.
+        if result.returncode == 1:
+            return set()
+        if result.returncode != 0:
+            raise git.exc.GitCommandError(
+                ["git", "check-ignore"], result.returncode, result.stderr
+            )
+        output = result.stdout.decode("utf-8", "surrogateescape")
+        return {p for p in output.split("\0") if p}
+
+    def _stage_paths(self, paths):
+        """
+        Stage only `paths` (`git add -A -- <paths>`), dropping paths git would reject:
+        untracked paths that no longer exist and paths matched by .gitignore.
+        Returns the number of pathspecs passed to `git add`.
+        """
+        present, missing = [], []
+        for path in paths:
+            if os.path.lexists(os.path.join(self.repo_path, path)):
+                present.append(path)
+            else:
+                missing.append(path)
+
+        # Deleted files (or moved-away directories) still need staging if tracked.
+        candidates = present + (self._tracked_paths(missing) if missing else [])
+        if present:
+            ignored = self._ignored_paths(present)
+            candidates = [p for p in candidates if p not in ignored]
+
+        for chunk in _chunks(candidates):
+            self.repo.git.add("-A", "--", *_literal(chunk))
+        return len(candidates)
+
+    def _has_staged_changes(self):
+        # Compares the index against HEAD only; no working tree walk.
+        with timed_phase("status"):
+            status, _, _ = self.repo.git.diff(
+                "--cached", "--quiet", with_extended_output=True, with_exceptions=False
+            )
+        return status == 1
+
+    def _staged_paths(self):
+        """Paths whose index entry differs from HEAD (O(changes) with fsmonitor)."""
+        out = self.repo.git.diff("--cached", "--name-only", "--no-renames", "-z")
+        return [p for p in out.split("\0") if p]
+
+    def _defer_unstable(self, batch, paths, wait):
+        """Requeue paths that are still being written and ask for a follow-up cycle."""
+        logger.info(
+            "Deferring %d path(s) still being written; retrying in %.0fs.", len(paths), wait
+        )
+        if self.change_set is not None:
+            self.change_set.restore(
+                ChangeBatch(
+                    {p: "modified" for p in paths},
+                    first_change_at=batch.first_change_at if batch is not None else None,
+                )
+            )
+        if self.on_deferred is not None:
+            self.on_deferred(wait)
+
+    def _unpushed_commit_times(self):
+        """Commit times of local commits no `origin/*` ref contains."""
+        # Called from the push worker: GitPython's shared cat-file process is not
+        # thread-safe, so resolve HEAD through the backend.
+        if self.backend.rev_parse("HEAD") is None:
+            return []
+        # Author time: the pull/push rebase rewrites the committer time of every
+        # replayed commit, the author time is when sbSync made the commit.
+        out = self.repo.git.log("--format=%at", "HEAD", "--not", "--remotes=origin")
+        return [int(t) for t in out.split()]
+
+    def unpushed_commits(self):
+        """(count, oldest commit time) of local commits no `origin/*` ref contains."""
+        times = self._unpushed_commit_times()
+        return len(times), (min(times) if times else None)
+
+    def _unpushed_bytes(self):
+        """On-disk size of the objects the remote does not have yet (None if unknown)."""
+        status, out, _ = self.repo.git.rev_list(
+            "--objects",
+            "--disk-usage",
+            "HEAD",
+            "--not",
+            "--remotes=origin",
+            with_extended_output=True,
+            with_exceptions=False,
+        )
+        return int(out) if status == 0 and out.strip().isdigit() else None
+
+    def push(self):
+        """Push every local commit of the current branch in one `git push`."""
+        branch = self.repo.active_branch
+        commit_times = self._unpushed_commit_times()
+        pending_bytes = self._unpushed_bytes() if commit_times else 0
+        with timed_phase("push"):
+            if branch.tracking_branch() is None:
+                self.repo.git.push("-u", "origin", branch.name)
+            else:
+                self.repo.git.push()
+        if pending_bytes is not None:
+            PUSH_BYTES.observe(pending_bytes)
+        pushed_at = time.time()
+        for commit_time in commit_times:
+            COMMIT_TO_PUSH_SECONDS.observe(max(0.0, pushed_at - commit_time))
+        if self.on_pushed is not None:
+            # The tracking ref is what the remote accepted; HEAD may have moved since.
+            tracking = branch.tracking_branch()
+            if tracking is not None:
+                self.on_pushed(self.backend.rev_parse(tracking.path), branch.name)
+
+    def fetch_rebase(self):
+        """
+        Fetch origin and replay local commits on top of the upstream branch.
+        Uncommitted edits are carried over with --autostash; on conflicts the rebase
+        is aborted and the error re-raised, leaving the branch as it was.
+        """
+        with self.lock:
+            with timed_phase("fetch"):
+                self.repo.git.fetch("origin")
+            branch = self.repo.active_branch
+            tracking = branch.tracking_branch()
+            self._rebase_onto(
+                tracking.name if tracking is not None else f"origin/{branch.name}"
+            )
+
+    def _commit_batch(self, batch):
+        """Stage `batch` (or the whole tree) and commit it; True if a commit was made."""
+        if batch is None or batch.full_rescan:
             if not self.has_changes():
                 logger.info("No changes to sync.")
-                return
+                return False
 
             # Add all changes (Obsidian Vault assets: md, png, jpg, etc.)
             # git add . automatically respects .gitignore if present in Vault
-            self.repo.git.add(A=True)
+            with timed_phase("add"):
+                self.repo.git.add(A=True)
             logger.info("Added all changes.")
+            staged_paths = None
+            if self.hash_cache is not None or self.stability_gate is not None:
+                staged_paths = self._staged_paths()
+            if self.stability_gate is not None:
+                staged_paths, unstable, wait = self.stability_gate.split(
+                    self.repo_path, staged_paths
+                )
+                if unstable:
+                    for chunk in _chunks(unstable):
+                        self.repo.git.reset("-q", "--", *_literal(chunk))
+                    self._defer_unstable(batch, unstable, wait)
+                    if not self._has_staged_changes():
+                        logger.info("No settled changes to sync.")
+                        return False
+        else:
+            if batch.is_empty():
+                logger.info("No changes to sync.")
+                return False
+
+            staged_paths = batch.staging_paths()
+            if self.stability_gate is not None:
+                staged_paths, unstable, wait = self.stability_gate.split(
+                    self.repo_path, staged_paths
+                )
+                if unstable:
+                    self._defer_unstable(batch, unstable, wait)
+            with timed_phase("add"):
+                staged = self._stage_paths(staged_paths) if staged_paths else 0
+            if not staged or not self._has_staged_changes():
+                logger.info("No changes to sync.")
+                return False
+            logger.info("Added %d changed paths.", staged)
+
+        if self.hash_cache is not None:
+            self.hash_cache.refresh(self.repo, staged_paths)
+        # Pathspecs may name directories, so count the files the index actually changed.
+        files_staged = len(self._staged_paths())
+        FILES_STAGED.observe(files_staged)
+        recorder.note(files_staged=files_staged)
+
+        # Commit
+        commit_message = f"Auto-sync: {time.strftime('%Y-%m-%d %H:%M:%S')}"
+        trailer = []
+        if batch is not None and batch.first_change_at is not None:
+            trailer = ["-m", f"{FIRST_CHANGE_TRAILER}: {batch.first_change_at:.3f}"]
+        with timed_phase("commit"):
+            self.repo.git.commit("-q", "-m", commit_message, *trailer)
+        logger.info("Committed: %s", commit_message)
+        COMMITS_TOTAL.inc()
+        if batch is not None and batch.first_change_at is not None:
+            CHANGE_TO_COMMIT_SECONDS.observe(max(0.0, time.time() - batch.first_change_at))
+        if self.hash_cache is not None:
+            self.hash_cache.note_head(self.repo)
+            self.hash_cache.save()
+        return True
+
+    def sync(self, trigger=None):
+        if not self.repo:
+            return
+        with self.lock, recorder.cycle(trigger or "manual"):
+            self._sync(trigger)
 
-            # Commit
-            commit_message = f"Auto-sync: {time.strftime('%Y-%m-%d %H:%M:%S')}"
-            self.repo.index.commit(commit_message)
-            logger.info("Committed: %s", commit_message)
-            COMMITS_TOTAL.inc()
+    def _sync(self, trigger):
+        if trigger:
+            logger.debug("Sync triggered by %s", trigger)
+
+        batch = self.change_set.drain() if self.change_set is not None else None
+        if batch is not None:
+            recorder.note(
+                changed_paths=len(batch.paths),
+                moved_paths=len(batch.moves),
+                full_rescan=batch.full_rescan,
+            )
+        recorder.note(head_before=self.backend.rev_parse("HEAD"))
+        try:
+            if self.hash_cache is not None:
+                self.hash_cache.check_head(self.repo)
+
+            # Commit the local snapshot first, then rebase it onto the remote, so the
+            # pull never has to wait for a clean working tree.
+            committed = self._commit_batch(batch)
+            if committed or trigger != "settle":
+                self._try_pull_rebase()
+            else:
+                # Nothing settled yet: a note typed for minutes would otherwise cost
+                # a fetch every settle interval. Other cycles keep pulling.
+                PULLS_SKIPPED_TOTAL.labels(reason="settle").inc()
+            if not committed:
+                return
 
             # Push
-            if config.GIT_REMOTE_URL:
+            if self.on_committed is not None:
+                self.on_committed()
+            elif config.GIT_REMOTE_URL:
                 logger.info("Pushing to remote...")
-                origin = self.repo.remote(name="origin")
-
-                # Handling push errors (e.g., non-fast-forward)
                 try:
-                    origin.push()
+                    self.push()
                     logger.info("Push successful.")
                     PUSHES_TOTAL.inc()
                 except git.exc.GitCommandError as e:
                     logger.warning("Push failed (possibly non-fast-forward): %s", e)
-                    # Optional: Try pull --rebase then push?
-                    # For now, just log error to avoid complex merge conflicts automatically.
                     ERRORS_TOTAL.inc()
             else:
                 logger.warning("No remote URL configured, skipping push.")
@@ -177,3 +525,8 @@ class GitHandler:
         except Exception as e:
             logger.error("Sync failed: %s", e)
             ERRORS_TOTAL.inc()
+            recorder.fail(e)
+            if batch is not None:
+                self.change_set.restore(batch)
+        finally:
+            recorder.note(head_after=self.backend.rev_parse("HEAD"))
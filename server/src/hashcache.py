@@ -0,0 +1,219 @@
+import hashlib
+import os
+import pickle
+import re
+import threading
+
+from src.config import config
+from src.metrics import (
+    HASH_CACHE_CHECKS_TOTAL,
+    HASH_CACHE_ENTRIES,
+    HASH_CACHE_SUPPRESSION_RATIO,
+)
+from src.utils import logger
+
+CACHE_VERSION = 1
+
+# Keep each `ls-files` argv well below ARG_MAX (same as git_handler).
+_CHUNK_SIZE = 500
+
+# One entry of `git ls-files -s --debug -z`: "<mode> <sha> <stage>\t<path>\0" followed
+# by the cached stat data, one field group per line.
+_ENTRY_RE = re.compile(
+    r"(\d+) ([0-9a-f]+) (\d)\t([^\0]*)\0"
+    r"  ctime: \d+:\d+\n"
+    r"  mtime: (\d+):(\d+)\n"
+    r"  dev: \d+\tino: \d+\n"
+    r"  uid: \d+\tgid: \d+\n"
+    r"  size: (\d+)\tflags: [0-9a-f]+\n?"
+)
+
+# Regular files and executables; symlinks and submodules are never suppressed.
+_BLOB_MODES = frozenset({"100644", "100755"})
+
+
+def blob_sha(data):
+    """git's object id for `data` as a blob (`git hash-object` without filters)."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class HashCache:
+    """Path → (size, mtime_ns, blob sha) for the content git already has in its index.
+
+    Seeded from `git ls-files -s --debug` and refreshed for every path the sync
+    stages, so a watcher event whose file still hashes to the indexed blob (a
+    touch or a byte-identical rewrite) can be dropped before it arms a sync.
+    """
+
+    def __init__(self, root, path=None, max_file_bytes=None):
+        self.root = os.path.abspath(root)
+        self.path = path or config.HASHCACHE_PATH
+        self.max_file_bytes = (
+            max_file_bytes if max_file_bytes is not None else config.HASHCACHE_MAX_FILE_BYTES
+        )
+        self._lock = threading.Lock()
+        # rel -> [size, mtime_ns or None (racily clean: always hash), sha]
+        self._entries = {}
+        self.head = None
+        self._dirty = False
+        self._checked = 0
+        self._suppressed = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _index_path(self, repo):
+        return os.path.join(repo.git_dir, "index")
+
+    def _parse(self, repo, output):
+        # Entries written in the same timestamp as the index may be stale (racy git).
+        try:
+            index_mtime_ns = os.stat(self._index_path(repo)).st_mtime_ns
+        except OSError:
+            index_mtime_ns = 0
+        entries = {}
+        for mode, sha, stage, rel, sec, nsec, size in _ENTRY_RE.findall(output):
+            if stage != "0" or mode not in _BLOB_MODES:
+                continue
+            mtime_ns = int(sec) * 1_000_000_000 + int(nsec)
+            entries[rel] = [int(size), mtime_ns if mtime_ns < index_mtime_ns else None, sha]
+        return entries
+
+    def _head(self, repo):
+        try:
+            return repo.head.commit.hexsha
+        except ValueError:
+            # No commits yet.
+            return None
+
+    def seed(self, repo):
+        """Rebuild the cache from the whole index."""
+        entries = self._parse(repo, repo.git.ls_files("-s", "--debug", "-z"))
+        with self._lock:
+            self._entries = entries
+            self.head = self._head(repo)
+            self._dirty = True
+        HASH_CACHE_ENTRIES.set(len(entries))
+        logger.info("Hash cache seeded with %d index entries.", len(entries))
+        return len(entries)
+
+    def refresh(self, repo, paths):
+        """Re-read the index entries of `paths` after they were staged."""
+        updated = {}
+        for i in range(0, len(paths), _CHUNK_SIZE):
+            chunk = paths[i : i + _CHUNK_SIZE]
+            # Literal pathspecs: `a[1].md` must not also match `a1.md`.
+            literal = [f":(literal){p}" for p in chunk]
+            output = repo.git.ls_files("-s", "--debug", "-z", "--", *literal)
+            updated.update(self._parse(repo, output))
+        with self._lock:
+            prefixes = []
+            for rel in paths:
+                if rel not in updated and self._entries.pop(rel, None) is None:
+                    # Not a cached file: a directory pathspec (moved/deleted folder).
+                    prefixes.append(rel.rstrip("/") + "/")
+            if prefixes:
+                prefixes = tuple(prefixes)
+                for rel in [p for p in self._entries if p.startswith(prefixes)]:
+                    if rel not in updated:
+                        del self._entries[rel]
+            self._entries.update(updated)
+            self._dirty = True
+        HASH_CACHE_ENTRIES.set(len(self._entries))
+
+    def note_head(self, repo):
+        """Record HEAD after our own commit; any other HEAD move means a reseed."""
+        with self._lock:
+            self.head = self._head(repo)
+            self._dirty = True
+
+    def check_head(self, repo):
+        """Reseed when HEAD moved underneath us (e.g. a pull rewrote indexed files)."""
+        if self._head(repo) != self.head:
+            self.seed(repo)
+
+    def unchanged(self, path):
+        """True if `path` still holds exactly the blob recorded in the index."""
+        rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+        result = self._lookup(path, rel)
+        HASH_CACHE_CHECKS_TOTAL.labels(result=result).inc()
+        # Called from the watcher and the sync thread; keep both counters consistent.
+        with self._lock:
+            self._checked += 1
+            if result == "unchanged":
+                self._suppressed += 1
+            ratio = self._suppressed / self._checked
+        HASH_CACHE_SUPPRESSION_RATIO.set(ratio)
+        return result == "unchanged"
+
+    def _lookup(self, path, rel):
+        with self._lock:
+            entry = self._entries.get(rel)
+        if entry is None:
+            return "uncached"
+        size, mtime_ns, sha = entry
+        try:
+            st = os.stat(path)
+        except OSError:
+            return "changed"
+        if st.st_size != size:
+            return "changed"
+        if mtime_ns is not None and st.st_mtime_ns == mtime_ns:
+            return "unchanged"
+        if size > self.max_file_bytes:
+            return "changed"
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return "changed"
+        if blob_sha(data) != sha:
+            return "changed"
+        # Same bytes under a new mtime: remember it so the next touch skips hashing.
+        with self._lock:
+            if self._entries.get(rel) is entry:
+                entry[1] = st.st_mtime_ns
+                self._dirty = True
+        return "unchanged"
+
+    def save(self):
+        """Atomically persist the cache if it changed since the last save."""
+        with self._lock:
+            if not self._dirty or not self.path:
+                return False
+            data = {
+                "version": CACHE_VERSION,
+                "root": self.root,
+                "head": self.head,
+                "entries": self._entries,
+            }
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        return True
+
+    def load(self, repo):
+        """Load the persisted cache; False if missing, unreadable or HEAD has moved since."""
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning("Ignoring unreadable hash cache %s: %s", self.path, e)
+            return False
+
+        if data.get("version") != CACHE_VERSION or data.get("root") != self.root:
+            return False
+        if data.get("head") != self._head(repo):
+            logger.info("HEAD moved since the hash cache was saved; reseeding.")
+            return False
+        with self._lock:
+            self._entries = data["entries"]
+            self.head = data["head"]
+            self._dirty = False
+        HASH_CACHE_ENTRIES.set(len(self._entries))
+        return True
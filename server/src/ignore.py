@@ -0,0 +1,246 @@
+import os
+import re
+import threading
+
+from src.config import config
+from src.metrics import IGNORED_EVENTS_TOTAL
+from src.utils import logger
+
+# Always dropped, regardless of .gitignore: git's own bookkeeping.
+GIT_DIR_RULE = "builtin:.git/"
+
+# Directory verdicts are cached per path; bounded so a huge vault can't grow it forever.
+_DIR_CACHE_LIMIT = 4096
+
+
+def _translate(pattern, anchored):
+    """Translate one gitignore glob (without leading `!`/`/` or trailing `/`) to a regex.
+
+    Unanchored patterns (no slash in the original line) match at any depth.
+    """
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                at_start = i == 0 or pattern[i - 1] == "/"
+                at_end = i + 2 == n
+                if at_start and at_end:
+                    out.append(".*")
+                    i += 2
+                    continue
+                if at_start and pattern.startswith("**/", i):
+                    out.append("(?:.*/)?")
+                    i += 3
+                    continue
+            out.append("[^/]*")
+            while i < n and pattern[i] == "*":
+                i += 1
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = pattern.find("]", i + 2)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : j]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body + "]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    regex = "".join(out)
+    return regex if anchored else "(?:.*/)?" + regex
+
+
+class _Rule:
+    __slots__ = ("label", "regex", "negate", "dir_only")
+
+    def __init__(self, label, regex, negate, dir_only):
+        self.label = label
+        self.regex = regex
+        self.negate = negate
+        self.dir_only = dir_only
+
+
+def parse_rules(lines, source):
+    """Parse gitignore-format lines into rules; `source` prefixes each rule's label."""
+    rules = []
+    for raw in lines:
+        line = raw.rstrip("\n").rstrip("\r")
+        # Trailing spaces are ignored unless escaped.
+        while line.endswith(" ") and not line.endswith("\\ "):
+            line = line[:-1]
+        if not line or line.startswith("#"):
+            continue
+
+        pattern = line
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        elif pattern.startswith("\\!") or pattern.startswith("\\#"):
+            pattern = pattern[1:]
+
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # A slash at the beginning or middle anchors the pattern to the vault root.
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        if not pattern:
+            continue
+        regex = _translate(pattern, anchored)
+        rules.append(_Rule(f"{source}:{line}", regex, negate, dir_only))
+    return rules
+
+
+class IgnoreMatcher:
+    """Vault ignore rules compiled into two alternation regexes (files, directories).
+
+    Rules come from the vault's root `.gitignore`, `.git/info/exclude` and the
+    configured extra list. Alternatives are ordered last-rule-first, so the first
+    alternative that matches is git's "last matching pattern wins" rule and
+    `match.lastgroup` identifies it. A path is also ignored when any of its
+    parent directories is ignored, as in git.
+    """
+
+    def __init__(self, root, extra_patterns=None):
+        self.root = os.path.abspath(root)
+        self.extra_patterns = (
+            list(extra_patterns) if extra_patterns is not None else config.IGNORE_PATTERNS
+        )
+        self._lock = threading.Lock()
+        self._labels = {}
+        self._negated = set()
+        self._file_re = None
+        self._dir_re = None
+        self._dir_cache = {}
+        # (mtime, size, inode) of each source file as of the last reload.
+        self._source_signature = None
+        # Bumped on every reload so callers caching verdicts know to refresh.
+        self.generation = 0
+        self.reload()
+
+    @property
+    def source_files(self):
+        return (
+            os.path.join(self.root, ".gitignore"),
+            os.path.join(self.root, ".git", "info", "exclude"),
+        )
+
+    def _signature(self):
+        signature = []
+        for path in self.source_files:
+            try:
+                st = os.stat(path)
+            except OSError:
+                signature.append(None)
+                continue
+            signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        return tuple(signature)
+
+    def reload_if_changed(self):
+        """
+        Reload if a source file changed on disk since the last reload; two stats.
+        For callers that get no event for it (the poller never walks `.git`).
+        """
+        if self._signature() == self._source_signature:
+            return False
+        self.reload()
+        return True
+
+    def reload(self):
+        # Taken before reading, so a write racing the read triggers another reload.
+        signature = self._signature()
+        # Lowest to highest precedence, as git orders core.excludesFile,
+        # info/exclude and .gitignore.
+        rules = parse_rules(self.extra_patterns, "extra")
+        gitignore, exclude = self.source_files
+        for path, source in ((exclude, "info/exclude"), (gitignore, ".gitignore")):
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    rules.extend(parse_rules(f, source))
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning("Could not read ignore file %s: %s", path, e)
+
+        file_alts, dir_alts = [], []
+        labels, negated = [], set()
+        for index in range(len(rules) - 1, -1, -1):
+            rule = rules[index]
+            group = f"r{index}"
+            labels.append((group, rule.label))
+            if rule.negate:
+                negated.add(group)
+            alt = f"(?P<{group}>{rule.regex})"
+            dir_alts.append(alt)
+            if not rule.dir_only:
+                file_alts.append(alt)
+
+        with self._lock:
+            self._labels = dict(labels)
+            self._negated = negated
+            self._file_re = re.compile("|".join(file_alts)) if file_alts else None
+            self._dir_re = re.compile("|".join(dir_alts)) if dir_alts else None
+            self._dir_cache = {}
+            self._source_signature = signature
+            self.generation += 1
+        logger.info("Loaded %d ignore rules for %s", len(rules), self.root)
+
+    def is_source_file(self, path):
+        return os.path.abspath(path) in self.source_files
+
+    def _verdict(self, regex, relpath):
+        if regex is None:
+            return None
+        m = regex.fullmatch(relpath)
+        if m is None or m.lastgroup in self._negated:
+            return None
+        return self._labels[m.lastgroup]
+
+    def _dir_verdict(self, reldir):
+        cached = self._dir_cache.get(reldir, False)
+        if cached is not False:
+            return cached
+
+        parent = reldir.rpartition("/")[0]
+        rule = self._dir_verdict(parent) if parent else None
+        if rule is None:
+            if reldir.rpartition("/")[2] == ".git":
+                rule = GIT_DIR_RULE
+            else:
+                rule = self._verdict(self._dir_re, reldir)
+
+        if len(self._dir_cache) >= _DIR_CACHE_LIMIT:
+            self._dir_cache.clear()
+        self._dir_cache[reldir] = rule
+        return rule
+
+    def match(self, path, is_dir=False):
+        """Return the label of the rule ignoring `path`, or None if it is not ignored."""
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel in (".", "..") or rel.startswith(".." + os.sep):
+            return None
+        rel = rel.replace(os.sep, "/")
+
+        with self._lock:
+            if is_dir:
+                return self._dir_verdict(rel)
+            parent = rel.rpartition("/")[0]
+            rule = self._dir_verdict(parent) if parent else None
+            return rule or self._verdict(self._file_re, rel)
+
+    def should_drop(self, path, is_dir=False):
+        """`match()` plus the dropped-event counter; use from the event hot path."""
+        rule = self.match(path, is_dir)
+        if rule is not None:
+            IGNORED_EVENTS_TOTAL.labels(rule=rule).inc()
+        return rule is not None
@@ -1,14 +1,26 @@
-import time
 import sys
 import signal
+import threading
 from watchdog.observers import Observer as DefaultObserver
 from watchdog.observers.polling import PollingObserver
 
 from src.config import config
 from src.health import MountHealthChecker
-from src.metrics import start_metrics_server
+from src.metrics import register_repo_stats, start_metrics_server
 from src.utils import logger, Debouncer, PeriodicTimer
+from src.changeset import ChangeSet
+from src.coordinator import SyncCoordinator
+from src.fsmonitor import EventJournal, FsMonitorServer
 from src.git_handler import GitHandler
+from src.hashcache import HashCache
+from src.ignore import IgnoreMatcher
+from src.poller import VaultPollingObserver
+from src.notifier import PushNotifier
+from src.profiling import debug_routes
+from src.pusher import PushWorker
+from src.recorder import DEBUG_SYNCS_PATH, debug_syncs_route
+from src.stability import StabilityGate
+from src.timers import default_scheduler
 from src.watcher import VaultEventHandler
 
 
@@ -19,84 +31,166 @@ def main():
     config.validate()
 
     # 2. Start Metrics Server
+    # Also serves the flight recorder of recent sync cycles (GET /debug/syncs) and,
+    # with PROFILING_ENABLED, the profiling routes.
     logger.info("Starting metrics server on port %s", config.METRICS_PORT)
-    start_metrics_server(config.METRICS_PORT)
+    routes = {("GET", DEBUG_SYNCS_PATH): debug_syncs_route, **debug_routes()}
+    start_metrics_server(config.METRICS_PORT, routes=routes)
 
     # 3. Initialize Git Handler
-    git_handler = GitHandler()
+    # Paths seen by the watcher are accumulated here so each sync stages only those.
+    change_set = ChangeSet(config.TARGET_DIR)
+    # Indexed blob hashes, so touch-only rewrites never arm a sync.
+    hash_cache = HashCache(config.TARGET_DIR) if config.HASHCACHE_ENABLED else None
+    # Files still being written are deferred instead of committed half-way.
+    stability_gate = StabilityGate() if config.STABILITY_SETTLE_SECONDS > 0 else None
+    git_handler = GitHandler(
+        change_set=change_set, hash_cache=hash_cache, stability_gate=stability_gate
+    )
     if not git_handler.repo:
         logger.error("Could not initialize Git repository. Exiting.")
         sys.exit(1)
-
-    # 3.1 Initial Sync Attempt (best-effort)
+    if hash_cache is not None and not hash_cache.load(git_handler.repo):
+        hash_cache.seed(git_handler.repo)
+        hash_cache.save()
+    # Object, pack and index sizes, refreshed on a background thread.
+    register_repo_stats(git_handler.repo.working_tree_dir)
+
+    # 3.1 Sync Worker
+    # Every sync cycle runs on this one thread; triggers that arrive while a cycle
+    # is in flight are merged into a single follow-up cycle.
+    coordinator = SyncCoordinator(git_handler.sync).start()
+    # Deferred (still being written) paths get their own follow-up cycle.
+    git_handler.on_deferred = lambda delay: default_scheduler().call_later(
+        delay, lambda: coordinator.request("settle")
+    )
+
+    # 3.2 Push Worker
+    # Sync cycles only commit; pushes are batched and retried on their own thread.
+    push_worker = None
+    if config.GIT_REMOTE_URL:
+        push_worker = PushWorker(git_handler).start()
+        git_handler.on_committed = push_worker.request
+
+    # 3.3 Push Notifications
+    # Pull clients listed in NOTIFY_URLS pull right after each push instead of polling.
+    if config.NOTIFY_URLS:
+        git_handler.on_pushed = PushNotifier().notify
+
+    # 3.4 Initial Sync Attempt (best-effort)
     # Try to update from remote first (if configured), then commit/push local changes (if any).
     # GitHandler.sync() is already resilient and should not crash the main process on Git/network errors.
     logger.info("Performing initial sync attempt...")
-    git_handler.sync()
+    coordinator.request("initial", wait=True)
 
     # 4. Setup Debouncer
     # This checks for changes and commits/pushes
-    debouncer = Debouncer(config.DEBOUNCE_SECONDS, git_handler.sync)
+    debouncer = Debouncer(
+        config.DEBOUNCE_SECONDS,
+        lambda: coordinator.request("debounce"),
+        max_wait=config.DEBOUNCE_MAX_WAIT_SECONDS,
+        adaptive=config.DEBOUNCE_ADAPTIVE,
+        min_interval=config.DEBOUNCE_MIN_SECONDS,
+    )
+    coordinator.on_cycle_done = debouncer.observe_cost
 
     # 4.1 Setup Periodic Sync Timer
-    def _safe_sync():
-        try:
-            git_handler.sync()
-        except Exception:
-            logger.exception("Periodic sync failed, will retry next interval")
-
-    periodic_timer = PeriodicTimer(config.PERIODIC_SYNC_SECONDS, _safe_sync)
+    periodic_timer = PeriodicTimer(
+        config.PERIODIC_SYNC_SECONDS, lambda: coordinator.request("periodic")
+    )
     periodic_timer.start()
     logger.info("Periodic sync every %ss", config.PERIODIC_SYNC_SECONDS)
 
     # 5. Setup Watcher
-    event_handler = VaultEventHandler(on_change_callback=debouncer.call)
-
-    if config.USE_POLLING:
+    # .gitignore/.git/info/exclude + IGNORE_PATTERNS, compiled once and reloaded on change.
+    ignore_matcher = IgnoreMatcher(config.TARGET_DIR)
+    # Journal of changed paths answered to git's fsmonitor hook.
+    journal = EventJournal(config.TARGET_DIR) if config.FSMONITOR_ENABLED else None
+    event_handler = VaultEventHandler(
+        on_change_callback=debouncer.call,
+        change_set=change_set,
+        ignore_matcher=ignore_matcher,
+        journal=journal,
+        hash_cache=hash_cache,
+        # Under an event storm, skip per-event work and reconcile once it settles.
+        on_storm_start=debouncer.cancel,
+        on_storm_end=lambda: coordinator.request("storm"),
+    )
+
+    if config.USE_POLLING and config.POLLING_ENGINE == "watchdog":
         logger.info(
             "Using PollingObserver for file monitoring (WSL/Network Drive compatibility)"
         )
         observer = PollingObserver()
+    elif config.USE_POLLING:
+        logger.info(
+            "Using VaultPollingObserver every %ss (index: %s)",
+            config.POLL_INTERVAL_SECONDS,
+            config.POLL_INDEX_PATH,
+        )
+        observer = VaultPollingObserver(
+            ignore_matcher=ignore_matcher, index_path=config.POLL_INDEX_PATH
+        )
     else:
         observer = DefaultObserver()
 
     try:
         observer.schedule(event_handler, config.TARGET_DIR, recursive=True)
         observer.start()
+        # Changes made before the observer came up were never recorded; make the
+        # next cycle stage the whole tree once.
+        change_set.mark_full_rescan(reason="observer_restart")
         logger.info("Monitoring directory: %s", config.TARGET_DIR)
     except FileNotFoundError:
         logger.error("Target directory %s not found.", config.TARGET_DIR)
         sys.exit(1)
 
+    # Only answer fsmonitor queries once the observer is running; until then the
+    # hook fails and git falls back to a full scan.
+    fsmonitor_server = None
+    if journal is not None:
+        try:
+            fsmonitor_server = FsMonitorServer(journal, git_handler.fsmonitor_socket).start()
+        except OSError as e:
+            logger.warning("fsmonitor socket unavailable, git will scan normally: %s", e)
+
     # 6. Graceful Shutdown
     def signal_handler(_sig, _frame):
         logger.info("Shutting down...")
         observer.stop()
+        if fsmonitor_server is not None:
+            fsmonitor_server.stop()
         debouncer.cancel()
         periodic_timer.cancel()
+        coordinator.stop(timeout=30)
+        if push_worker is not None:
+            push_worker.stop(timeout=30)
         sys.exit(0)
 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
-    # 7. Health Check Loop (replaces idle sleep loop)
+    # 7. Health Check
+    # The shared timer thread only flags that a check is due; the check itself
+    # (stat/listdir on a possibly stale mount) runs on the main thread.
     health_checker = MountHealthChecker(config.TARGET_DIR)
     check_interval = config.HEALTH_CHECK_SECONDS
-    elapsed = 0
+    health_due = threading.Event()
+    health_timer = PeriodicTimer(check_interval, health_due.set)
+    health_timer.start()
     try:
         while True:
-            time.sleep(1)
-            elapsed += 1
-            if elapsed >= check_interval:
-                if not health_checker.check():
-                    logger.critical(
-                        "Mount is stale! Exiting for container recreation."
-                    )
-                    observer.stop()
-                    debouncer.cancel()
-                    periodic_timer.cancel()
-                    sys.exit(1)
-                elapsed = 0
+            health_due.wait()
+            health_due.clear()
+            if not health_checker.check():
+                logger.critical(
+                    "Mount is stale! Exiting for container recreation."
+                )
+                observer.stop()
+                health_timer.cancel()
+                debouncer.cancel()
+                periodic_timer.cancel()
+                sys.exit(1)
     except KeyboardInterrupt:
         observer.stop()
 
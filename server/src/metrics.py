@@ -1,4 +1,26 @@
-from prometheus_client import Counter, Gauge, start_http_server
+import json
+import logging
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import git
+from prometheus_client import (
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsHandler,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from src.config import config
+
+# src.utils imports this module, so log through the same logger by name.
+logger = logging.getLogger("sbSync")
 
 # Metrics definitions
 COMMITS_TOTAL = Counter("sbsync_commits_total", "Total number of git commits")
@@ -11,7 +33,373 @@ FILES_CHANGED_TOTAL = Counter(
     "sbsync_files_changed_total", "Total number of file change events detected"
 )
 HEALTH_STATUS = Gauge("sbsync_health_status", "Mount health status (1=healthy, 0=unhealthy)")
+FULL_RESCANS_TOTAL = Counter(
+    "sbsync_full_rescans_total",
+    "Sync cycles that fell back to full-tree staging",
+    ["reason"],
+)
+IGNORED_EVENTS_TOTAL = Counter(
+    "sbsync_ignored_events_total",
+    "File events dropped by ignore rules before reaching the debouncer",
+    ["rule"],
+)
+POLL_DURATION_SECONDS = Histogram(
+    "sbsync_poll_duration_seconds",
+    "Wall time of one polling pass over the vault",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+POLL_INDEX_FILES = Gauge("sbsync_poll_index_files", "Files tracked by the poll index")
+POLL_INDEX_DIRS = Gauge("sbsync_poll_index_dirs", "Directories tracked by the poll index")
+POLL_INDEX_BYTES = Gauge(
+    "sbsync_poll_index_bytes", "Size of the persisted poll index on disk"
+)
+FSMONITOR_QUERIES_TOTAL = Counter(
+    "sbsync_fsmonitor_queries_total",
+    "git fsmonitor hook queries answered from the event journal",
+    ["result"],
+)
+SYNC_QUEUE_DEPTH = Gauge(
+    "sbsync_sync_queue_depth", "Sync requests waiting for the sync worker"
+)
+SYNC_TRIGGERS_COALESCED_TOTAL = Counter(
+    "sbsync_sync_triggers_coalesced_total",
+    "Sync requests merged into an already queued cycle",
+    ["trigger"],
+)
+SYNC_TRIGGER_LATENCY_SECONDS = Histogram(
+    "sbsync_sync_trigger_latency_seconds",
+    "Time from a sync request until the cycle serving it finished",
+    ["trigger"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+DEBOUNCE_QUIET_SECONDS = Gauge(
+    "sbsync_debounce_quiet_seconds", "Current debounce quiet window"
+)
+CHANGE_TO_COMMIT_SECONDS = Histogram(
+    "sbsync_change_to_commit_seconds",
+    "Delay from the first unsynced change to the commit that contains it",
+    buckets=(5, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200),
+)
+STORM_ACTIVE = Gauge("sbsync_storm_active", "1 while the watcher is in event-storm mode")
+STORM_ENTRIES_TOTAL = Counter("sbsync_storm_entries_total", "Times the watcher entered storm mode")
+STORM_EXITS_TOTAL = Counter("sbsync_storm_exits_total", "Times the watcher left storm mode")
+STORM_DROPPED_EVENTS_TOTAL = Counter(
+    "sbsync_storm_dropped_events_total",
+    "File events skipped in storm mode (covered by the reconciliation sync)",
+)
+HASH_CACHE_CHECKS_TOTAL = Counter(
+    "sbsync_hash_cache_checks_total",
+    "File events checked against the indexed blob hash",
+    ["result"],
+)
+HASH_CACHE_SUPPRESSION_RATIO = Gauge(
+    "sbsync_hash_cache_suppression_ratio",
+    "Share of checked file events dropped because the content was unchanged",
+)
+HASH_CACHE_ENTRIES = Gauge("sbsync_hash_cache_entries", "Index entries in the hash cache")
+UNSTABLE_PATHS_DEFERRED_TOTAL = Counter(
+    "sbsync_unstable_paths_deferred_total",
+    "Paths held back from a commit because they were still being written",
+)
+UNSTABLE_PATHS_FORCED_TOTAL = Counter(
+    "sbsync_unstable_paths_forced_total",
+    "Paths committed while still being written because they hit STABILITY_MAX_DEFER_SECONDS",
+)
+
+UNPUSHED_COMMITS = Gauge(
+    "sbsync_unpushed_commits", "Local commits not yet on the remote"
+)
+UNPUSHED_OLDEST_AGE_SECONDS = Gauge(
+    "sbsync_unpushed_oldest_age_seconds",
+    "Age of the oldest local commit not yet on the remote (0 when none)",
+)
+PUSH_ATTEMPTS_TOTAL = Counter(
+    "sbsync_push_attempts_total",
+    "Push attempts by the push worker",
+    ["result"],
+)
+COMMIT_TO_PUSH_SECONDS = Histogram(
+    "sbsync_commit_to_push_seconds",
+    "Delay from a local commit until the push that delivered it to the remote",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200),
+)
+
+NOTIFY_SENT_TOTAL = Counter(
+    "sbsync_notify_sent_total",
+    "Push notifications posted to pull clients",
+    ["result"],
+)
+NOTIFY_SECONDS = Histogram(
+    "sbsync_notify_seconds",
+    "Round trip of one successful push notification",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+GIT_PHASE_SECONDS = Histogram(
+    "sbsync_git_phase_seconds",
+    "Wall time of each git phase of a sync cycle (status, add, commit, pull, fetch, push)",
+    ["phase", "outcome"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+GIT_PHASE_ERRORS_TOTAL = Counter(
+    "sbsync_git_phase_errors_total",
+    "Failed git phases by error class (auth, network, non_fast_forward, lock, conflict, other)",
+    ["phase", "error_class"],
+)
+FILES_STAGED = Histogram(
+    "sbsync_files_staged",
+    "Files staged into one commit",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 1000, 5000, 25000),
+)
+PUSH_BYTES = Histogram(
+    "sbsync_push_bytes",
+    "On-disk size of the objects sent by one push (git rev-list --disk-usage)",
+    buckets=(1 << 10, 16 << 10, 256 << 10, 1 << 20, 16 << 20, 256 << 20, 1 << 30),
+)
+
+PULLS_SKIPPED_TOTAL = Counter(
+    "sbsync_pulls_skipped_total",
+    "Pulls that did not rebase (no upstream, nothing new upstream, or a settle cycle"
+    " that committed nothing)",
+    ["reason"],
+)
+PULL_REBASE_SECONDS = Histogram(
+    "sbsync_pull_rebase_seconds",
+    "Wall time of `git rebase --autostash` onto the upstream",
+    ["result"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+REPO_STATS_PREFIX = "sbsync_repo"
+# (name, help) of the gauges RepoStatsCollector exports, in collection order.
+REPO_STATS = (
+    ("loose_objects", "Loose objects in .git/objects (git count-objects)"),
+    ("packs", "Pack files in .git/objects/pack"),
+    ("pack_bytes", "On-disk size of all pack files"),
+    ("index_bytes", "Size of .git/index, plus the shared index when split"),
+    ("index_entries", "Entries in the index"),
+    (
+        "commits_since_maintenance",
+        "Commits on HEAD newer than the last commit-graph write (gc / maintenance)",
+    ),
+    (
+        "untracked_entries",
+        "Untracked, non-ignored entries as `git status` lists them: an untracked "
+        "directory is one entry and its files are not walked",
+    ),
+    (
+        "worktree_entries",
+        "Checked-out index entries plus untracked entries (a lower bound on working-tree files)",
+    ),
+    ("stats_collect_seconds", "Wall time of the last repository statistics refresh"),
+)
+
+
+class RepoStatsCollector:
+    """
+    Repository size and health gauges, recomputed every `ttl` seconds on a
+    background thread (`start()`). A scrape only serves the last values, so a slow
+    vault (a large Drive mount) never blocks or times out /metrics.
+
+    Only cheap git plumbing is used: `count-objects -v` (one readdir per loose
+    object fan-out directory), `ls-files -t` (reads the index, no stat), a `stat`
+    of the index and commit-graph files, and one `status` whose untracked walk is
+    answered by the untracked cache and fsmonitor where configured. Commands run
+    with --no-optional-locks so a scrape never takes index.lock from a sync.
+    """
+
+    def __init__(self, repo_path, ttl=None, prefix=REPO_STATS_PREFIX):
+        self.repo_path = repo_path
+        self.ttl = config.REPO_STATS_TTL_SECONDS if ttl is None else ttl
+        self.prefix = prefix
+        # Own Git instance: scrapes run on the metrics thread, never on the
+        # handler's repo (shared cat-file coprocess, flight recorder).
+        self._git = git.Git(repo_path)
+        self._lock = threading.Lock()
+        self._values = None
+        self._stopped = threading.Event()
+
+    def _run(self, *args):
+        return self._git.execute(["git", "--no-optional-locks", *args])
+
+    def _git_dir(self):
+        return os.path.join(self.repo_path, self._run("rev-parse", "--git-dir"))
+
+    def _index_bytes(self, git_dir):
+        size = os.path.getsize(os.path.join(git_dir, "index"))
+        shared = [
+            os.path.join(git_dir, name)
+            for name in os.listdir(git_dir)
+            if name.startswith("sharedindex.")
+        ]
+        if shared:
+            size += os.path.getsize(max(shared, key=os.path.getmtime))
+        return size
+
+    def _last_maintenance(self, git_dir):
+        """mtime of the commit-graph, which gc and `git maintenance` rewrite."""
+        info = os.path.join(git_dir, "objects", "info")
+        times = []
+        for path in (
+            os.path.join(info, "commit-graph"),
+            os.path.join(info, "commit-graphs", "commit-graph-chain"),
+        ):
+            try:
+                times.append(os.path.getmtime(path))
+            except OSError:
+                pass
+        return max(times, default=None)
+
+    def _commits_since(self, since):
+        args = ["rev-list", "--count"]
+        if since is not None:
+            # rev-list stops walking once it is past `since`, so this is O(new commits).
+            # Commits stamped in the second of the graph write are taken as covered.
+            args.append(f"--since={int(since) + 1}")
+        status, out, _ = self._git.execute(
+            ["git", "--no-optional-locks", *args, "HEAD"],
+            with_extended_output=True,
+            with_exceptions=False,
+        )
+        return int(out) if status == 0 and out else 0
+
+    def _collect_values(self):
+        git_dir = self._git_dir()
+        objects = {}
+        for line in self._run("count-objects", "-v").splitlines():
+            key, _, value = line.partition(":")
+            objects[key.strip()] = int(value)
+
+        entries = [e for e in self._run("ls-files", "-t", "-z").split("\0") if e]
+        checked_out = sum(1 for e in entries if not e.startswith("S "))
+        status = self._run("status", "--porcelain", "-z", "--untracked-files=normal")
+        untracked = sum(1 for e in status.split("\0") if e.startswith("?? "))
+
+        return {
+            "loose_objects": objects.get("count", 0),
+            "packs": objects.get("packs", 0),
+            "pack_bytes": objects.get("size-pack", 0) * 1024,
+            "index_bytes": self._index_bytes(git_dir),
+            "index_entries": len(entries),
+            "commits_since_maintenance": self._commits_since(
+                self._last_maintenance(git_dir)
+            ),
+            "untracked_entries": untracked,
+            "worktree_entries": checked_out + untracked,
+        }
+
+    def refresh(self):
+        """Recompute the statistics; on failure the last good values are kept."""
+        started = time.monotonic()
+        try:
+            values = self._collect_values()
+        except (git.exc.GitCommandError, OSError, ValueError) as e:
+            # Keep serving the last good values; retry after the next ttl.
+            logger.warning("Repository statistics unavailable: %s", e)
+            return
+        values["stats_collect_seconds"] = time.monotonic() - started
+        with self._lock:
+            self._values = values
+
+    def values(self):
+        """Statistics of the last refresh, or None before the first one."""
+        with self._lock:
+            return self._values
+
+    def start(self):
+        """Refresh now and then every `ttl` seconds on a daemon thread."""
+        threading.Thread(target=self._refresh_loop, name="repo-stats", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _refresh_loop(self):
+        while True:
+            self.refresh()
+            if self._stopped.wait(self.ttl):
+                return
+
+    def describe(self):
+        # Lets the registry learn the metric names without running git at register time.
+        return [GaugeMetricFamily(f"{self.prefix}_{name}", doc) for name, doc in REPO_STATS]
+
+    def collect(self):
+        values = self.values()
+        if values is None:
+            return
+        for name, doc in REPO_STATS:
+            yield GaugeMetricFamily(f"{self.prefix}_{name}", doc, value=values[name])
+
+
+def register_repo_stats(repo_path, registry=REGISTRY):
+    """Export RepoStatsCollector gauges for `repo_path` (REPO_STATS_TTL_SECONDS=0: off)."""
+    collector = RepoStatsCollector(repo_path)
+    if collector.ttl <= 0:
+        return None
+    registry.register(collector)
+    return collector.start()
+
+
+class RoutedMetricsHandler(MetricsHandler):
+    """
+    Serves the metrics on every GET path, plus `routes`:
+    {(method, path): fn(request) -> (status, content_type, body)}. `request` is the
+    handler itself, with the parsed query string in `request.query`.
+    """
+
+    routes = {}
+
+    def _route(self, method):
+        path, _, query = self.path.partition("?")
+        fn = self.routes.get((method, path))
+        if fn is None:
+            return False
+        self.query = parse_qs(query)
+        try:
+            status, content_type, body = fn(self)
+        except Exception as e:
+            logger.error("%s %s failed: %s", method, path, e)
+            status, content_type, body = 500, "text/plain; charset=utf-8", f"{e}\n"
+        self.send_reply(status, content_type, body)
+        return True
+
+    def send_reply(self, status, content_type, body):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self._route("GET"):
+            super().do_GET()
+
+    def do_POST(self):
+        if not self._route("POST"):
+            self.send_reply(404, "text/plain; charset=utf-8", "not found\n")
+
+
+def json_reply(data, status=200):
+    """A route result carrying `data` as JSON."""
+    return status, "application/json", json.dumps(data, indent=1, default=str)
+
+
+def text_reply(text, status=200):
+    return status, "text/plain; charset=utf-8", text
 
 
-def start_metrics_server(port):
-    start_http_server(port)
+def start_metrics_server(port, routes=None):
+    """Serve /metrics on `port`, plus `routes` (see RoutedMetricsHandler) when given."""
+    if not routes:
+        start_http_server(port)
+        return
+    handler_class = type(
+        "RoutedMetricsHandler", (RoutedMetricsHandler,), {"routes": dict(routes)}
+    )
+    httpd = ThreadingHTTPServer(("", port), handler_class)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="metrics-http", daemon=True).start()
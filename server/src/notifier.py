@@ -0,0 +1,60 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from src.config import config
+from src.metrics import NOTIFY_SECONDS, NOTIFY_SENT_TOTAL
+from src.utils import logger
+
+
+class PushNotifier:
+    """Tells pull clients that a new commit is on the remote.
+
+    After every successful push, `notify(sha)` POSTs `{"sha", "branch", "pushed_at"}`
+    to each of `urls` with `Authorization: Bearer <token>`, so clients pull right
+    away instead of waiting for their next poll. Posts run on a short-lived thread
+    and never block or fail the push; a client that misses one still catches up on
+    its interval poll.
+    """
+
+    def __init__(self, urls=None, token=None, timeout=None):
+        self.urls = config.NOTIFY_URLS if urls is None else urls
+        self.token = config.NOTIFY_TOKEN if token is None else token
+        self.timeout = config.NOTIFY_TIMEOUT_SECONDS if timeout is None else timeout
+
+    def notify(self, sha, branch=None, wait=False):
+        """Post `sha` to every client. With `wait`, block until all posts finished."""
+        if not self.urls:
+            return
+        body = json.dumps({"sha": sha, "branch": branch, "pushed_at": time.time()}).encode()
+        thread = threading.Thread(
+            target=self._post_all, args=(body,), name="push-notify", daemon=True
+        )
+        thread.start()
+        if wait:
+            thread.join()
+
+    def _post_all(self, body):
+        for url in self.urls:
+            self._post(url, body)
+
+    def _post(self, url, body):
+        request = urllib.request.Request(url, data=body, method="POST")
+        request.add_header("Content-Type", "application/json")
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        started = time.monotonic()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except (urllib.error.URLError, OSError) as e:
+            # HTTPError (401, ...) is a URLError too.
+            logger.warning("Push notification to %s failed: %s", url, e)
+            NOTIFY_SENT_TOTAL.labels(result="error").inc()
+            return False
+        NOTIFY_SECONDS.observe(time.monotonic() - started)
+        NOTIFY_SENT_TOTAL.labels(result="ok").inc()
+        logger.debug("Notified %s", url)
+        return True
@@ -0,0 +1,440 @@
+import os
+import pickle
+import stat
+import sys
+import threading
+import time
+import zlib
+from array import array
+from functools import partial
+
+from watchdog.events import (
+    DirCreatedEvent,
+    DirDeletedEvent,
+    DirMovedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+)
+from watchdog.observers.api import BaseObserver, EventEmitter
+
+from src.config import config
+from src.metrics import (
+    POLL_DURATION_SECONDS,
+    POLL_INDEX_BYTES,
+    POLL_INDEX_DIRS,
+    POLL_INDEX_FILES,
+)
+from src.utils import logger
+
+INDEX_VERSION = 1
+
+# A directory that changed within this many polls is stat'ed on every poll.
+HOT_DIR_POLLS = 60
+
+
+class _DirIndex:
+    """Compact per-directory record: parallel arrays instead of one stat_result per file."""
+
+    __slots__ = (
+        "mtime_ns",
+        "inode",
+        "names",
+        "sizes",
+        "mtimes",
+        "inodes",
+        "subdirs",
+        "stripe",
+        "hot_until",
+    )
+
+    def __init__(self, rel, mtime_ns, inode, names, sizes, mtimes, inodes, subdirs):
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.names = names
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.inodes = inodes
+        self.subdirs = subdirs
+        self.stripe = zlib.crc32(rel.encode("utf-8", "surrogateescape"))
+        self.hot_until = 0
+
+    def to_tuple(self):
+        return (
+            self.mtime_ns,
+            self.inode,
+            self.names,
+            self.sizes,
+            self.mtimes,
+            self.inodes,
+            self.subdirs,
+        )
+
+
+class VaultIndex:
+    """File index of a vault tree, diffed in place on each poll.
+
+    Directory listings are only re-read when the directory's mtime changes
+    (entries added, removed or renamed). File stats are refreshed every poll for
+    recently active ("hot") directories and for one stripe of the remaining
+    directories, so a full stat sweep is spread over `deep_scan_every` polls
+    instead of hitting the mount all at once. The trade-off: an in-place edit in a
+    quiet directory (its mtime does not change) is only seen when that directory's
+    stripe comes up, up to `deep_scan_every` polls later.
+
+    `.git` is never walked, so the ignore matcher is checked for on-disk changes
+    (`.git/info/exclude`) at the start of every poll.
+    """
+
+    def __init__(self, root, ignore_matcher=None, deep_scan_every=None):
+        self.root = os.path.abspath(root)
+        self.ignore_matcher = ignore_matcher
+        self.deep_scan_every = max(
+            1, deep_scan_every if deep_scan_every is not None else config.POLL_DEEP_SCAN_EVERY
+        )
+        self.dirs = {}
+        self.poll_count = 0
+        self._matcher_generation = self._current_generation()
+
+    def _current_generation(self):
+        return self.ignore_matcher.generation if self.ignore_matcher is not None else 0
+
+    @property
+    def file_count(self):
+        return sum(len(d.names) for d in self.dirs.values())
+
+    def _abs(self, rel):
+        return os.path.join(self.root, rel) if rel else self.root
+
+    def _skip(self, rel, is_dir):
+        if is_dir and rel.rpartition("/")[2] == ".git":
+            return True
+        if self.ignore_matcher is None:
+            return False
+        return self.ignore_matcher.match(self._abs(rel), is_dir) is not None
+
+    def _list(self, rel):
+        """Read one directory: returns (sorted file names, arrays, sorted subdirs)."""
+        files, subdirs = [], []
+        with os.scandir(self._abs(rel)) as it:
+            for entry in it:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not self._skip(child, True):
+                            subdirs.append(entry.name)
+                        continue
+                    if self._skip(child, False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                files.append((entry.name, st.st_size, st.st_mtime_ns, st.st_ino))
+
+        files.sort()
+        # Interned names share storage with identical names in other directories.
+        names = tuple(sys.intern(f[0]) for f in files)
+        sizes = array("q", (f[1] for f in files))
+        mtimes = array("q", (f[2] for f in files))
+        inodes = array("Q", (f[3] for f in files))
+        return names, sizes, mtimes, inodes, tuple(sorted(subdirs))
+
+    def _restat(self, rel, old):
+        """Re-stat the known files of an unchanged listing; vanished files are dropped."""
+        names, sizes, mtimes, inodes = [], array("q"), array("q"), array("Q")
+        base = self._abs(rel)
+        for name in old.names:
+            try:
+                st = os.lstat(os.path.join(base, name))
+            except FileNotFoundError:
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                continue
+            names.append(name)
+            sizes.append(st.st_size)
+            mtimes.append(st.st_mtime_ns)
+            inodes.append(st.st_ino)
+        return tuple(names), sizes, mtimes, inodes
+
+    def _drop_subtree(self, rel, changes):
+        entry = self.dirs.pop(rel, None)
+        if entry is None:
+            return
+        for i, name in enumerate(entry.names):
+            changes.deleted(f"{rel}/{name}", entry.inodes[i], False)
+        for sub in entry.subdirs:
+            self._drop_subtree(f"{rel}/{sub}", changes)
+        changes.deleted(rel, entry.inode, True)
+
+    def poll(self, changes):
+        """Walk the tree once, updating the index and reporting into `changes`."""
+        self.poll_count += 1
+        if self.ignore_matcher is not None:
+            self.ignore_matcher.reload_if_changed()
+        generation = self._current_generation()
+        relist_all = generation != self._matcher_generation
+        self._matcher_generation = generation
+
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            try:
+                st = os.stat(self._abs(rel))
+                if not stat.S_ISDIR(st.st_mode):
+                    raise FileNotFoundError(rel)
+            except FileNotFoundError:
+                if not rel:
+                    raise
+                self._drop_subtree(rel, changes)
+                continue
+
+            old = self.dirs.get(rel)
+            if old is None or relist_all or old.mtime_ns != st.st_mtime_ns:
+                try:
+                    names, sizes, mtimes, inodes, subdirs = self._list(rel)
+                except FileNotFoundError:
+                    if not rel:
+                        raise
+                    self._drop_subtree(rel, changes)
+                    continue
+            elif (
+                old.hot_until >= self.poll_count
+                or old.stripe % self.deep_scan_every == self.poll_count % self.deep_scan_every
+            ):
+                names, sizes, mtimes, inodes = self._restat(rel, old)
+                subdirs = old.subdirs
+            else:
+                stack.extend(f"{rel}/{s}" if rel else s for s in old.subdirs)
+                continue
+
+            entry = _DirIndex(rel, st.st_mtime_ns, st.st_ino, names, sizes, mtimes, inodes, subdirs)
+            if old is None:
+                if rel:
+                    changes.created(rel, st.st_ino, True)
+                if changes.emit_new_dirs:
+                    for i, name in enumerate(names):
+                        changes.created(f"{rel}/{name}" if rel else name, inodes[i], False)
+                # A cold-start walk must not mark the whole tree hot.
+                changed = changes.emit_new_dirs
+            else:
+                entry.hot_until = old.hot_until
+                changed = self._diff(rel, old, entry, changes)
+                for sub in set(old.subdirs) - set(subdirs):
+                    self._drop_subtree(f"{rel}/{sub}" if rel else sub, changes)
+
+            if changed:
+                entry.hot_until = self.poll_count + HOT_DIR_POLLS
+            self.dirs[rel] = entry
+            stack.extend(f"{rel}/{s}" if rel else s for s in subdirs)
+
+    def _diff(self, rel, old, new, changes):
+        prefix = f"{rel}/" if rel else ""
+        old_pos = {name: i for i, name in enumerate(old.names)}
+        changed = False
+        for j, name in enumerate(new.names):
+            i = old_pos.pop(name, None)
+            if i is None:
+                changes.created(prefix + name, new.inodes[j], False)
+                changed = True
+            elif (
+                old.sizes[i] != new.sizes[j]
+                or old.mtimes[i] != new.mtimes[j]
+                or old.inodes[i] != new.inodes[j]
+            ):
+                changes.modified(prefix + name)
+                changed = True
+        for name, i in old_pos.items():
+            changes.deleted(prefix + name, old.inodes[i], False)
+            changed = True
+        return changed
+
+    def dump(self, path):
+        """Atomically persist the index (pickle of tuples and arrays)."""
+        data = {
+            "version": INDEX_VERSION,
+            "root": self.root,
+            "dirs": {rel: d.to_tuple() for rel, d in self.dirs.items()},
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return os.path.getsize(path)
+
+    def load(self, path):
+        """Load a persisted index; returns False if missing, stale or unreadable."""
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning("Ignoring unreadable poll index %s: %s", path, e)
+            return False
+
+        if data.get("version") != INDEX_VERSION or data.get("root") != self.root:
+            logger.info("Poll index %s belongs to another vault/version; rebuilding.", path)
+            return False
+
+        self.dirs = {rel: _DirIndex(rel, *values) for rel, values in data["dirs"].items()}
+        return True
+
+
+class _ChangeCollector:
+    """Collects raw index changes and pairs deletes/creates by inode into moves."""
+
+    def __init__(self, emit_new_dirs=True):
+        self.emit_new_dirs = emit_new_dirs
+        self._created = []
+        self._deleted = []
+        self._modified = []
+
+    def created(self, rel, inode, is_dir):
+        self._created.append((rel, inode, is_dir))
+
+    def deleted(self, rel, inode, is_dir):
+        self._deleted.append((rel, inode, is_dir))
+
+    def modified(self, rel):
+        self._modified.append(rel)
+
+    def __len__(self):
+        return len(self._created) + len(self._deleted) + len(self._modified)
+
+    def events(self, root):
+        def path(rel):
+            return os.path.join(root, rel)
+
+        # inode 0 means the filesystem doesn't provide stable inodes; never pair those.
+        deleted_by_inode = {
+            (inode, is_dir): rel for rel, inode, is_dir in self._deleted if inode
+        }
+        moved_src = set()
+        out = []
+        created_rest = []
+        for rel, inode, is_dir in self._created:
+            src = deleted_by_inode.pop((inode, is_dir), None) if inode else None
+            if src is None:
+                created_rest.append((rel, is_dir))
+                continue
+            moved_src.add(src)
+            cls = DirMovedEvent if is_dir else FileMovedEvent
+            out.append(cls(path(src), path(rel)))
+
+        for rel, _, is_dir in self._deleted:
+            if rel not in moved_src:
+                cls = DirDeletedEvent if is_dir else FileDeletedEvent
+                out.append(cls(path(rel)))
+        for rel in self._modified:
+            out.append(FileModifiedEvent(path(rel)))
+        for rel, is_dir in created_rest:
+            cls = DirCreatedEvent if is_dir else FileCreatedEvent
+            out.append(cls(path(rel)))
+        return out
+
+
+class VaultPollingEmitter(EventEmitter):
+    """Polling emitter backed by a persistent, incrementally updated `VaultIndex`.
+
+    Produces the same watchdog event types as `PollingEmitter`, so
+    `VaultEventHandler` is unchanged.
+    """
+
+    def __init__(
+        self,
+        event_queue,
+        watch,
+        timeout=1,
+        ignore_matcher=None,
+        index_path=None,
+        deep_scan_every=None,
+        **kwargs,
+    ):
+        super().__init__(event_queue, watch, timeout=timeout, **kwargs)
+        self._index = VaultIndex(
+            watch.path, ignore_matcher=ignore_matcher, deep_scan_every=deep_scan_every
+        )
+        self._index_path = index_path
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self._dirty = False
+
+    def on_thread_start(self):
+        loaded = self._index_path and self._index.load(self._index_path)
+        if loaded:
+            logger.info(
+                "Loaded poll index (%d dirs) from %s", len(self._index.dirs), self._index_path
+            )
+            return
+
+        # Cold start: build the index without emitting events, like PollingEmitter.
+        start = time.monotonic()
+        self._index.poll(_ChangeCollector(emit_new_dirs=False))
+        logger.info(
+            "Built poll index of %d files in %.1fs",
+            self._index.file_count,
+            time.monotonic() - start,
+        )
+        self._dirty = True
+        self._save(force=True)
+
+    def on_thread_stop(self):
+        with self._lock:
+            self._save(force=True)
+
+    def _save(self, force=False):
+        if not self._index_path or not self._dirty:
+            return
+        if not force and time.monotonic() - self._last_save < config.POLL_INDEX_SAVE_SECONDS:
+            return
+        try:
+            POLL_INDEX_BYTES.set(self._index.dump(self._index_path))
+            self._dirty = False
+        except OSError as e:
+            logger.warning("Could not persist poll index to %s: %s", self._index_path, e)
+        self._last_save = time.monotonic()
+
+    def queue_events(self, timeout):
+        # timeout behaves like an interval for polling emitters.
+        if self.stopped_event.wait(timeout):
+            return
+
+        with self._lock:
+            if not self.should_keep_running():
+                return
+
+            changes = _ChangeCollector()
+            start = time.monotonic()
+            try:
+                self._index.poll(changes)
+            except OSError:
+                self.queue_event(DirDeletedEvent(self.watch.path))
+                self.stop()
+                return
+            POLL_DURATION_SECONDS.observe(time.monotonic() - start)
+            POLL_INDEX_DIRS.set(len(self._index.dirs))
+            POLL_INDEX_FILES.set(self._index.file_count)
+
+            if changes:
+                self._dirty = True
+                for event in changes.events(self._index.root):
+                    self.queue_event(event)
+            self._save()
+
+
+class VaultPollingObserver(BaseObserver):
+    """Drop-in replacement for watchdog's `PollingObserver` using `VaultPollingEmitter`."""
+
+    def __init__(self, ignore_matcher=None, index_path=None, deep_scan_every=None, timeout=None):
+        emitter_cls = partial(
+            VaultPollingEmitter,
+            ignore_matcher=ignore_matcher,
+            index_path=index_path,
+            deep_scan_every=deep_scan_every,
+        )
+        super().__init__(
+            emitter_cls,
+            timeout=timeout if timeout is not None else config.POLL_INTERVAL_SECONDS,
+        )
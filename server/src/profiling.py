@@ -0,0 +1,152 @@
+import collections
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from src.config import config
+from src.metrics import text_reply
+
+DEBUG_PROFILE_PATH = "/debug/profile"
+DEBUG_TRACEMALLOC_PATH = "/debug/tracemalloc"
+MAX_PROFILE_SECONDS = 60
+MAX_SAMPLE_HZ = 1000
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds, hz=100, exclude=()):
+    """
+    Statistical CPU profile of every thread: sample all stacks `hz` times a second
+    for `seconds`. Returns {(thread name, frame labels root first): samples}.
+    """
+    names = {t.ident: t.name for t in threading.enumerate()}
+    skip = {threading.get_ident(), *exclude}
+    counts = collections.Counter()
+    interval = 1.0 / hz
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident in skip:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            name = names.get(ident)
+            if name is None:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                name = names.get(ident, str(ident))
+            counts[(name, tuple(reversed(stack)))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def format_collapsed(counts):
+    """Collapsed stacks (`thread;root;...;leaf count`) for flamegraph.pl or speedscope."""
+    lines = [f"{';'.join((name, *stack))} {n}" for (name, stack), n in counts.items()]
+    return "\n".join(sorted(lines)) + "\n"
+
+
+def format_top(counts, limit=40):
+    """
+    pstats-like table: share of samples where a function was the leaf (self) or
+    anywhere on the stack (cumulative).
+    """
+    total = sum(counts.values()) or 1
+    own = collections.Counter()
+    cumulative = collections.Counter()
+    threads = collections.Counter()
+    for (name, stack), n in counts.items():
+        threads[name] += n
+        if stack:
+            own[stack[-1]] += n
+        for label in set(stack):
+            cumulative[label] += n
+    lines = [f"{total} samples"]
+    lines += [f"  {name}: {n} ({100 * n / total:.1f}%)" for name, n in threads.most_common()]
+    lines += ["", f"{'self%':>7} {'cum%':>7}  function"]
+    for label, _ in cumulative.most_common(limit):
+        lines.append(
+            f"{100 * own[label] / total:>6.1f}% {100 * cumulative[label] / total:>6.1f}%  {label}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    """
+    On-demand profiling behind the debug routes: a time-boxed sampling CPU profile
+    of all threads, and tracemalloc snapshots/diffs. Nothing runs (and tracemalloc
+    stays off) until a route is called; one CPU profile runs at a time.
+    """
+
+    def __init__(self):
+        self._busy = threading.Lock()
+        self._baseline = None
+
+    def profile_route(self, request):
+        """`GET /debug/profile?seconds=10&hz=100&format=collapsed|top`"""
+        seconds = min(float(request.query.get("seconds", ["10"])[0]), MAX_PROFILE_SECONDS)
+        hz = min(float(request.query.get("hz", ["100"])[0]), MAX_SAMPLE_HZ)
+        fmt = request.query.get("format", ["collapsed"])[0]
+        if fmt not in ("collapsed", "top"):
+            return text_reply("format must be collapsed or top\n", 400)
+        if not self._busy.acquire(blocking=False):
+            return text_reply("a profile is already running\n", 409)
+        try:
+            counts = sample_stacks(max(0.0, seconds), max(1.0, hz))
+        finally:
+            self._busy.release()
+        return text_reply(format_collapsed(counts) if fmt == "collapsed" else format_top(counts))
+
+    def tracemalloc_route(self, request):
+        """
+        `GET /debug/tracemalloc?action=start|snapshot|diff|stop&limit=25&frames=1`
+        start: begin tracing; snapshot: top allocations and keep them as the baseline;
+        diff: growth since the baseline; stop: stop tracing and drop the baseline.
+        """
+        action = request.query.get("action", ["snapshot"])[0]
+        limit = int(request.query.get("limit", ["25"])[0])
+        if action == "start":
+            frames = int(request.query.get("frames", ["1"])[0])
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            return text_reply("tracing\n")
+        if action == "stop":
+            tracemalloc.stop()
+            self._baseline = None
+            return text_reply("stopped\n")
+        if action not in ("snapshot", "diff"):
+            return text_reply("action must be start, snapshot, diff or stop\n", 400)
+        if not tracemalloc.is_tracing():
+            return text_reply("not tracing; call ?action=start first\n", 409)
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"traced: {current / 1024:.1f} KiB (peak {peak / 1024:.1f} KiB)"]
+        if action == "diff":
+            if self._baseline is None:
+                return text_reply("no baseline; call ?action=snapshot first\n", 409)
+            stats = snapshot.compare_to(self._baseline, "lineno")
+        else:
+            stats = snapshot.statistics("lineno")
+            self._baseline = snapshot
+        lines += [str(stat) for stat in stats[:limit]]
+        return text_reply("\n".join(lines) + "\n")
+
+    def routes(self):
+        return {
+            ("GET", DEBUG_PROFILE_PATH): self.profile_route,
+            ("GET", DEBUG_TRACEMALLOC_PATH): self.tracemalloc_route,
+        }
+
+
+def debug_routes():
+    """Profiling routes for the metrics server; empty unless PROFILING_ENABLED."""
+    return Profiler().routes() if config.PROFILING_ENABLED else {}
@@ -0,0 +1,170 @@
+import random
+import threading
+import time
+
+import git
+
+from src.config import config
+from src.metrics import (
+    ERRORS_TOTAL,
+    PUSH_ATTEMPTS_TOTAL,
+    PUSHES_TOTAL,
+    UNPUSHED_COMMITS,
+    UNPUSHED_OLDEST_AGE_SECONDS,
+)
+from src.phases import classify_error
+from src.recorder import recorder
+from src.utils import logger
+
+
+def is_rejected(error):
+    """True if a failed `git push` was a non-fast-forward rejection (not a network error)."""
+    return classify_error(error) == "non_fast_forward"
+
+
+def backoff_delay(failures, base, ceiling):
+    """Exponential backoff with jitter: half fixed, half random, capped at `ceiling`."""
+    delay = min(ceiling, base * (2 ** (failures - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class PushWorker:
+    """Pushes local commits on its own thread, decoupled from the sync cycle.
+
+    The sync cycle only commits and calls `request()`. The worker waits
+    `batch_delay` so commits from consecutive cycles go out in one `git push`,
+    retries failures with exponential backoff, and on a non-fast-forward
+    rejection fetches and rebases onto the upstream before retrying.
+    """
+
+    def __init__(self, git_handler, batch_delay=None, backoff_base=None, backoff_max=None):
+        self.git_handler = git_handler
+        self.batch_delay = config.PUSH_BATCH_SECONDS if batch_delay is None else batch_delay
+        self.backoff_base = (
+            config.PUSH_BACKOFF_BASE_SECONDS if backoff_base is None else backoff_base
+        )
+        self.backoff_max = config.PUSH_BACKOFF_MAX_SECONDS if backoff_max is None else backoff_max
+        self._cond = threading.Condition()
+        # Monotonic time of the next push attempt; None while nothing is pending.
+        self._due = None
+        self._stopped = False
+        self._thread = None
+        self.failures = 0
+        self.pushes = 0
+        # Commit time of the oldest commit the remote does not have yet.
+        self._oldest = None
+        UNPUSHED_OLDEST_AGE_SECONDS.set_function(self._oldest_age)
+
+    def _oldest_age(self):
+        oldest = self._oldest
+        return max(0.0, time.time() - oldest) if oldest is not None else 0.0
+
+    def start(self):
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="push-worker", daemon=True)
+        self._thread.start()
+        # Commits left unpushed by a previous run go out right away.
+        self.request(delay=0)
+        return self
+
+    def request(self, delay=None):
+        """Note that new local commits exist; push them after the batch delay."""
+        self._refresh_backlog()
+        due = time.monotonic() + (self.batch_delay if delay is None else delay)
+        with self._cond:
+            # While backing off, new commits ride along with the scheduled retry.
+            if self._due is None or (self.failures == 0 and due < self._due):
+                self._due = due
+                self._cond.notify()
+
+    def _refresh_backlog(self):
+        try:
+            count, oldest = self.git_handler.unpushed_commits()
+        except Exception as e:
+            logger.debug("Could not count unpushed commits: %s", e)
+            return None
+        self._oldest = oldest
+        UNPUSHED_COMMITS.set(count)
+        return count
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and (
+                    self._due is None or self._due > time.monotonic()
+                ):
+                    timeout = None if self._due is None else self._due - time.monotonic()
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+                self._due = None
+
+            ok = self._attempt()
+            with self._cond:
+                if ok:
+                    self.failures = 0
+                else:
+                    self.failures += 1
+                    delay = backoff_delay(self.failures, self.backoff_base, self.backoff_max)
+                    logger.info(
+                        "Push attempt %d failed; retrying in %.0fs.", self.failures, delay
+                    )
+                    self._due = time.monotonic() + delay
+
+    def _attempt(self):
+        """One push of everything pending. Returns False if it should be retried."""
+        count = self._refresh_backlog()
+        if count == 0:
+            return True
+        with recorder.cycle("push"):
+            recorder.note(unpushed_commits=count, failures=self.failures)
+            ok = self._push(count)
+            if not ok:
+                recorder.fail("push failed")
+            return ok
+
+    def _push(self, count):
+        """Push, rebasing once on a non-fast-forward rejection. Returns False on failure."""
+        logger.info(
+            "Pushing %s local commit(s) to remote...", "pending" if count is None else count
+        )
+        try:
+            self.git_handler.push()
+        except git.exc.GitCommandError as e:
+            if not is_rejected(e):
+                logger.warning("Push failed: %s", e)
+                PUSH_ATTEMPTS_TOTAL.labels(result="error").inc()
+                ERRORS_TOTAL.inc()
+                return False
+
+            # The remote moved ahead: replay our commits on top of it and push again.
+            PUSH_ATTEMPTS_TOTAL.labels(result="rejected").inc()
+            logger.info("Push rejected (non-fast-forward); fetching and rebasing.")
+            try:
+                self.git_handler.fetch_rebase()
+                self.git_handler.push()
+            except git.exc.GitCommandError as e2:
+                logger.warning("Push after rebase failed: %s", e2)
+                PUSH_ATTEMPTS_TOTAL.labels(result="error").inc()
+                ERRORS_TOTAL.inc()
+                self._refresh_backlog()
+                return False
+        except Exception as e:
+            logger.warning("Push failed: %s", e)
+            PUSH_ATTEMPTS_TOTAL.labels(result="error").inc()
+            ERRORS_TOTAL.inc()
+            return False
+
+        logger.info("Push successful.")
+        PUSH_ATTEMPTS_TOTAL.labels(result="ok").inc()
+        PUSHES_TOTAL.inc()
+        self.pushes += 1
+        self._refresh_backlog()
+        return True
+
+    def stop(self, timeout=None):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
@@ -0,0 +1,191 @@
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import git
+
+from src.config import config
+from src.metrics import json_reply
+
+DEBUG_SYNCS_PATH = "/debug/syncs"
+# Per-cycle caps, so a cycle that runs thousands of git commands stays bounded.
+MAX_COMMANDS = 100
+MAX_ARGV_CHARS = 300
+MAX_STDERR_CHARS = 500
+
+
+def _truncate(text, limit):
+    if isinstance(text, bytes):
+        text = text.decode("utf-8", "replace")
+    text = text or ""
+    return text if len(text) <= limit else text[:limit] + f"... (+{len(text) - limit})"
+
+
+class CycleRecord:
+    """What one sync cycle did: phases, git commands, counts and resulting SHAs."""
+
+    __slots__ = (
+        "id", "trigger", "thread", "started_at", "_started", "duration", "outcome",
+        "error", "phases", "commands", "dropped_commands", "fields",
+    )
+
+    def __init__(self, cycle_id, trigger):
+        self.id = cycle_id
+        self.trigger = trigger
+        self.thread = threading.current_thread().name
+        self.started_at = time.time()
+        self._started = time.monotonic()
+        self.duration = None
+        self.outcome = None
+        self.error = None
+        self.phases = []
+        self.commands = []
+        self.dropped_commands = 0
+        self.fields = {}
+
+    def command(self, argv, status, stderr, seconds):
+        if len(self.commands) >= MAX_COMMANDS:
+            self.dropped_commands += 1
+            return
+        self.commands.append(
+            {
+                "argv": _truncate(" ".join(str(a) for a in argv), MAX_ARGV_CHARS),
+                "status": status,
+                "seconds": round(seconds, 4),
+                "stderr": _truncate(stderr, MAX_STDERR_CHARS),
+            }
+        )
+
+    def as_dict(self):
+        data = {
+            "id": self.id,
+            "trigger": self.trigger,
+            "thread": self.thread,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "outcome": self.outcome or "running",
+            "error": self.error,
+            "phases": list(self.phases),
+            "commands": list(self.commands),
+            "dropped_commands": self.dropped_commands,
+        }
+        data.update(self.fields)
+        return data
+
+
+class _RecordingGit(git.cmd.Git):
+    """`repo.git` that reports each command to `recorder` while a cycle is open."""
+
+    __slots__ = ()
+    recorder = None
+
+    def execute(self, command, *args, **kwargs):
+        record = self.recorder.current()
+        if record is None:
+            return super().execute(command, *args, **kwargs)
+        started = time.monotonic()
+        try:
+            result = super().execute(command, *args, **kwargs)
+        except git.exc.GitCommandError as e:
+            record.command(command, e.status, e.stderr, time.monotonic() - started)
+            raise
+        status, stderr = 0, ""
+        if isinstance(result, tuple) and len(result) == 3:
+            status, _, stderr = result
+        record.command(command, status, stderr, time.monotonic() - started)
+        return result
+
+
+class FlightRecorder:
+    """
+    Keeps the last `size` sync cycles in memory for `/debug/syncs`.
+
+    A cycle is opened with `cycle(trigger)` on the thread doing the work; while it is
+    open, `timed_phase()` phases, `note()` fields and the git commands of attached
+    repos run on that thread are appended to it. Nothing is recorded outside a cycle,
+    and memory is bounded by `size` cycles of at most MAX_COMMANDS commands each.
+    """
+
+    def __init__(self, size=None):
+        self._cycles = deque(maxlen=config.FLIGHT_RECORDER_SIZE if size is None else size)
+        self._running = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._git_class = type(
+            "RecordingGit", (_RecordingGit,), {"__slots__": (), "recorder": self}
+        )
+
+    def current(self):
+        return getattr(self._local, "cycle", None)
+
+    @contextmanager
+    def cycle(self, trigger):
+        if self._cycles.maxlen == 0 or self.current() is not None:
+            # Disabled, or nested in the cycle already being recorded.
+            yield self.current()
+            return
+        record = CycleRecord(next(self._ids), trigger)
+        self._local.cycle = record
+        with self._lock:
+            self._running[record.id] = record
+        try:
+            yield record
+        except BaseException as e:
+            record.outcome = "error"
+            record.error = _truncate(str(e), MAX_STDERR_CHARS)
+            raise
+        finally:
+            self._local.cycle = None
+            record.duration = round(time.monotonic() - record._started, 4)
+            record.outcome = record.outcome or "ok"
+            with self._lock:
+                self._running.pop(record.id, None)
+                self._cycles.append(record)
+
+    def note(self, **fields):
+        """Attach fields (counts, SHAs, ...) to the current cycle, if any."""
+        record = self.current()
+        if record is not None:
+            record.fields.update(fields)
+
+    def fail(self, error):
+        """Mark the current cycle failed for an error the caller handles itself."""
+        record = self.current()
+        if record is not None:
+            record.outcome = "error"
+            record.error = _truncate(str(error), MAX_STDERR_CHARS)
+
+    def phase(self, phase, seconds, outcome):
+        record = self.current()
+        if record is not None:
+            record.phases.append(
+                {"phase": phase, "seconds": round(seconds, 4), "outcome": outcome}
+            )
+
+    def attach(self, repo):
+        """Record the git commands `repo.git` runs inside a cycle (exit code, stderr)."""
+        # Git is a slotted class: swap the instance's class instead of patching execute.
+        repo.git.__class__ = self._git_class
+        return repo
+
+    def snapshot(self):
+        """Running cycles, then finished ones, newest first."""
+        with self._lock:
+            running = [r.as_dict() for r in self._running.values()]
+            finished = [r.as_dict() for r in reversed(self._cycles)]
+        return {"size": self._cycles.maxlen, "running": running, "cycles": finished}
+
+
+recorder = FlightRecorder()
+
+
+def debug_syncs_route(request):
+    """`GET /debug/syncs` (`?limit=N` for the newest N cycles)."""
+    data = recorder.snapshot()
+    limit = request.query.get("limit")
+    if limit:
+        data["cycles"] = data["cycles"][: max(0, int(limit[0]))]
+    return json_reply(data)
@@ -0,0 +1,77 @@
+import os
+import stat
+import time
+
+from src.config import config
+from src.metrics import UNSTABLE_PATHS_DEFERRED_TOTAL, UNSTABLE_PATHS_FORCED_TOTAL
+from src.utils import logger
+
+
+class StabilityGate:
+    """Holds back files that are still being written (e.g. Drive downloading a PDF).
+
+    A file is stable once neither its content nor its metadata changed for the
+    settle interval, judged from its own mtime/ctime so no cycle has to sleep.
+    Files of at least `large_bytes` use the longer `large_settle` interval.
+    Deleted paths and directory pathspecs are always stable.
+
+    A path that keeps changing is deferred at most `max_defer` seconds from its
+    first deferral, then passed as stable so continuously rewritten files (a note
+    autosaved while being typed) still get committed.
+    """
+
+    def __init__(self, settle=None, large_settle=None, large_bytes=None, max_defer=None):
+        self.settle = settle if settle is not None else config.STABILITY_SETTLE_SECONDS
+        self.large_settle = (
+            large_settle if large_settle is not None else config.STABILITY_LARGE_SETTLE_SECONDS
+        )
+        self.large_bytes = (
+            large_bytes if large_bytes is not None else config.STABILITY_LARGE_BYTES
+        )
+        self.max_defer = (
+            max_defer if max_defer is not None else config.STABILITY_MAX_DEFER_SECONDS
+        )
+        # path -> time it was first deferred, until it is handed out as stable
+        self._first_deferred = {}
+
+    def split(self, root, paths, now=None):
+        """
+        Partition repo-relative `paths` into (stable, unstable).
+        Also returns the seconds until the last unstable path is due to settle.
+        """
+        now = time.time() if now is None else now
+        stable, unstable, forced = [], [], []
+        wait = 0.0
+        for rel in paths:
+            try:
+                st = os.lstat(os.path.join(root, rel))
+            except OSError:
+                st = None
+            if st is None or not stat.S_ISREG(st.st_mode):
+                self._first_deferred.pop(rel, None)
+                stable.append(rel)
+                continue
+            settle = self.large_settle if st.st_size >= self.large_bytes else self.settle
+            remaining = max(st.st_mtime, st.st_ctime) + settle - now
+            if remaining <= 0:
+                self._first_deferred.pop(rel, None)
+                stable.append(rel)
+                continue
+            deadline = self._first_deferred.setdefault(rel, now) + self.max_defer
+            if now >= deadline:
+                self._first_deferred.pop(rel)
+                forced.append(rel)
+                stable.append(rel)
+                continue
+            unstable.append(rel)
+            wait = max(wait, min(remaining, deadline - now))
+        if unstable:
+            UNSTABLE_PATHS_DEFERRED_TOTAL.inc(len(unstable))
+        if forced:
+            UNSTABLE_PATHS_FORCED_TOTAL.inc(len(forced))
+            logger.info(
+                "Committing %d path(s) still being written after %.0fs of deferral.",
+                len(forced),
+                self.max_defer,
+            )
+        return stable, unstable, wait
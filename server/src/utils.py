@@ -1,8 +1,11 @@
-import time
 import logging
-from threading import Timer
+import threading
+import time
 from typing import Callable
 
+from src.metrics import DEBOUNCE_QUIET_SECONDS
+from src.timers import default_scheduler
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -13,22 +16,90 @@ logger = logging.getLogger("sbSync")
 
 
 class Debouncer:
-    def __init__(self, interval, callback):
+    """Runs `callback` once calls pause for the quiet window.
+
+    `max_wait` caps how long a burst that never pauses can postpone the
+    callback, measured from the first call of the burst. With `adaptive`, the
+    quiet window follows an EWMA of the gaps between calls within a burst and of
+    the callback's cost (reported through `observe_cost`), clamped to
+    [`min_interval`, `interval`].
+    """
+
+    # Quiet window = max(GAP_FACTOR * typical gap, COST_FACTOR * typical sync cost)
+    GAP_FACTOR = 3.0
+    COST_FACTOR = 10.0
+    EWMA_ALPHA = 0.2
+
+    def __init__(
+        self,
+        interval,
+        callback,
+        scheduler=None,
+        max_wait=None,
+        adaptive=False,
+        min_interval=None,
+    ):
         self.interval = interval
         self.callback = callback
+        self.scheduler = scheduler or default_scheduler()
+        self.max_wait = max_wait or None
+        self.adaptive = adaptive
+        self.min_interval = min(min_interval or interval, interval)
+        self.quiet = interval
         self.timer = None
+        self._lock = threading.Lock()
+        self._burst_start = None
+        self._last_call = None
+        self._gap_ewma = None
+        self._cost_ewma = None
+        DEBOUNCE_QUIET_SECONDS.set(self.quiet)
 
     def call(self):
         """
         Resets the timer. The callback will only be executed
-        if no new calls are made within the interval.
+        if no new calls are made within the interval, or once max_wait has
+        passed since the first call of the burst.
         """
-        if self.timer is not None:
-            self.timer.cancel()
+        now = time.monotonic()
+        with self._lock:
+            pending = self.timer is not None and self.timer.active
+            if pending:
+                if self.adaptive:
+                    self._gap_ewma = self._ewma(self._gap_ewma, now - self._last_call)
+                    self._adapt()
+            else:
+                self._burst_start = now
+            self._last_call = now
 
-        self.timer = Timer(self.interval, self.callback)
-        self.timer.start()
-        logger.debug("Debounce timer started. Waiting %ss...", self.interval)
+            delay = self.quiet
+            if self.max_wait is not None:
+                delay = max(0.0, min(delay, self._burst_start + self.max_wait - now))
+            if pending:
+                self.timer.reschedule(delay)
+            else:
+                self.timer = self.scheduler.call_later(delay, self.callback)
+        logger.debug("Debounce timer started. Waiting %.1fs...", delay)
+
+    def observe_cost(self, seconds):
+        """Feed the duration of a completed callback cycle (e.g. a sync) into the window."""
+        if not self.adaptive:
+            return
+        with self._lock:
+            self._cost_ewma = self._ewma(self._cost_ewma, seconds)
+            self._adapt()
+
+    def _ewma(self, current, sample):
+        if current is None:
+            return sample
+        return current + self.EWMA_ALPHA * (sample - current)
+
+    def _adapt(self):
+        target = max(
+            self.GAP_FACTOR * (self._gap_ewma or 0.0),
+            self.COST_FACTOR * (self._cost_ewma or 0.0),
+        )
+        self.quiet = min(self.interval, max(self.min_interval, target))
+        DEBOUNCE_QUIET_SECONDS.set(self.quiet)
 
     def cancel(self):
         if self.timer is not None:
@@ -36,30 +107,17 @@ class Debouncer:
 
 
 class PeriodicTimer:
-    def __init__(self, interval: float, callback: Callable):
+    def __init__(self, interval: float, callback: Callable, scheduler=None):
         self.interval = interval
         self.callback = callback
+        self.scheduler = scheduler or default_scheduler()
         self.timer = None
-        self._cancelled = False
 
     def start(self):
-        self._cancelled = False
-        self._schedule()
-
-    def _schedule(self):
-        if self._cancelled:
-            return
-        self.timer = Timer(self.interval, self._run)
-        self.timer.start()
+        self.cancel()
+        self.timer = self.scheduler.call_every(self.interval, self.callback)
         logger.debug("PeriodicTimer scheduled. Next in %ss...", self.interval)
 
-    def _run(self):
-        if self._cancelled:
-            return
-        self.callback()
-        self._schedule()
-
     def cancel(self):
-        self._cancelled = True
         if self.timer is not None:
             self.timer.cancel()
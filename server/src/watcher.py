@@ -1,24 +1,246 @@
+import os
+import threading
+import time
+
 from watchdog.events import FileSystemEventHandler
+from src.config import config
 from src.utils import logger
-from src.metrics import FILES_CHANGED_TOTAL
+from src.metrics import (
+    FILES_CHANGED_TOTAL,
+    IGNORED_EVENTS_TOTAL,
+    STORM_ACTIVE,
+    STORM_DROPPED_EVENTS_TOTAL,
+    STORM_ENTRIES_TOTAL,
+    STORM_EXITS_TOTAL,
+)
+from src.ignore import GIT_DIR_RULE
+from src.timers import default_scheduler
+
+# inotify reports reads too (watchdog >= 4); they never change content.
+NON_CHANGE_EVENTS = frozenset({"opened", "closed_no_write"})
+
+# Events that may only touch metadata; checked against the hash cache.
+CONTENT_EVENTS = frozenset({"modified", "created", "closed"})
+
+# Rate is measured over windows of this many seconds.
+STORM_WINDOW_SECONDS = 1.0
+# Storm mode ends once the rate stays below threshold / STORM_EXIT_DIVISOR.
+STORM_EXIT_DIVISOR = 10
+
+
+def _in_git_dir(path):
+    """True for `.git` itself or anything below it (path component match, not substring)."""
+    parts = path.split(os.sep)
+    return ".git" in parts
+
+
+def _is_git_event(event):
+    """True if the event stays inside `.git` (a move out of it is a vault change)."""
+    dest_path = getattr(event, "dest_path", None) or None
+    return _in_git_dir(event.src_path) and (dest_path is None or _in_git_dir(dest_path))
 
 
 class VaultEventHandler(FileSystemEventHandler):
-    def __init__(self, on_change_callback):
+    """Filters watcher events and feeds the change set, journal and debouncer.
+
+    Above `storm_rate` events per second the handler enters storm mode: events
+    are only counted, the change set and fsmonitor journal fall back to a full
+    rescan, and `on_storm_start` runs (e.g. cancel the debouncer). Once the rate
+    has stayed low for `storm_quiet` seconds, `on_storm_end` requests the single
+    reconciliation sync.
+    """
+
+    def __init__(
+        self,
+        on_change_callback,
+        change_set=None,
+        ignore_matcher=None,
+        journal=None,
+        on_storm_start=None,
+        on_storm_end=None,
+        storm_rate=None,
+        storm_quiet=None,
+        scheduler=None,
+        hash_cache=None,
+    ):
         self.on_change_callback = on_change_callback
+        self.change_set = change_set
+        self.ignore_matcher = ignore_matcher
+        self.journal = journal
+        self.hash_cache = hash_cache
+        self.on_storm_start = on_storm_start
+        self.on_storm_end = on_storm_end
+        self.storm_rate = storm_rate if storm_rate is not None else config.STORM_EVENTS_PER_SECOND
+        self.storm_quiet = storm_quiet if storm_quiet is not None else config.STORM_QUIET_SECONDS
+        self.scheduler = scheduler or default_scheduler()
+        self.in_storm = False
+        self._window_start = time.monotonic()
+        self._window_events = 0
+        # Written only by the observer thread; the storm check reads deltas.
+        self._storm_events = 0
+        self._storm_lock = threading.Lock()
+        self._storm_timer = None
+
+    def _storm_hit(self):
+        """Count one event; True if it must be dropped because of storm mode."""
+        if self.in_storm:
+            self._storm_events += 1
+            return True
+        if not self.storm_rate:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= STORM_WINDOW_SECONDS:
+            self._window_start = now
+            self._window_events = 0
+        self._window_events += 1
+        if self._window_events > self.storm_rate * STORM_WINDOW_SECONDS:
+            self._enter_storm()
+            return True
+        return False
+
+    def _enter_storm(self):
+        with self._storm_lock:
+            if self.in_storm:
+                return
+            # The event that tripped the threshold is the first one skipped.
+            self._storm_events = 1
+            self.in_storm = True
+            check = _StormCheck(self)
+            self._storm_timer = self.scheduler.call_every(STORM_WINDOW_SECONDS, check)
+        logger.warning(
+            "Event storm: over %d events/s; pausing per-event handling until it settles.",
+            self.storm_rate,
+        )
+        STORM_ENTRIES_TOTAL.inc()
+        STORM_ACTIVE.set(1)
+        if self.change_set is not None:
+            self.change_set.mark_full_rescan(reason="storm")
+        if self.journal is not None:
+            self.journal.suspend()
+        if self.on_storm_start is not None:
+            self.on_storm_start()
+
+    def _exit_storm(self, dropped):
+        with self._storm_lock:
+            if not self.in_storm:
+                return
+            self._storm_timer.cancel()
+            self._storm_timer = None
+            # Reset the rate window before events are handled one by one again.
+            self._window_start = time.monotonic()
+            self._window_events = 0
+            self.in_storm = False
+        logger.info("Event storm over (%d events skipped); reconciling with a full sync.", dropped)
+        STORM_EXITS_TOTAL.inc()
+        STORM_ACTIVE.set(0)
+        # A sync that ran during the storm may have consumed the full-rescan flag.
+        if self.change_set is not None:
+            self.change_set.mark_full_rescan(reason="storm")
+        if self.journal is not None:
+            self.journal.resume()
+        if self.on_storm_end is not None:
+            self.on_storm_end()
+
+    def _is_ignored(self, event):
+        dest_path = getattr(event, "dest_path", None) or None
+        matcher = self.ignore_matcher
+
+        if matcher is None:
+            # Without a matcher only git's own directory is filtered (on_any_event).
+            return False
+
+        if not event.is_directory and (
+            matcher.is_source_file(event.src_path)
+            or (dest_path and matcher.is_source_file(dest_path))
+        ):
+            matcher.reload_if_changed()
+
+        # A move is only noise if both ends are ignored: Drive renames
+        # `.tmp.drivedownload` partials into place once complete.
+        if dest_path is not None and matcher.match(dest_path, event.is_directory) is None:
+            return False
+        return matcher.should_drop(event.src_path, event.is_directory)
 
     def on_any_event(self, event):
+        # Ignore .git, .gitignore'd paths and configured noise before touching
+        # metrics or arming the debouncer.
+        if event.event_type in NON_CHANGE_EVENTS:
+            return
+        # git's own writes (every sbSync commit touches hundreds of files under .git)
+        # are dropped before they count toward the storm rate.
+        if _is_git_event(event):
+            IGNORED_EVENTS_TOTAL.labels(rule=GIT_DIR_RULE).inc()
+            return
+        if self._storm_hit():
+            return
+
+        # git's fsmonitor wants every worktree change, ignored paths included,
+        # so untracked-cache entries of their directories get invalidated.
+        if self.journal is not None:
+            self._journal(event)
+
+        if self._is_ignored(event):
+            return
+
         if event.is_directory:
+            # Directory moves/deletes are staged as a pathspec so tracked files
+            # underneath are picked up even if no per-file event follows.
+            if self.change_set is not None and event.event_type in ("moved", "deleted"):
+                self._record(event)
             return
 
-        # Ignore .git directory changes
-        if ".git" in event.src_path:
+        # Touch-only and byte-identical rewrites (Obsidian, Drive) change nothing git sees.
+        if (
+            self.hash_cache is not None
+            and event.event_type in CONTENT_EVENTS
+            and self.hash_cache.unchanged(event.src_path)
+        ):
             return
 
         # Optional: Filter for specific file types if strictly needed,
         # but Obsidian vaults can contain arbitrary attachments.
-        # We rely on .gitignore in the Vault for exclusion.
 
         logger.debug("Detected event: %s on %s", event.event_type, event.src_path)
         FILES_CHANGED_TOTAL.inc()
+        if self.change_set is not None:
+            self._record(event)
         self.on_change_callback()
+
+    def _journal(self, event):
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            if path and not _in_git_dir(path):
+                self.journal.record(path, event.is_directory)
+
+    def _record(self, event):
+        dest_path = getattr(event, "dest_path", None) or None
+        self.change_set.record(event.event_type, event.src_path, dest_path)
+
+
+class _StormCheck:
+    """Timer callback that ends storm mode once the event rate stays low."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.seen = 0
+        self.dropped = 0
+        self.last = time.monotonic()
+        self.quiet_since = None
+
+    def __call__(self):
+        handler = self.handler
+        now = time.monotonic()
+        total = handler._storm_events
+        delta = total - self.seen
+        self.seen = total
+        self.dropped += delta
+        STORM_DROPPED_EVENTS_TOTAL.inc(delta)
+
+        rate = delta / max(now - self.last, 1e-6)
+        self.last = now
+        if rate * STORM_EXIT_DIVISOR >= handler.storm_rate:
+            self.quiet_since = None
+            return
+        if self.quiet_since is None:
+            self.quiet_since = now
+        if now - self.quiet_since >= handler.storm_quiet:
+            handler._exit_storm(self.dropped)
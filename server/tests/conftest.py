@@ -0,0 +1,54 @@
+"""공용 test helper와 fixture — vault 파일 쓰기, bare remote + sbSync vault, 같은 remote를 쓰는 다른 기기"""
+
+import os
+
+import git
+import pytest
+
+from src.changeset import ChangeSet
+from src.config import config
+from src.git_handler import GitHandler
+
+
+def write(root, rel, content="x"):
+    """Write `content` to `root/rel`, creating parent directories; returns the full path."""
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def push_from(repo, rel, content):
+    """Commit `rel` in another clone and push it to origin/main."""
+    write(repo.working_tree_dir, rel, content)
+    repo.git.add(rel)
+    repo.git.commit("-q", "-m", f"other: {rel}")
+    repo.git.push("origin", "main")
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    """bare remote + sbSync vault (a.md, c.md 초기 커밋이 push된 상태)"""
+    bare = str(tmp_path / "remote.git")
+    git.Repo.init(bare, bare=True, initial_branch="main")
+    monkeypatch.setattr(config, "GIT_REMOTE_URL", bare)
+
+    root = str(tmp_path / "vault")
+    write(root, "a.md", "alpha\n")
+    write(root, "c.md", "gamma\n")
+    change_set = ChangeSet(root)
+    handler = GitHandler(repo_path=root, change_set=change_set)
+    handler.repo.git.checkout("-q", "-b", "main")
+    handler.sync()
+    return bare, root, change_set, handler
+
+
+@pytest.fixture
+def other(remote, tmp_path):
+    """`remote`와 같은 bare remote를 clone한 다른 기기"""
+    repo = git.Repo.clone_from(remote[0], str(tmp_path / "other"))
+    with repo.config_writer() as cw:
+        cw.set_value("user", "name", "other")
+        cw.set_value("user", "email", "other@example.com")
+    return repo
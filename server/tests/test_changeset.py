@@ -0,0 +1,211 @@
+"""ChangeSet + GitHandler 경로 단위 staging 테스트 — 임시 git repo 사용"""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from src.changeset import ChangeSet
+from src.git_handler import GitHandler
+from src.watcher import VaultEventHandler
+from tests.conftest import write
+
+
+def _committed_files(handler):
+    return set(handler.repo.git.ls_files().splitlines())
+
+
+@pytest.fixture
+def vault(tmp_path):
+    root = str(tmp_path / "vault")
+    os.makedirs(root)
+    write(root, "a.md", "a")
+    write(root, "notes/b.md", "b")
+    write(root, ".gitignore", "*.log\n")
+    change_set = ChangeSet(root)
+    handler = GitHandler(repo_path=root, change_set=change_set)
+    # 최초 cycle은 full rescan
+    handler.sync()
+    return root, change_set, handler
+
+
+class TestChangeSet:
+    """ChangeSet 누적/drain/overflow 동작"""
+
+    def test_starts_in_full_rescan(self, tmp_path):
+        """observer 기동 전 변경은 알 수 없으므로 첫 batch는 full rescan"""
+        change_set = ChangeSet(str(tmp_path))
+        change_set.record("modified", str(tmp_path / "a.md"))
+        batch = change_set.drain()
+        assert batch.full_rescan
+        assert len(batch) == 0
+
+    def test_records_paths_and_moves(self, tmp_path):
+        """created/modified/deleted는 경로로, moved는 (src, dest) 쌍으로 기록"""
+        change_set = ChangeSet(str(tmp_path))
+        change_set.drain()
+
+        change_set.record("modified", str(tmp_path / "a.md"))
+        change_set.record("deleted", str(tmp_path / "dir" / "b.md"))
+        change_set.record("moved", str(tmp_path / "c.md"), str(tmp_path / "d.md"))
+
+        batch = change_set.drain()
+        assert not batch.full_rescan
+        assert batch.paths == {"a.md": "modified", "dir/b.md": "deleted"}
+        assert batch.moves == [("c.md", "d.md")]
+        assert batch.staging_paths() == ["a.md", "c.md", "d.md", "dir/b.md"]
+        assert change_set.drain().is_empty()
+
+    def test_ignores_paths_outside_root(self, tmp_path):
+        change_set = ChangeSet(str(tmp_path / "vault"))
+        change_set.drain()
+        change_set.record("modified", str(tmp_path / "other.md"))
+        assert change_set.drain().is_empty()
+
+    def test_overflow_falls_back_to_full_rescan(self, tmp_path):
+        """max_paths 초과 시 경로를 버리고 full rescan으로 전환 (메모리 상한 유지)"""
+        change_set = ChangeSet(str(tmp_path), max_paths=3)
+        change_set.drain()
+        for i in range(10):
+            change_set.record("created", str(tmp_path / f"{i}.md"))
+
+        batch = change_set.drain()
+        assert batch.full_rescan
+        assert len(batch) == 0
+
+    def test_restore_requeues_paths(self, tmp_path):
+        """실패한 cycle의 batch를 restore하면 다음 drain에 다시 포함"""
+        change_set = ChangeSet(str(tmp_path))
+        change_set.drain()
+        change_set.record("modified", str(tmp_path / "a.md"))
+        batch = change_set.drain()
+
+        change_set.record("modified", str(tmp_path / "b.md"))
+        change_set.restore(batch)
+        assert set(change_set.drain().paths) == {"a.md", "b.md"}
+
+    def test_first_change_time_survives_restore(self, tmp_path):
+        """batch의 first_change_at은 가장 오래된 미동기화 변경 시각"""
+        change_set = ChangeSet(str(tmp_path))
+        change_set.drain()
+        assert change_set.drain().first_change_at is None
+
+        change_set.record("modified", str(tmp_path / "a.md"))
+        batch = change_set.drain()
+        assert batch.first_change_at is not None
+
+        change_set.record("modified", str(tmp_path / "b.md"))
+        change_set.restore(batch)
+        assert change_set.drain().first_change_at == batch.first_change_at
+
+
+class TestWatcherRecordsEvents:
+    def test_handler_records_src_and_dest(self, tmp_path):
+        change_set = ChangeSet(str(tmp_path))
+        change_set.drain()
+        calls = []
+        handler = VaultEventHandler(lambda: calls.append(1), change_set=change_set)
+
+        handler.on_any_event(
+            SimpleNamespace(
+                is_directory=False,
+                event_type="moved",
+                src_path=str(tmp_path / "old.md"),
+                dest_path=str(tmp_path / "new.md"),
+            )
+        )
+
+        assert calls == [1]
+        assert change_set.drain().moves == [("old.md", "new.md")]
+
+
+class TestScopedStaging:
+    """GitHandler.sync()가 기록된 경로만 stage하는지 확인"""
+
+    def test_initial_sync_stages_whole_tree(self, vault):
+        root, _, handler = vault
+        assert _committed_files(handler) == {".gitignore", "a.md", "notes/b.md"}
+
+    def test_only_recorded_paths_are_staged(self, vault):
+        root, change_set, handler = vault
+        write(root, "a.md", "a2")
+        write(root, "unrecorded.md", "u")
+        change_set.record("modified", os.path.join(root, "a.md"))
+
+        handler.sync()
+
+        assert "unrecorded.md" not in _committed_files(handler)
+        assert handler.repo.git.show("HEAD:a.md") == "a2"
+
+    def test_move_stages_source_and_destination(self, vault):
+        root, change_set, handler = vault
+        os.rename(os.path.join(root, "notes/b.md"), os.path.join(root, "notes/c.md"))
+        change_set.record(
+            "moved", os.path.join(root, "notes/b.md"), os.path.join(root, "notes/c.md")
+        )
+
+        handler.sync()
+
+        files = _committed_files(handler)
+        assert "notes/b.md" not in files
+        assert "notes/c.md" in files
+
+    def test_deleted_directory_is_staged(self, vault):
+        root, change_set, handler = vault
+        os.remove(os.path.join(root, "notes/b.md"))
+        os.rmdir(os.path.join(root, "notes"))
+        change_set.record("deleted", os.path.join(root, "notes"))
+
+        handler.sync()
+
+        assert "notes/b.md" not in _committed_files(handler)
+
+    def test_vanished_and_ignored_paths_are_skipped(self, vault):
+        """사라진 untracked 경로와 .gitignore 대상은 git add 에러 없이 건너뜀"""
+        root, change_set, handler = vault
+        head_before = handler.repo.head.commit.hexsha
+        write(root, "debug.log", "noise")
+        change_set.record("created", os.path.join(root, "debug.log"))
+        change_set.record("created", os.path.join(root, "gone.md"))
+
+        handler.sync()
+
+        assert handler.repo.head.commit.hexsha == head_before
+        assert change_set.drain().is_empty()
+
+    def test_glob_characters_in_names_are_literal(self, vault):
+        """`[`, `*`가 들어간 파일 이름이 glob으로 다른 파일까지 stage하지 않음"""
+        root, change_set, handler = vault
+        for name in ("a[1].md", "a1.md", "star*.md", "star-other.md"):
+            write(root, name, name)
+        change_set.record("created", os.path.join(root, "a[1].md"))
+        change_set.record("created", os.path.join(root, "star*.md"))
+
+        handler.sync()
+
+        files = _committed_files(handler)
+        assert {"a[1].md", "star*.md"} <= files
+        assert "a1.md" not in files
+        assert "star-other.md" not in files
+
+        # tracked 파일 삭제도 그 경로만
+        handler.repo.git.add("a1.md")
+        handler.repo.git.commit("-q", "-m", "a1")
+        os.remove(os.path.join(root, "a[1].md"))
+        os.remove(os.path.join(root, "a1.md"))
+        change_set.record("deleted", os.path.join(root, "a[1].md"))
+
+        handler.sync()
+
+        files = _committed_files(handler)
+        assert "a[1].md" not in files
+        assert "a1.md" in files
+
+    def test_full_rescan_after_observer_restart(self, vault):
+        root, change_set, handler = vault
+        write(root, "offline.md", "o")
+        change_set.mark_full_rescan()
+
+        handler.sync()
+
+        assert "offline.md" in _committed_files(handler)
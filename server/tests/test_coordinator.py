@@ -0,0 +1,96 @@
+"""SyncCoordinator 테스트 — sync cycle 직렬화와 trigger 병합 검증"""
+
+import threading
+import time
+
+from src.coordinator import SyncCoordinator
+from src.metrics import SYNC_TRIGGERS_COALESCED_TOTAL
+
+
+def _coalesced(trigger):
+    return SYNC_TRIGGERS_COALESCED_TOTAL.labels(trigger=trigger)._value.get()
+
+
+class TestSyncCoordinator:
+    def test_runs_request_with_reason(self):
+        reasons = []
+        coordinator = SyncCoordinator(reasons.append).start()
+        try:
+            assert coordinator.request("initial", wait=True, timeout=2.0)
+        finally:
+            coordinator.stop(timeout=2.0)
+        assert reasons == ["initial"]
+
+    def test_cycles_never_overlap(self):
+        """동시에 들어온 요청이라도 sync는 한 번에 하나만 실행"""
+        active = []
+        overlaps = []
+        lock = threading.Lock()
+
+        def sync(_reason):
+            with lock:
+                active.append(1)
+                if len(active) > 1:
+                    overlaps.append(1)
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+
+        coordinator = SyncCoordinator(sync).start()
+        try:
+            threads = [
+                threading.Thread(target=coordinator.request, args=("debounce",))
+                for _ in range(20)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert coordinator.request("periodic", wait=True, timeout=5.0)
+        finally:
+            coordinator.stop(timeout=2.0)
+        assert overlaps == []
+
+    def test_triggers_during_cycle_coalesce_into_one_follow_up(self):
+        """진행 중 cycle 동안 들어온 trigger들은 정확히 한 번의 후속 cycle로 병합"""
+        started = threading.Event()
+        release = threading.Event()
+        reasons = []
+
+        def sync(reason):
+            reasons.append(reason)
+            if len(reasons) == 1:
+                started.set()
+                release.wait(timeout=2.0)
+
+        before = _coalesced("periodic")
+        coordinator = SyncCoordinator(sync).start()
+        try:
+            coordinator.request("initial")
+            assert started.wait(timeout=2.0)
+            coordinator.request("debounce")
+            coordinator.request("periodic")
+            coordinator.request("periodic")
+            release.set()
+            assert coordinator.request("debounce", wait=True, timeout=2.0)
+        finally:
+            coordinator.stop(timeout=2.0)
+
+        assert reasons == ["initial", "debounce"]
+        assert _coalesced("periodic") - before == 2
+
+    def test_sync_exception_does_not_stop_worker(self):
+        calls = []
+
+        def sync(reason):
+            calls.append(reason)
+            if reason == "initial":
+                raise RuntimeError("index.lock exists")
+
+        coordinator = SyncCoordinator(sync).start()
+        try:
+            assert coordinator.request("initial", wait=True, timeout=2.0)
+            assert coordinator.request("periodic", wait=True, timeout=2.0)
+        finally:
+            coordinator.stop(timeout=2.0)
+        assert calls == ["initial", "periodic"]
@@ -0,0 +1,102 @@
+"""EventJournal / fsmonitor hook 테스트 — 실제 git이 hook을 통해 journal을 조회하는지 검증"""
+
+import os
+import time
+
+import pytest
+
+from src.fsmonitor import FULL_RESCAN, EventJournal, FsMonitorServer
+from src.git_handler import GitHandler
+
+
+class TestEventJournal:
+    def test_unknown_token_requires_full_rescan(self, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        token, paths = journal.since("")
+        assert paths is FULL_RESCAN
+        assert token.startswith(f"sbsync:{journal.instance}:")
+
+        _, paths = journal.since("sbsync:otherinstance:3")
+        assert paths is FULL_RESCAN
+
+    def test_returns_paths_since_token(self, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        token, _ = journal.since("")
+        journal.record(str(tmp_path / "a.md"))
+        journal.record(str(tmp_path / "dir"), is_dir=True)
+        journal.record(str(tmp_path / "a.md"))
+
+        token2, paths = journal.since(token)
+        assert paths == ["a.md", "dir/"]
+
+        journal.record(str(tmp_path / "b.md"))
+        _, paths = journal.since(token2)
+        assert paths == ["b.md"]
+
+    def test_evicted_tokens_require_full_rescan(self, tmp_path):
+        """journal 크기를 넘어 밀려난 token은 full rescan"""
+        journal = EventJournal(str(tmp_path), max_entries=2)
+        token, _ = journal.since("")
+        for name in ("a", "b", "c"):
+            journal.record(str(tmp_path / name))
+
+        _, paths = journal.since(token)
+        assert paths is FULL_RESCAN
+
+    def test_invalidate(self, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        token, _ = journal.since("")
+        journal.invalidate()
+        assert journal.since(token)[1] is FULL_RESCAN
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    root = tmp_path / "vault"
+    root.mkdir()
+    (root / "a.md").write_text("a")
+    (root / "b.md").write_text("b")
+    handler = GitHandler(repo_path=str(root))
+    handler.fsmonitor_socket = str(tmp_path / "fsm.sock")
+    handler._configure_index(handler.repo)
+    handler.repo.git.add(A=True)
+    handler.repo.git.commit("-q", "-m", "init")
+    # racy-clean 판정을 피하도록 index보다 오래된 mtime으로 맞춤
+    old = time.time() - 10
+    for name in ("a.md", "b.md"):
+        os.utime(root / name, (old, old))
+    handler.repo.git.update_index("--refresh")
+    return root, handler
+
+
+class TestFsMonitorHook:
+    def test_repo_configured_for_incremental_status(self, repo):
+        _, handler = repo
+        reader = handler.repo.config_reader()
+        assert reader.get_value("core", "untrackedCache") is True
+        assert reader.get_value("core", "splitIndex") is True
+        assert reader.get_value("core", "fsmonitor").endswith("fsmonitor-hook")
+
+    def test_git_status_uses_journal(self, repo):
+        root, handler = repo
+        journal = EventJournal(str(root))
+        server = FsMonitorServer(journal, handler.fsmonitor_socket).start()
+        try:
+            # 첫 조회는 full rescan → index에 token 저장
+            assert handler.repo.git.status("--porcelain") == ""
+            assert handler.repo.git.status("--porcelain") == ""
+
+            # journal에 기록되지 않은 변경은 fsmonitor가 "변경 없음"으로 답함
+            (root / "a.md").write_text("edited-a")
+            assert handler.repo.git.status("--porcelain") == ""
+
+            journal.record(str(root / "a.md"))
+            assert handler.repo.git.status("--porcelain") == " M a.md"
+        finally:
+            server.stop()
+
+    def test_hook_failure_falls_back_to_scan(self, repo):
+        """sbSync가 떠 있지 않으면 hook 실패 → git이 일반 scan"""
+        root, handler = repo
+        (root / "b.md").write_text("edited-b")
+        assert handler.repo.git.status("--porcelain") == " M b.md"
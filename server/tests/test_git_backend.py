@@ -0,0 +1,97 @@
+"""GitBackend 테스트 — CLI backend와 cat-file coprocess backend가 같은 결과를 내는지 검증"""
+
+import os
+
+import git
+import pytest
+
+from src.git_backend import CatFileGitBackend, CliGitBackend, make_backend
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "vault"
+    (root / "notes" / "deep").mkdir(parents=True)
+    (root / "a.md").write_text("alpha\n")
+    (root / "notes" / "b.md").write_text("beta\n")
+    (root / "notes" / "deep" / "c d.md").write_text("gamma\n")
+    (root / "image.png").write_bytes(b"\x89PNG\r\n\x00\xff")
+    repo = git.Repo.init(str(root))
+    with repo.config_writer() as cw:
+        cw.set_value("user", "name", "test")
+        cw.set_value("user", "email", "test@example.com")
+    repo.git.add(A=True)
+    repo.git.commit("-q", "-m", "init")
+    return repo
+
+
+@pytest.fixture(params=[CliGitBackend, CatFileGitBackend])
+def backend(request, repo):
+    backend = request.param(repo)
+    yield backend
+    backend.close()
+
+
+class TestGitBackend:
+    def test_rev_parse(self, backend, repo):
+        assert backend.rev_parse("HEAD") == repo.head.commit.hexsha
+        assert backend.rev_parse("no-such-branch") is None
+
+    def test_tree_files(self, backend):
+        assert backend.tree_files("HEAD") == {
+            "a.md",
+            "image.png",
+            "notes/b.md",
+            "notes/deep/c d.md",
+        }
+
+    def test_read_blob(self, backend):
+        assert backend.read_blob("HEAD", "a.md") == b"alpha\n"
+        assert backend.read_blob("HEAD", "image.png") == b"\x89PNG\r\n\x00\xff"
+        assert backend.read_blob("HEAD", "missing.md") is None
+        assert backend.read_blob("HEAD", "notes/deep/c d.md") == b"gamma\n"
+
+    def test_missing_path_with_spaces(self, backend):
+        """공백이 든 없는 경로: "<spec> missing" 응답의 필드 수가 3개 이상"""
+        forks = backend.forks
+        assert backend.read_blob("HEAD", "my note.md") is None
+        assert backend.read_blob("HEAD", "notes/a b c.md") is None
+        # coprocess를 재시작하지 않고 다음 질의도 정상
+        assert backend.read_blob("HEAD", "a.md") == b"alpha\n"
+        assert backend.forks - forks <= (3 if isinstance(backend, CliGitBackend) else 1)
+
+    def test_object_size(self, backend, repo):
+        oid = repo.git.rev_parse("HEAD:image.png")
+        assert backend.object_size(oid) == 8
+        assert backend.object_size("0" * 40) is None
+
+    def test_is_dirty(self, backend, repo):
+        assert not backend.is_dirty()
+        open(os.path.join(repo.working_tree_dir, "new.md"), "w").close()
+        assert backend.is_dirty()
+
+    def test_sees_new_commits(self, backend, repo):
+        """coprocess도 이후 커밋/새 object를 볼 수 있어야 함"""
+        backend.tree_files("HEAD")
+        with open(os.path.join(repo.working_tree_dir, "e.md"), "w") as f:
+            f.write("epsilon\n")
+        repo.git.add("e.md")
+        repo.git.commit("-q", "-m", "second")
+        assert backend.rev_parse("HEAD") == repo.head.commit.hexsha
+        assert "e.md" in backend.tree_files("HEAD")
+
+
+def test_catfile_backend_reuses_processes(repo):
+    backend = CatFileGitBackend(repo)
+    try:
+        for _ in range(20):
+            backend.rev_parse("HEAD")
+            backend.tree_files("HEAD")
+        assert backend.forks == 2
+    finally:
+        backend.close()
+
+
+def test_make_backend_falls_back_to_catfile(repo):
+    assert isinstance(make_backend(repo, "cli"), CliGitBackend)
+    assert isinstance(make_backend(repo, "libgit2"), CatFileGitBackend)
@@ -0,0 +1,119 @@
+"""HashCache 테스트 — 내용이 같은 재기록(touch) 이벤트를 sync 전에 걸러내는지 검증"""
+
+import os
+import subprocess
+import time
+
+import pytest
+from watchdog.events import FileModifiedEvent
+
+from src.changeset import ChangeSet
+from src.git_handler import GitHandler
+from src.hashcache import HashCache, blob_sha
+from src.watcher import VaultEventHandler
+from tests.conftest import write
+
+
+def _touch(path, offset):
+    t = time.time() + offset
+    os.utime(path, (t, t))
+
+
+@pytest.fixture
+def vault(tmp_path):
+    root = str(tmp_path / "vault")
+    os.makedirs(root)
+    write(root, "a.md", "alpha\n")
+    write(root, "notes/b.md", "beta\n")
+    cache = HashCache(root, path=str(tmp_path / "hash-cache.pickle"))
+    change_set = ChangeSet(root)
+    handler = GitHandler(repo_path=root, change_set=change_set, hash_cache=cache)
+    handler.sync()
+    return root, cache, change_set, handler
+
+
+def test_blob_sha_matches_git(tmp_path):
+    path = tmp_path / "x.md"
+    path.write_bytes(b"hello\n")
+    expected = subprocess.run(
+        ["git", "hash-object", str(path)], capture_output=True, text=True, check=True
+    ).stdout.strip()
+    assert blob_sha(b"hello\n") == expected
+
+
+class TestHashCache:
+    def test_seeded_from_index_after_commit(self, vault):
+        root, cache, _, _ = vault
+        assert len(cache) == 2
+
+        repo = GitHandler(repo_path=root).repo
+        fresh = HashCache(root, path=cache.path)
+        assert fresh.seed(repo) == 2
+        assert fresh.head == repo.head.commit.hexsha
+
+    def test_touch_and_identical_rewrite_are_unchanged(self, vault):
+        root, cache, _, _ = vault
+        path = os.path.join(root, "a.md")
+        _touch(path, 5)
+        assert cache.unchanged(path)
+
+        write(root, "a.md", "alpha\n")
+        assert cache.unchanged(path)
+
+        write(root, "a.md", "alpha!\n")
+        assert not cache.unchanged(path)
+        assert not cache.unchanged(os.path.join(root, "untracked.md"))
+
+    def test_large_files_are_not_hashed(self, vault):
+        root, cache, _, _ = vault
+        cache.max_file_bytes = 1
+        path = os.path.join(root, "a.md")
+        _touch(path, 5)
+        assert not cache.unchanged(path)
+
+    def test_refreshed_after_staging(self, vault):
+        root, cache, change_set, handler = vault
+        path = write(root, "a.md", "alpha v2\n")
+        change_set.record("modified", path)
+        handler.sync()
+
+        _touch(path, 5)
+        assert cache.unchanged(path)
+        # 이전 내용으로 되돌리면 변경으로 처리
+        write(root, "a.md", "alpha\n")
+        assert not cache.unchanged(path)
+
+    def test_persisted_cache_requires_same_head(self, vault):
+        root, cache, _, handler = vault
+        assert os.path.exists(cache.path)
+
+        restored = HashCache(root, path=cache.path)
+        assert restored.load(handler.repo)
+        assert len(restored) == 2
+
+        # sbSync 밖에서 HEAD가 움직이면 저장된 cache는 버리고 다시 seed
+        write(root, "c.md", "gamma\n")
+        handler.repo.git.add("c.md")
+        handler.repo.git.commit("-q", "-m", "outside")
+        assert not HashCache(root, path=cache.path).load(handler.repo)
+
+        cache.check_head(handler.repo)
+        assert len(cache) == 3
+
+
+class TestWatcherSuppression:
+    def test_touch_events_never_reach_debouncer(self, vault):
+        root, cache, change_set, _ = vault
+        calls = []
+        handler = VaultEventHandler(
+            lambda: calls.append(1), change_set=change_set, hash_cache=cache
+        )
+        path = os.path.join(root, "notes", "b.md")
+        _touch(path, 5)
+        handler.on_any_event(FileModifiedEvent(path))
+        assert calls == []
+
+        write(root, "notes/b.md", "beta edited\n")
+        handler.on_any_event(FileModifiedEvent(path))
+        assert calls == [1]
+        assert "notes/b.md" in change_set.drain().paths
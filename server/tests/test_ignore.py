@@ -0,0 +1,126 @@
+"""IgnoreMatcher + VaultEventHandler 무시 규칙 필터 테스트"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.ignore import GIT_DIR_RULE, IgnoreMatcher
+from src.metrics import FILES_CHANGED_TOTAL, IGNORED_EVENTS_TOTAL
+from src.watcher import VaultEventHandler
+
+
+def _event(path, event_type="modified", is_directory=False, dest_path=None):
+    return SimpleNamespace(
+        src_path=path, dest_path=dest_path, event_type=event_type, is_directory=is_directory
+    )
+
+
+@pytest.fixture
+def vault(tmp_path):
+    root = tmp_path / "vault"
+    (root / ".git" / "info").mkdir(parents=True)
+    (root / ".gitignore").write_text("*.log\nbuild/\n!keep.log\n/root-only.md\n")
+    (root / ".git" / "info" / "exclude").write_text("secret/**\n")
+    return root
+
+
+class TestIgnoreMatcher:
+    """gitignore 문법 및 우선순위"""
+
+    def test_git_dir_is_component_match(self, vault):
+        """'.git' 부분 문자열이 아니라 경로 컴포넌트로만 판단"""
+        matcher = IgnoreMatcher(str(vault), extra_patterns=[])
+        assert matcher.match(str(vault / ".git" / "index")) == GIT_DIR_RULE
+        assert matcher.match(str(vault / "my.github-notes.md")) is None
+        assert matcher.match(str(vault / "notes" / ".gitkeep")) is None
+
+    def test_gitignore_rules(self, vault):
+        matcher = IgnoreMatcher(str(vault), extra_patterns=[])
+        assert matcher.match(str(vault / "deep" / "x.log")) == ".gitignore:*.log"
+        assert matcher.match(str(vault / "keep.log")) is None
+        assert matcher.match(str(vault / "build" / "a.md")) == ".gitignore:build/"
+        assert matcher.match(str(vault / "build"), is_dir=True) == ".gitignore:build/"
+        # dir-only 규칙은 같은 이름의 파일에는 적용되지 않음
+        assert matcher.match(str(vault / "build")) is None
+        assert matcher.match(str(vault / "root-only.md")) is not None
+        assert matcher.match(str(vault / "sub" / "root-only.md")) is None
+
+    def test_info_exclude_and_extra_patterns(self, vault):
+        matcher = IgnoreMatcher(
+            str(vault), extra_patterns=[".obsidian/workspace.json", "*.swp", ".trash/"]
+        )
+        assert matcher.match(str(vault / "secret" / "a" / "b.md")) == "info/exclude:secret/**"
+        assert matcher.match(str(vault / ".obsidian" / "workspace.json")) is not None
+        assert matcher.match(str(vault / ".obsidian" / "app.json")) is None
+        assert matcher.match(str(vault / "notes" / ".note.md.swp")) == "extra:*.swp"
+        assert matcher.match(str(vault / ".trash" / "old.md")) == "extra:.trash/"
+
+    def test_gitignore_overrides_extra(self, vault):
+        """.gitignore의 negation이 extra 패턴보다 우선"""
+        (vault / ".gitignore").write_text("!important.swp\n")
+        matcher = IgnoreMatcher(str(vault), extra_patterns=["*.swp"])
+        assert matcher.match(str(vault / "important.swp")) is None
+        assert matcher.match(str(vault / "other.swp")) is not None
+
+    def test_double_star(self, vault):
+        matcher = IgnoreMatcher(str(vault), extra_patterns=["**/cache/**", "a/**/z.md"])
+        assert matcher.match(str(vault / "x" / "cache" / "y.md")) is not None
+        assert matcher.match(str(vault / "a" / "z.md")) is not None
+        assert matcher.match(str(vault / "a" / "b" / "c" / "z.md")) is not None
+        assert matcher.match(str(vault / "b" / "z.md")) is None
+
+
+class TestHandlerFiltering:
+    """무시된 이벤트는 FILES_CHANGED_TOTAL 증가/콜백 호출 전에 버려짐"""
+
+    def test_ignored_event_does_not_arm_debouncer(self, vault):
+        matcher = IgnoreMatcher(str(vault), extra_patterns=[".obsidian/workspace.json"])
+        calls = []
+        handler = VaultEventHandler(lambda: calls.append(1), ignore_matcher=matcher)
+        label = "extra:.obsidian/workspace.json"
+        dropped_before = IGNORED_EVENTS_TOTAL.labels(rule=label)._value.get()
+        changed_before = FILES_CHANGED_TOTAL._value.get()
+
+        handler.on_any_event(_event(str(vault / ".obsidian" / "workspace.json")))
+
+        assert calls == []
+        assert FILES_CHANGED_TOTAL._value.get() == changed_before
+        assert IGNORED_EVENTS_TOTAL.labels(rule=label)._value.get() == dropped_before + 1
+
+        handler.on_any_event(_event(str(vault / "my.github-notes.md")))
+        assert calls == [1]
+
+    def test_move_out_of_ignored_partial_is_kept(self, vault):
+        """Drive partial → 실제 파일 rename은 변경으로 처리"""
+        matcher = IgnoreMatcher(str(vault), extra_patterns=["*.tmp.drivedownload"])
+        calls = []
+        handler = VaultEventHandler(lambda: calls.append(1), ignore_matcher=matcher)
+
+        handler.on_any_event(
+            _event(
+                str(vault / "a.pdf.tmp.drivedownload"),
+                event_type="moved",
+                dest_path=str(vault / "a.pdf"),
+            )
+        )
+        assert calls == [1]
+
+    def test_read_only_events_are_dropped(self, vault):
+        calls = []
+        handler = VaultEventHandler(lambda: calls.append(1))
+        handler.on_any_event(_event(str(vault / "a.md"), event_type="opened"))
+        handler.on_any_event(_event(str(vault / "a.md"), event_type="closed_no_write"))
+        assert calls == []
+
+    def test_reload_on_gitignore_change(self, vault):
+        matcher = IgnoreMatcher(str(vault), extra_patterns=[])
+        calls = []
+        handler = VaultEventHandler(lambda: calls.append(1), ignore_matcher=matcher)
+        assert matcher.match(str(vault / "draft.tmp")) is None
+
+        (vault / ".gitignore").write_text("*.tmp\n")
+        handler.on_any_event(_event(str(vault / ".gitignore")))
+
+        assert matcher.match(str(vault / "draft.tmp")) == ".gitignore:*.tmp"
+        handler.on_any_event(_event(str(vault / "draft.tmp")))
+        assert calls == [1]  # .gitignore 변경 자체만 콜백
@@ -37,11 +37,14 @@ class TestMainHealthCheck:
         assert "MountHealthChecker" in source, (
             "main()에서 MountHealthChecker를 사용해야 함"
         )
-        # elapsed 기반 주기적 실행 패턴 확인
-        assert "elapsed" in source, "주기적 health check를 위한 elapsed 카운터가 필요함"
+        # 공유 timer에 check_interval 주기로 등록하고 main thread는 Event를 기다림
         assert "check_interval" in source, (
             "주기적 health check를 위한 check_interval 변수가 필요함"
         )
+        assert "PeriodicTimer(check_interval" in source, (
+            "health check는 공유 timer scheduler에 등록되어야 함"
+        )
+        assert "time.sleep(1)" not in source, "1초 sleep loop를 사용하지 않아야 함"
 
     def test_health_check_interval_configurable(self):
         """HEALTH_CHECK_SECONDS 환경변수로 주기 설정 가능한지 확인"""
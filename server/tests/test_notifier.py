@@ -0,0 +1,73 @@
+"""PushNotifier 테스트 — push 성공 후 pull client의 notify endpoint에 새 commit을 POST"""
+
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import git
+import pytest
+
+from src.changeset import ChangeSet
+from src.config import config
+from src.git_handler import GitHandler
+from src.notifier import PushNotifier
+
+
+@pytest.fixture
+def receiver():
+    """localhost에서 notify를 받아 (Authorization, body)를 기록하는 가짜 client"""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers["Content-Length"])
+            body = json.loads(self.rfile.read(length))
+            received.append((self.headers.get("Authorization"), body))
+            self.send_response(202)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/notify", received
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_notify_posts_sha_with_bearer_token(receiver):
+    url, received = receiver
+    PushNotifier([url], "secret", timeout=2).notify("abc123", "main", wait=True)
+    assert len(received) == 1
+    auth, body = received[0]
+    assert auth == "Bearer secret"
+    assert body["sha"] == "abc123"
+    assert body["branch"] == "main"
+
+
+def test_unreachable_client_does_not_block_others(receiver):
+    url, received = receiver
+    notifier = PushNotifier(["http://127.0.0.1:9/notify", url], "secret", timeout=1)
+    notifier.notify("abc123", wait=True)
+    assert [body["sha"] for _, body in received] == ["abc123"]
+
+
+def test_push_notifies_pushed_commit(receiver, tmp_path, monkeypatch):
+    url, received = receiver
+    bare = str(tmp_path / "remote.git")
+    git.Repo.init(bare, bare=True, initial_branch="main")
+    monkeypatch.setattr(config, "GIT_REMOTE_URL", bare)
+
+    root = str(tmp_path / "vault")
+    os.makedirs(root)
+    with open(os.path.join(root, "a.md"), "w") as f:
+        f.write("alpha\n")
+    handler = GitHandler(repo_path=root, change_set=ChangeSet(root))
+    handler.repo.git.checkout("-q", "-b", "main")
+    notifier = PushNotifier([url], "secret", timeout=2)
+    handler.on_pushed = lambda sha, branch: notifier.notify(sha, branch, wait=True)
+    handler.sync()
+
+    assert [body["sha"] for _, body in received] == [git.Repo(bare).git.rev_parse("main")]
@@ -0,0 +1,88 @@
+"""sync 단계별 histogram 테스트 — 단계 시간, 오류 분류, stage된 파일 수와 push 크기"""
+
+import os
+
+import git
+import pytest
+from prometheus_client import REGISTRY
+
+from src.changeset import ChangeSet
+from src.config import config
+from src.git_handler import GitHandler
+from src.phases import classify_error, timed_phase
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def _git_error(stderr):
+    return git.exc.GitCommandError(["git", "push"], 1, stderr)
+
+
+@pytest.mark.parametrize(
+    "stderr, expected",
+    [
+        (" ! [rejected]        main -> main (fetch first)", "non_fast_forward"),
+        ("fatal: Authentication failed for 'https://example.com/vault.git/'", "auth"),
+        ("git@github.com: Permission denied (publickey).\nfatal: Could not read from "
+         "remote repository.", "auth"),
+        ("ssh: Could not resolve hostname github.com: Name or service not known\n"
+         "fatal: Could not read from remote repository.", "network"),
+        ("fatal: Unable to create '/vault/.git/index.lock': File exists.", "lock"),
+        ("CONFLICT (content): Merge conflict in a.md", "conflict"),
+        ("fatal: something unexpected", "other"),
+    ],
+)
+def test_classify_error(stderr, expected):
+    assert classify_error(_git_error(stderr)) == expected
+
+
+def test_timed_phase_records_outcome_and_error_class():
+    ok_before = _sample("sbsync_git_phase_seconds_count", phase="test", outcome="ok")
+    err_before = _sample("sbsync_git_phase_seconds_count", phase="test", outcome="error")
+    lock_before = _sample("sbsync_git_phase_errors_total", phase="test", error_class="lock")
+
+    with timed_phase("test"):
+        pass
+    with pytest.raises(git.exc.GitCommandError):
+        with timed_phase("test"):
+            raise _git_error("fatal: Unable to create 'index.lock': File exists.")
+
+    assert _sample("sbsync_git_phase_seconds_count", phase="test", outcome="ok") == ok_before + 1
+    assert (
+        _sample("sbsync_git_phase_seconds_count", phase="test", outcome="error")
+        == err_before + 1
+    )
+    assert (
+        _sample("sbsync_git_phase_errors_total", phase="test", error_class="lock")
+        == lock_before + 1
+    )
+
+
+def test_sync_observes_phases_files_and_push_bytes(tmp_path, monkeypatch):
+    bare = str(tmp_path / "remote.git")
+    git.Repo.init(bare, bare=True, initial_branch="main")
+    monkeypatch.setattr(config, "GIT_REMOTE_URL", bare)
+
+    root = str(tmp_path / "vault")
+    os.makedirs(os.path.join(root, "notes"))
+    for name in ("a.md", "notes/b.md", "notes/c.md"):
+        with open(os.path.join(root, name), "w") as f:
+            f.write(f"{name}\n" * 100)
+    change_set = ChangeSet(root)
+    handler = GitHandler(repo_path=root, change_set=change_set)
+    handler.repo.git.checkout("-q", "-b", "main")
+
+    staged_before = _sample("sbsync_files_staged_sum")
+    bytes_before = _sample("sbsync_push_bytes_sum")
+    phases_before = {
+        phase: _sample("sbsync_git_phase_seconds_count", phase=phase, outcome="ok")
+        for phase in ("add", "commit", "push")
+    }
+    handler.sync()
+
+    assert _sample("sbsync_files_staged_sum") == staged_before + 3
+    assert _sample("sbsync_push_bytes_sum") > bytes_before
+    for phase, before in phases_before.items():
+        assert _sample("sbsync_git_phase_seconds_count", phase=phase, outcome="ok") == before + 1
@@ -0,0 +1,158 @@
+"""VaultIndex / VaultPollingObserver 테스트 — 임시 디렉토리에서 실제 파일 변경으로 검증"""
+
+import os
+import threading
+import time
+
+import pytest
+from watchdog.events import FileSystemEventHandler
+
+from src.ignore import IgnoreMatcher
+from src.poller import VaultIndex, VaultPollingObserver, _ChangeCollector
+from tests.conftest import write
+
+
+def _poll(index):
+    changes = _ChangeCollector()
+    index.poll(changes)
+    result = set()
+    for e in changes.events(index.root):
+        dest = getattr(e, "dest_path", "")
+        result.add(
+            (
+                e.event_type,
+                os.path.relpath(e.src_path, index.root),
+                os.path.relpath(dest, index.root) if dest else "",
+            )
+        )
+    return result
+
+
+@pytest.fixture
+def vault(tmp_path):
+    root = tmp_path / "vault"
+    root.mkdir()
+    write(str(root), "a.md", "a")
+    write(str(root), "notes/b.md", "b")
+    write(str(root), ".git/HEAD", "ref")
+    return str(root)
+
+
+def _cold_index(root, **kwargs):
+    index = VaultIndex(root, deep_scan_every=1, **kwargs)
+    index.poll(_ChangeCollector(emit_new_dirs=False))
+    return index
+
+
+class TestVaultIndex:
+    def test_cold_walk_indexes_without_events(self, vault):
+        index = _cold_index(vault)
+        assert index.file_count == 2
+        assert ".git" not in index.dirs
+        assert _poll(index) == set()
+
+    def test_detects_create_modify_delete(self, vault):
+        index = _cold_index(vault)
+        write(vault, "new.md", "n")
+        write(vault, "notes/b.md", "bbbb")
+        os.remove(os.path.join(vault, "a.md"))
+
+        assert _poll(index) == {
+            ("created", "new.md", ""),
+            ("modified", "notes/b.md", ""),
+            ("deleted", "a.md", ""),
+        }
+
+    def test_detects_moves_by_inode(self, vault):
+        index = _cold_index(vault)
+        os.rename(os.path.join(vault, "a.md"), os.path.join(vault, "notes", "a2.md"))
+        assert _poll(index) == {("moved", "a.md", "notes/a2.md")}
+
+    def test_directory_delete_emits_file_deletes(self, vault):
+        index = _cold_index(vault)
+        os.remove(os.path.join(vault, "notes", "b.md"))
+        os.rmdir(os.path.join(vault, "notes"))
+        events = _poll(index)
+        assert ("deleted", "notes/b.md", "") in events
+        assert ("deleted", "notes", "") in events
+        assert "notes" not in index.dirs
+
+    def test_quiet_directories_are_striped(self, vault):
+        """mtime이 그대로인 조용한 디렉토리는 deep_scan_every 주기마다 한 번만 stat"""
+        index = VaultIndex(vault, deep_scan_every=1000)
+        index.poll(_ChangeCollector(emit_new_dirs=False))
+        entry = index.dirs["notes"]
+        # stripe가 다음 poll과 겹치지 않도록 고정
+        entry.stripe = index.poll_count + 500
+
+        with open(os.path.join(vault, "notes", "b.md"), "w") as f:
+            f.write("in-place edit")
+        assert _poll(index) == set()
+
+        entry.stripe = index.poll_count + 1
+        assert _poll(index) == {("modified", "notes/b.md", "")}
+
+    def test_info_exclude_change_is_picked_up(self, vault):
+        """.git은 walk하지 않으므로 info/exclude 변경은 poll 시작 시 mtime으로 감지"""
+        write(vault, "scratch/tmp.md", "t")
+        matcher = IgnoreMatcher(vault, extra_patterns=[])
+        index = _cold_index(vault, ignore_matcher=matcher)
+        assert "scratch" in index.dirs
+
+        write(vault, ".git/info/exclude", "scratch/\n")
+        _poll(index)
+        assert matcher.match(os.path.join(vault, "scratch"), is_dir=True) == "info/exclude:scratch/"
+        assert "scratch" not in index.dirs
+        generation = matcher.generation
+        _poll(index)
+        assert matcher.generation == generation
+
+    def test_ignored_directories_are_not_walked(self, vault):
+        write(vault, ".trash/old.md")
+        matcher = IgnoreMatcher(vault, extra_patterns=[".trash/"])
+        index = _cold_index(vault, ignore_matcher=matcher)
+        assert ".trash" not in index.dirs
+
+    def test_persisted_index_round_trip(self, vault, tmp_path):
+        """저장된 index로 재시작하면 cold walk 없이 오프라인 변경을 감지"""
+        index = _cold_index(vault)
+        path = str(tmp_path / "index.pickle")
+        assert index.dump(path) > 0
+
+        write(vault, "offline.md", "o")
+        restored = VaultIndex(vault, deep_scan_every=1)
+        assert restored.load(path)
+        assert restored.file_count == 2
+        assert _poll(restored) == {("created", "offline.md", "")}
+
+    def test_load_rejects_other_vault(self, vault, tmp_path):
+        path = str(tmp_path / "index.pickle")
+        _cold_index(vault).dump(path)
+        assert not VaultIndex(str(tmp_path)).load(path)
+
+
+class TestVaultPollingObserver:
+    def test_observer_emits_events_to_handler(self, vault, tmp_path):
+        received = []
+        got_event = threading.Event()
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory:
+                    received.append((event.event_type, event.src_path))
+                    got_event.set()
+
+        index_path = str(tmp_path / "state" / "index.pickle")
+        observer = VaultPollingObserver(index_path=index_path, timeout=0.05)
+        observer.schedule(Handler(), vault, recursive=True)
+        observer.start()
+        try:
+            time.sleep(0.1)
+            write(vault, "watched.md", "w")
+            assert got_event.wait(timeout=2.0)
+        finally:
+            observer.stop()
+            observer.join()
+
+        assert ("created", os.path.join(vault, "watched.md")) in received
+        assert os.path.exists(index_path)
@@ -0,0 +1,71 @@
+"""profiling route 테스트 — 전체 thread sampling CPU profile, tracemalloc snapshot/diff, 기본 비활성"""
+
+import threading
+import tracemalloc
+
+from src.config import config
+from src.profiling import Profiler, debug_routes, format_collapsed, format_top, sample_stacks
+
+
+class _Request:
+    def __init__(self, **query):
+        self.query = {k: [str(v)] for k, v in query.items()}
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_stacks_sees_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        counts = sample_stacks(0.3, hz=200)
+    finally:
+        stop.set()
+        worker.join()
+
+    busy = {stack: n for (name, stack), n in counts.items() if name == "busy-worker"}
+    assert busy
+    assert any("_busy_loop" in ";".join(stack) for stack in busy)
+    assert "busy-worker;" in format_collapsed(counts)
+    assert "samples" in format_top(counts).splitlines()[0]
+
+
+def test_profile_route_rejects_concurrent_runs():
+    profiler = Profiler()
+    profiler._busy.acquire()
+    try:
+        status, _, _ = profiler.profile_route(_Request(seconds=0.1))
+    finally:
+        profiler._busy.release()
+    assert status == 409
+    status, _, body = profiler.profile_route(_Request(seconds=0.1, format="top"))
+    assert status == 200
+    assert "samples" in body
+
+
+def test_tracemalloc_snapshot_and_diff():
+    profiler = Profiler()
+    assert profiler.tracemalloc_route(_Request(action="snapshot"))[0] == 409
+    try:
+        assert profiler.tracemalloc_route(_Request(action="start"))[0] == 200
+        assert profiler.tracemalloc_route(_Request(action="diff"))[0] == 409
+        assert profiler.tracemalloc_route(_Request(action="snapshot"))[0] == 200
+        leak = [bytearray(1024) for _ in range(2000)]
+        status, _, body = profiler.tracemalloc_route(_Request(action="diff", limit=5))
+        assert status == 200
+        assert "test_profiling.py" in body
+        del leak
+    finally:
+        profiler.tracemalloc_route(_Request(action="stop"))
+    assert not tracemalloc.is_tracing()
+
+
+def test_routes_are_off_by_default(monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_ENABLED", False)
+    assert debug_routes() == {}
+    monkeypatch.setattr(config, "PROFILING_ENABLED", True)
+    assert len(debug_routes()) == 2
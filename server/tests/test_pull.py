@@ -0,0 +1,53 @@
+"""Pull 테스트 — working tree가 항상 dirty여도 커밋 후 autostash rebase로 remote 변경을 받는지 검증"""
+
+import os
+
+import git
+from prometheus_client import REGISTRY
+
+from tests.conftest import push_from, write
+
+
+def _skipped(reason):
+    return REGISTRY.get_sample_value("sbsync_pulls_skipped_total", {"reason": reason}) or 0
+
+
+class TestPullWhileDirty:
+    def test_remote_changes_land_in_dirty_vault(self, remote, other):
+        bare, root, change_set, handler = remote
+        push_from(other, "b.md", "from another device\n")
+
+        # 이번 cycle에 커밋될 편집 + 아직 기록되지 않은(커밋 안 될) 편집
+        change_set.record("modified", write(root, "a.md", "alpha local\n"))
+        write(root, "c.md", "gamma draft\n")
+        handler.sync()
+
+        head = handler.repo.head.commit
+        assert head.parents[0].hexsha == other.head.commit.hexsha
+        # rebase 후 바로 push되므로 non-fast-forward 없음
+        assert git.Repo(bare).git.rev_parse("main") == head.hexsha
+        with open(os.path.join(root, "b.md")) as f:
+            assert f.read() == "from another device\n"
+        with open(os.path.join(root, "c.md")) as f:
+            assert f.read() == "gamma draft\n"
+
+    def test_up_to_date_pull_skips_rebase(self, remote):
+        _, root, change_set, handler = remote
+        before = _skipped("up_to_date")
+        head = handler.repo.head.commit.hexsha
+        write(root, "c.md", "gamma draft\n")
+        handler.sync()
+        assert _skipped("up_to_date") == before + 1
+        assert handler.repo.head.commit.hexsha == head
+
+    def test_conflicting_rebase_is_aborted(self, remote, other):
+        _, root, change_set, handler = remote
+        push_from(other, "a.md", "alpha remote\n")
+        change_set.record("modified", write(root, "a.md", "alpha local\n"))
+        handler.sync()
+
+        # 충돌 → rebase abort, 로컬 커밋 유지
+        assert not os.path.exists(os.path.join(handler.repo.git_dir, "rebase-merge"))
+        assert handler.repo.git.show("HEAD:a.md") == "alpha local"
+        with open(os.path.join(root, "a.md")) as f:
+            assert f.read() == "alpha local\n"
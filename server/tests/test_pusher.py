@@ -0,0 +1,133 @@
+"""PushWorker 테스트 — 커밋과 push 분리, 일괄 push, non-fast-forward 시 fetch + rebase 후 재시도"""
+
+import os
+import time
+
+import git
+from prometheus_client import REGISTRY
+
+from src.pusher import PushWorker, backoff_delay
+from tests.conftest import push_from, write
+
+
+def _wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return predicate()
+
+
+def _remote_head(bare):
+    return git.Repo(bare).git.rev_parse("main")
+
+
+class TestPushWorker:
+    def test_sync_without_worker_pushes_inline(self, remote):
+        bare, _, _, handler = remote
+        assert _remote_head(bare) == handler.repo.head.commit.hexsha
+        assert handler.unpushed_commits() == (0, None)
+
+    def test_commits_are_batched_into_one_push(self, remote):
+        bare, root, change_set, handler = remote
+        worker = PushWorker(handler, batch_delay=2, backoff_base=0.1, backoff_max=1)
+        handler.on_committed = worker.request
+        worker.start()
+        try:
+            assert _wait_for(lambda: not worker._due)
+            pushes_before = worker.pushes
+
+            for i in range(3):
+                change_set.record("modified", write(root, "a.md", f"alpha {i}\n"))
+                handler.sync()
+            count, oldest = handler.unpushed_commits()
+            assert count == 3
+            assert oldest is not None
+
+            assert _wait_for(lambda: handler.unpushed_commits()[0] == 0)
+            assert worker.pushes == pushes_before + 1
+            assert _remote_head(bare) == handler.repo.head.commit.hexsha
+        finally:
+            worker.stop(timeout=5)
+
+    def test_non_fast_forward_is_rebased_and_retried(self, remote, other):
+        bare, root, change_set, handler = remote
+
+        # 다른 기기가 먼저 push → 로컬 커밋은 non-fast-forward
+        push_from(other, "b.md", "from another device\n")
+
+        worker = PushWorker(handler, batch_delay=0, backoff_base=0.1, backoff_max=1)
+        handler.on_committed = worker.request
+        change_set.record("modified", write(root, "a.md", "alpha local\n"))
+        handler.sync()
+        # 커밋되지 않은 편집은 autostash로 유지
+        write(root, "draft.md", "unsaved\n")
+        worker.start()
+        try:
+            assert _wait_for(lambda: worker.pushes == 1)
+        finally:
+            worker.stop(timeout=5)
+
+        head = handler.repo.head.commit
+        assert _remote_head(bare) == head.hexsha
+        assert head.parents[0].hexsha == other.head.commit.hexsha
+        assert os.path.exists(os.path.join(root, "b.md"))
+        assert os.path.exists(os.path.join(root, "draft.md"))
+        assert worker.failures == 0
+
+    def test_unreachable_remote_backs_off(self, remote, tmp_path):
+        _, root, change_set, handler = remote
+        handler.repo.remotes.origin.set_url(str(tmp_path / "missing.git"))
+        worker = PushWorker(handler, batch_delay=0, backoff_base=0.2, backoff_max=0.4)
+        handler.on_committed = worker.request
+        change_set.record("modified", write(root, "a.md", "alpha offline\n"))
+        handler.sync()
+        worker.start()
+        try:
+            assert _wait_for(lambda: worker.failures >= 2)
+        finally:
+            worker.stop(timeout=5)
+        assert handler.unpushed_commits()[0] == 1
+
+    def test_commit_carries_first_change_time(self, remote):
+        """첫 변경 시각은 commit trailer로, commit → push 지연은 histogram으로"""
+        bare, root, change_set, handler = remote
+        pushes_before = REGISTRY.get_sample_value("sbsync_commit_to_push_seconds_count")
+
+        change_set.record("modified", write(root, "a.md", "alpha edited\n"))
+        handler.sync()
+
+        first_change = handler.repo.git.log(
+            "-1", "--format=%(trailers:key=Sbsync-First-Change,valueonly)"
+        )
+        assert abs(float(first_change) - time.time()) < 60
+        assert _remote_head(bare) == handler.repo.head.commit.hexsha
+        count = REGISTRY.get_sample_value("sbsync_commit_to_push_seconds_count")
+        assert count == pushes_before + 1
+
+
+def test_backoff_delay_grows_with_jitter():
+    for failures, cap in ((1, 5), (2, 10), (3, 20), (10, 600)):
+        delays = [backoff_delay(failures, 5, 600) for _ in range(50)]
+        assert all(cap / 2 <= d <= cap for d in delays)
+        assert len(set(delays)) > 1
+
+
+def test_commit_time_survives_rebase(remote, other, monkeypatch):
+    """rebase가 committer time을 바꿔도 commit → push 지연은 원래 커밋 시각 기준"""
+    _, root, change_set, handler = remote
+    an_hour_ago = int(time.time()) - 3600
+    monkeypatch.setenv("GIT_AUTHOR_DATE", f"{an_hour_ago} +0000")
+    monkeypatch.setenv("GIT_COMMITTER_DATE", f"{an_hour_ago} +0000")
+    handler.on_committed = lambda: None
+    change_set.record("modified", write(root, "a.md", "alpha local\n"))
+    handler.sync()
+    monkeypatch.delenv("GIT_AUTHOR_DATE")
+    monkeypatch.delenv("GIT_COMMITTER_DATE")
+
+    push_from(other, "b.md", "from another device\n")
+    handler.fetch_rebase()
+
+    assert abs(int(handler.repo.git.log("-1", "--format=%ct")) - time.time()) < 60
+    assert handler.unpushed_commits() == (1, an_hour_ago)
@@ -0,0 +1,76 @@
+"""FlightRecorder 테스트 — 최근 sync cycle을 고정 크기 ring buffer에 기록, /debug/syncs로 제공"""
+
+import json
+import os
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from src.changeset import ChangeSet
+from src.config import config
+from src.git_handler import GitHandler
+from src.metrics import RoutedMetricsHandler
+from src.recorder import DEBUG_SYNCS_PATH, FlightRecorder, debug_syncs_route, recorder
+
+
+def test_ring_buffer_keeps_last_cycles():
+    flight = FlightRecorder(size=3)
+    for i in range(5):
+        with flight.cycle(f"t{i}"):
+            flight.note(index=i)
+    cycles = flight.snapshot()["cycles"]
+    assert [c["trigger"] for c in cycles] == ["t4", "t3", "t2"]
+    assert cycles[0]["index"] == 4
+    assert all(c["outcome"] == "ok" for c in cycles)
+
+
+def test_failed_cycle_and_nothing_outside_cycles():
+    flight = FlightRecorder(size=3)
+    flight.note(ignored=True)
+    with pytest.raises(ValueError):
+        with flight.cycle("boom"):
+            raise ValueError("broken")
+    (cycle,) = flight.snapshot()["cycles"]
+    assert cycle["outcome"] == "error"
+    assert cycle["error"] == "broken"
+    assert "ignored" not in cycle
+
+
+def test_sync_cycle_records_commands_phases_and_shas(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "GIT_REMOTE_URL", "")
+    root = str(tmp_path / "vault")
+    os.makedirs(root)
+    with open(os.path.join(root, "a.md"), "w") as f:
+        f.write("alpha\n")
+    handler = GitHandler(repo_path=root, change_set=ChangeSet(root))
+    handler.sync("debounce")
+
+    cycle = recorder.snapshot()["cycles"][0]
+    assert cycle["trigger"] == "debounce"
+    assert cycle["head_before"] is None
+    assert cycle["head_after"] == handler.repo.head.commit.hexsha
+    assert cycle["files_staged"] == 1
+    assert {"add", "commit"} <= {p["phase"] for p in cycle["phases"]}
+    commit = next(c for c in cycle["commands"] if " commit " in f" {c['argv']} ")
+    assert commit["status"] == 0
+
+
+def test_debug_syncs_route_over_http():
+    with recorder.cycle("http"):
+        pass
+    routes = {("GET", DEBUG_SYNCS_PATH): debug_syncs_route}
+    handler_class = type("Handler", (RoutedMetricsHandler,), {"routes": routes})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        base = f"http://127.0.0.1:{httpd.server_address[1]}"
+        with urllib.request.urlopen(f"{base}{DEBUG_SYNCS_PATH}?limit=1") as response:
+            data = json.loads(response.read())
+        assert [c["trigger"] for c in data["cycles"]] == ["http"]
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert b"sbsync_commits_total" in response.read()
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,118 @@
+"""RepoStatsCollector 테스트 — object/pack/index 통계, untracked 파일 수, background 갱신과 git 없는 scrape"""
+
+import os
+import threading
+
+import git
+from prometheus_client import CollectorRegistry
+
+from src.metrics import RepoStatsCollector, register_repo_stats
+
+
+def _repo(tmp_path):
+    root = str(tmp_path / "vault")
+    os.makedirs(os.path.join(root, "notes"))
+    repo = git.Repo.init(root, initial_branch="main")
+    with repo.config_writer() as cw:
+        cw.set_value("user", "name", "test")
+        cw.set_value("user", "email", "test@example.com")
+    for name in ("a.md", "notes/b.md"):
+        with open(os.path.join(root, name), "w") as f:
+            f.write(f"{name}\n")
+    repo.git.add("-A")
+    repo.git.commit("-q", "-m", "seed")
+    return root, repo
+
+
+def test_collects_repository_statistics(tmp_path):
+    root, repo = _repo(tmp_path)
+    with open(os.path.join(root, "draft.md"), "w") as f:
+        f.write("draft\n")
+    # untracked 디렉터리는 안의 파일 수와 관계없이 1개 항목
+    os.makedirs(os.path.join(root, "inbox"))
+    for name in ("x.md", "y.md", "z.md"):
+        with open(os.path.join(root, "inbox", name), "w") as f:
+            f.write(name)
+
+    collector = RepoStatsCollector(root, ttl=60)
+    collector.refresh()
+    registry = CollectorRegistry()
+    registry.register(collector)
+    value = lambda name: registry.get_sample_value(f"sbsync_repo_{name}")
+
+    assert value("index_entries") == 2
+    assert value("untracked_entries") == 2
+    assert value("worktree_entries") == 4
+    assert value("loose_objects") >= 5  # 2 blobs, 2 trees, 1 commit
+    assert value("packs") == 0
+    assert value("index_bytes") > 0
+    assert value("commits_since_maintenance") == 1
+
+    repo.git.gc("-q")
+    collector.refresh()
+    values = collector.values()
+    assert values["packs"] == 1
+    assert values["pack_bytes"] > 0
+    assert values["loose_objects"] == 0
+    assert values["commits_since_maintenance"] == 0
+
+
+def test_scrape_serves_cached_values_without_git(tmp_path, monkeypatch):
+    root, _ = _repo(tmp_path)
+    collector = RepoStatsCollector(root, ttl=60)
+    calls = []
+    collect_values = collector._collect_values
+    monkeypatch.setattr(
+        collector, "_collect_values", lambda: calls.append(1) or collect_values()
+    )
+
+    registry = CollectorRegistry()
+    registry.register(collector)  # describe(): no git call at registration
+    # 첫 refresh 전에는 아무것도 export하지 않음
+    assert registry.get_sample_value("sbsync_repo_index_entries") is None
+    collector.refresh()
+    for _ in range(3):
+        assert registry.get_sample_value("sbsync_repo_index_entries") == 2
+    assert len(calls) == 1
+
+
+def test_background_thread_refreshes_every_ttl(tmp_path, monkeypatch):
+    root, repo = _repo(tmp_path)
+    collector = RepoStatsCollector(root, ttl=0.1)
+    refreshed = threading.Semaphore(0)
+    refresh = collector.refresh
+    monkeypatch.setattr(collector, "refresh", lambda: refresh() or refreshed.release())
+
+    collector.start()
+    try:
+        assert refreshed.acquire(timeout=5)
+        assert collector.values()["index_entries"] == 2
+        with open(os.path.join(root, "c.md"), "w") as f:
+            f.write("c\n")
+        repo.git.add("c.md")
+        # 다음 refresh 이후 새 값
+        for _ in range(2):
+            assert refreshed.acquire(timeout=5)
+        assert collector.values()["index_entries"] == 3
+    finally:
+        collector.stop()
+
+
+def test_unreadable_repo_keeps_last_values(tmp_path):
+    root, _ = _repo(tmp_path)
+    collector = RepoStatsCollector(root, ttl=60)
+    collector.refresh()
+    first = collector.values()
+    os.rename(os.path.join(root, ".git"), os.path.join(root, "moved.git"))
+    collector.refresh()
+    assert collector.values() == first
+
+
+def test_zero_ttl_config_disables_export(tmp_path, monkeypatch):
+    from src.config import config
+
+    root, _ = _repo(tmp_path)
+    monkeypatch.setattr(config, "REPO_STATS_TTL_SECONDS", 0)
+    registry = CollectorRegistry()
+    assert register_repo_stats(root, registry) is None
+    assert list(registry.collect()) == []
@@ -0,0 +1,166 @@
+"""StabilityGate 테스트 — 아직 쓰는 중인 파일은 커밋하지 않고 다음 cycle로 미룸"""
+
+import threading
+import time
+
+from prometheus_client import REGISTRY
+
+from src.changeset import ChangeSet
+from src.git_handler import GitHandler
+from src.stability import StabilityGate
+from tests.conftest import write
+
+
+def _committed_files(handler):
+    return set(handler.repo.git.ls_files().splitlines())
+
+
+class TestStabilityGate:
+    def test_recent_files_are_unstable(self, tmp_path):
+        root = str(tmp_path)
+        write(root, "fresh.md", "x")
+        gate = StabilityGate(settle=30, large_settle=300, large_bytes=1024)
+        stable, unstable, wait = gate.split(root, ["fresh.md", "gone.md"])
+        assert stable == ["gone.md"]
+        assert unstable == ["fresh.md"]
+        assert 0 < wait <= 30
+
+    def test_large_files_use_longer_settle(self, tmp_path):
+        root = str(tmp_path)
+        write(root, "small.md", "x")
+        write(root, "big.pdf", "x" * 2048)
+        gate = StabilityGate(settle=5, large_settle=300, large_bytes=1024)
+        # ctime은 되돌릴 수 없으므로 "지금"을 앞으로 옮겨서 판정
+        stable, unstable, _ = gate.split(root, ["small.md", "big.pdf"], now=time.time() + 60)
+        assert stable == ["small.md"]
+        assert unstable == ["big.pdf"]
+
+    def test_path_is_released_after_max_defer(self, tmp_path):
+        root = str(tmp_path)
+        write(root, "typing.md", "x")
+        gate = StabilityGate(settle=30, large_settle=300, large_bytes=1024, max_defer=20)
+        now = time.time()
+        _, unstable, wait = gate.split(root, ["typing.md"], now=now)
+        assert unstable == ["typing.md"]
+        # 후속 cycle은 settle이 아니라 max_defer 기한에 맞춰 예약
+        assert wait <= 20
+        _, unstable, _ = gate.split(root, ["typing.md"], now=now + 10)
+        assert unstable == ["typing.md"]
+        stable, unstable, _ = gate.split(root, ["typing.md"], now=now + 20)
+        assert stable == ["typing.md"]
+        assert unstable == []
+        # 기한은 다음 defer부터 새로 시작
+        _, unstable, _ = gate.split(root, ["typing.md"], now=now + 21)
+        assert unstable == ["typing.md"]
+
+
+def _handler(root, gate):
+    change_set = ChangeSet(root)
+    deferred = []
+    handler = GitHandler(repo_path=root, change_set=change_set, stability_gate=gate)
+    handler.on_deferred = deferred.append
+    return change_set, handler, deferred
+
+
+class TestDeferredStaging:
+    def test_full_rescan_unstages_unstable_paths(self, tmp_path):
+        root = str(tmp_path / "vault")
+        write(root, "a.md", "a")
+        change_set, handler, deferred = _handler(
+            root, StabilityGate(settle=30, large_settle=300, large_bytes=1 << 20)
+        )
+        handler.sync()
+
+        # 최초 full rescan: 방금 쓴 a.md는 아직 settle 안 됨 → 커밋 없음, 다음 cycle로 미룸
+        assert not handler.repo.head.is_valid()
+        assert handler.repo.git.diff("--cached", "--name-only") == ""
+        assert len(deferred) == 1
+        assert set(change_set.drain().paths) == {"a.md"}
+
+    def test_scoped_cycle_commits_only_settled_paths(self, tmp_path):
+        root = str(tmp_path / "vault")
+        write(root, "a.md", "a")
+        change_set, handler, deferred = _handler(
+            root, StabilityGate(settle=0.3, large_settle=30, large_bytes=1024)
+        )
+        time.sleep(0.4)
+        handler.sync()
+        assert _committed_files(handler) == {"a.md"}
+
+        # 큰 첨부파일은 더 긴 settle 정책 → 이번 cycle에서는 제외
+        partial = write(root, "attachment.pdf", "x" * 2048)
+        edited = write(root, "a.md", "a2")
+        change_set.record("created", partial)
+        change_set.record("modified", edited)
+        time.sleep(0.4)
+        handler.sync()
+
+        assert _committed_files(handler) == {"a.md"}
+        assert handler.repo.git.show("HEAD:a.md") == "a2"
+        assert deferred and 0 < deferred[-1] <= 30
+        batch = change_set.drain()
+        assert set(batch.paths) == {"attachment.pdf"}
+        assert batch.first_change_at is not None
+
+    def test_continuously_rewritten_file_is_still_committed(self, tmp_path):
+        root = str(tmp_path / "vault")
+        write(root, "seed.md", "seed")
+        change_set, handler, deferred = _handler(
+            root, StabilityGate(settle=1, large_settle=30, large_bytes=1 << 20, max_defer=1.5)
+        )
+        time.sleep(1.1)
+        handler.sync()
+        assert _committed_files(handler) == {"seed.md"}
+
+        # 0.2초마다 autosave되는 노트: settle 시간이 지나도록 조용해지는 일이 없음
+        stop = threading.Event()
+
+        def typing():
+            n = 0
+            while not stop.is_set():
+                n += 1
+                change_set.record("modified", write(root, "typing.md", "x" * n))
+                time.sleep(0.2)
+
+        writer = threading.Thread(target=typing)
+        writer.start()
+        try:
+            deadline = time.monotonic() + 5
+            while "typing.md" not in _committed_files(handler) and time.monotonic() < deadline:
+                handler.sync()
+                time.sleep(0.3)
+        finally:
+            stop.set()
+            writer.join()
+
+        assert "typing.md" in _committed_files(handler)
+        assert deferred
+
+    def test_settle_cycle_without_commit_does_not_fetch(self, remote):
+        """아직 쓰는 중인 파일만 남은 settle cycle은 fetch/rebase를 하지 않음"""
+        _, root, change_set, handler = remote
+        deferred = []
+        handler.stability_gate = StabilityGate(settle=30, large_settle=300, large_bytes=1 << 20)
+        handler.on_deferred = deferred.append
+
+        def fetches():
+            return REGISTRY.get_sample_value(
+                "sbsync_git_phase_seconds_count", {"phase": "fetch", "outcome": "ok"}
+            ) or 0
+
+        def skipped():
+            return REGISTRY.get_sample_value(
+                "sbsync_pulls_skipped_total", {"reason": "settle"}
+            ) or 0
+
+        before, skipped_before = fetches(), skipped()
+        for _ in range(3):
+            change_set.record("modified", write(root, "typing.md", "still typing"))
+            handler.sync("settle")
+        assert fetches() == before
+        assert skipped() == skipped_before + 3
+        assert len(deferred) == 3
+
+        # 다른 trigger의 cycle은 그대로 pull
+        handler.sync("periodic")
+        assert fetches() == before + 1
@@ -0,0 +1,130 @@
+"""Event storm 테스트 — 대량 이벤트에서 per-event 처리 중단 후 한 번의 full sync로 복구"""
+
+import os
+import threading
+import time
+import tracemalloc
+
+from prometheus_client import REGISTRY
+from watchdog.events import FileModifiedEvent
+from watchdog.observers import Observer
+
+from src.changeset import ChangeSet
+from src.fsmonitor import FULL_RESCAN, EventJournal
+from src.ignore import GIT_DIR_RULE
+from src.timers import TimerScheduler
+from src.watcher import VaultEventHandler
+from tests.conftest import write
+
+
+def _handler(root, **kwargs):
+    change_set = ChangeSet(root)
+    change_set.drain()
+    journal = EventJournal(root)
+    calls = []
+    handler = VaultEventHandler(
+        lambda: calls.append(1),
+        change_set=change_set,
+        journal=journal,
+        scheduler=TimerScheduler(name="test-storm"),
+        **kwargs,
+    )
+    return handler, change_set, journal, calls
+
+
+class TestEventStorm:
+    def test_normal_rate_is_handled_per_event(self, tmp_path):
+        handler, change_set, _, calls = _handler(str(tmp_path), storm_rate=1000)
+        for i in range(10):
+            handler.on_any_event(FileModifiedEvent(str(tmp_path / f"n{i}.md")))
+        assert not handler.in_storm
+        assert len(calls) == 10
+        assert len(change_set.drain().paths) == 10
+
+    def test_burst_enters_storm_with_flat_memory(self, tmp_path):
+        """100k 이벤트 burst 동안 change set/journal이 자라지 않음"""
+        started = []
+        handler, change_set, journal, calls = _handler(
+            str(tmp_path), storm_rate=100, on_storm_start=lambda: started.append(1)
+        )
+        token, _ = journal.since("")
+        events = [
+            FileModifiedEvent(os.path.join(str(tmp_path), f"d{i % 100}", f"n{i}.md"))
+            for i in range(100_000)
+        ]
+
+        tracemalloc.start()
+        try:
+            base, _ = tracemalloc.get_traced_memory()
+            for event in events:
+                handler.on_any_event(event)
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            handler.scheduler.stop()
+
+        assert handler.in_storm
+        assert started == [1]
+        assert len(calls) <= 100
+        assert current - base < 512 * 1024
+        batch = change_set.drain()
+        assert batch.full_rescan and len(batch) == 0
+        assert journal.since(token)[1] is FULL_RESCAN
+        assert journal.since(journal.since("")[0])[1] is FULL_RESCAN
+
+    def test_storm_exits_after_quiet_and_requests_reconciliation(self, tmp_path):
+        ended = threading.Event()
+        handler, change_set, journal, _ = _handler(
+            str(tmp_path), storm_rate=50, storm_quiet=0, on_storm_end=ended.set
+        )
+        try:
+            for i in range(200):
+                handler.on_any_event(FileModifiedEvent(str(tmp_path / f"n{i}.md")))
+            assert handler.in_storm
+            change_set.drain()  # storm 중 sync가 full rescan 표시를 소비한 경우
+
+            assert ended.wait(timeout=3.0)
+        finally:
+            handler.scheduler.stop()
+
+        assert not handler.in_storm
+        assert not journal.suspended
+        assert change_set.drain().full_rescan
+
+        # 이후 이벤트는 다시 개별 처리
+        handler.on_any_event(FileModifiedEvent(str(tmp_path / "after.md")))
+        assert "after.md" in change_set.drain().paths
+
+    def test_own_commit_does_not_enter_storm(self, remote):
+        """sbSync 자신의 커밋이 만드는 수백 개의 .git 이벤트는 storm rate에 세지 않음"""
+        _, root, _, git_handler = remote
+        for i in range(80):
+            write(root, f"batch/n{i}.md", f"note {i}\n")
+        handler, change_set, _, calls = _handler(root, storm_rate=50)
+
+        def git_events():
+            return REGISTRY.get_sample_value(
+                "sbsync_ignored_events_total", {"rule": GIT_DIR_RULE}
+            ) or 0
+
+        before = git_events()
+        observer = Observer()
+        observer.schedule(handler, root, recursive=True)
+        observer.start()
+        try:
+            git_handler.repo.git.add("-A")
+            git_handler.repo.git.commit("-q", "-m", "batch")
+            # 이벤트 전달이 멈출 때까지 대기
+            seen = -1
+            while seen != git_events():
+                seen = git_events()
+                time.sleep(0.3)
+        finally:
+            observer.stop()
+            observer.join()
+            handler.scheduler.stop()
+
+        assert not handler.in_storm
+        assert git_events() - before > 50
+        assert calls == []
+        assert not change_set.drain().full_rescan
@@ -0,0 +1,144 @@
+"""TimerScheduler 테스트 — 하나의 timer thread에서 debounce/periodic callback 실행 검증"""
+
+import threading
+import time
+
+from src.timers import TimerScheduler
+from src.utils import Debouncer, PeriodicTimer
+
+
+def _scheduler():
+    return TimerScheduler(name="test-timers")
+
+
+class TestTimerScheduler:
+    def test_callbacks_fire_in_deadline_order(self):
+        scheduler = _scheduler()
+        fired = []
+        done = threading.Event()
+        scheduler.call_later(0.06, lambda: (fired.append("late"), done.set()))
+        scheduler.call_later(0.02, lambda: fired.append("early"))
+        try:
+            assert done.wait(timeout=1.0)
+        finally:
+            scheduler.stop()
+        assert fired == ["early", "late"]
+
+    def test_reschedule_postpones_and_advances(self):
+        scheduler = _scheduler()
+        fired = threading.Event()
+        try:
+            handle = scheduler.call_later(0.05, fired.set)
+            handle.reschedule(0.3)
+            assert not fired.wait(timeout=0.15)
+            handle.reschedule(0.01)
+            assert fired.wait(timeout=0.5)
+        finally:
+            scheduler.stop()
+
+    def test_cancel(self):
+        scheduler = _scheduler()
+        fired = threading.Event()
+        try:
+            scheduler.call_later(0.05, fired.set).cancel()
+            assert not fired.wait(timeout=0.15)
+        finally:
+            scheduler.stop()
+
+    def test_failing_callback_keeps_timer_thread_alive(self):
+        scheduler = _scheduler()
+        calls = []
+
+        def failing():
+            calls.append(1)
+            raise RuntimeError("boom")
+
+        try:
+            scheduler.call_every(0.02, failing)
+            time.sleep(0.2)
+        finally:
+            scheduler.stop()
+        assert len(calls) >= 3
+
+
+class TestDebouncerOnScheduler:
+    def test_event_storm_uses_one_thread(self):
+        """이벤트마다 thread를 만들지 않고 같은 handle의 deadline만 미룸"""
+        scheduler = _scheduler()
+        fired = []
+        debouncer = Debouncer(0.1, lambda: fired.append(1), scheduler=scheduler)
+        try:
+            before = threading.active_count()
+            for _ in range(10000):
+                debouncer.call()
+            assert threading.active_count() <= before + 1
+            assert len(scheduler._heap) == 1
+            time.sleep(0.3)
+        finally:
+            scheduler.stop()
+        assert fired == [1]
+
+    def test_many_timers_share_one_thread(self):
+        scheduler = _scheduler()
+        counts = [0, 0, 0]
+
+        def bump(i):
+            counts[i] += 1
+
+        timers = [
+            PeriodicTimer(0.02, lambda i=i: bump(i), scheduler=scheduler) for i in range(3)
+        ]
+        try:
+            before = threading.active_count()
+            for timer in timers:
+                timer.start()
+            assert threading.active_count() <= before + 1
+            time.sleep(0.2)
+        finally:
+            for timer in timers:
+                timer.cancel()
+            scheduler.stop()
+        assert all(c >= 3 for c in counts)
+
+
+class TestBoundedDebounce:
+    def test_max_wait_fires_during_continuous_calls(self):
+        """쉬지 않고 이벤트가 와도 첫 변경 후 max_wait 안에 callback 실행"""
+        scheduler = _scheduler()
+        fired = threading.Event()
+        debouncer = Debouncer(1.0, fired.set, scheduler=scheduler, max_wait=0.2)
+        start = time.monotonic()
+        try:
+            while not fired.is_set() and time.monotonic() - start < 2.0:
+                debouncer.call()
+                time.sleep(0.01)
+        finally:
+            scheduler.stop()
+        assert fired.is_set()
+        assert time.monotonic() - start < 0.6
+
+    def test_adaptive_window_follows_gaps_and_cost(self):
+        scheduler = _scheduler()
+        debouncer = Debouncer(
+            300, lambda: None, scheduler=scheduler, adaptive=True, min_interval=30
+        )
+        try:
+            assert debouncer.quiet == 300
+            # 1초 간격으로 편집 → 3 * 1s 이지만 최소 30s
+            debouncer._gap_ewma = 1.0
+            debouncer._adapt()
+            assert debouncer.quiet == 30
+            # push 비용 12s → 10 * 12s = 120s
+            debouncer.observe_cost(12.0)
+            assert debouncer.quiet == 120
+            # 상한은 DEBOUNCE_SECONDS
+            debouncer.observe_cost(500.0)
+            debouncer.observe_cost(500.0)
+            assert debouncer.quiet == 300
+        finally:
+            scheduler.stop()
+
+    def test_non_adaptive_ignores_cost(self):
+        debouncer = Debouncer(300, lambda: None, scheduler=_scheduler())
+        debouncer.observe_cost(1000.0)
+        assert debouncer.quiet == 300